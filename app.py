@@ -1,192 +1,144 @@
-from flask import Flask, render_template, request, jsonify
-from collections import Counter
+from flask import Flask, Blueprint, render_template, request, jsonify, Response, abort, make_response
+import json
+import math
+import time
 import os
-import re
-import csv
 from pathlib import Path
-from haystack.components.builders.prompt_builder import PromptBuilder
-from haystack_integrations.components.generators.google_ai import GoogleAIGeminiGenerator
-from haystack_integrations.document_stores.chroma import ChromaDocumentStore
-from haystack.components.embedders import SentenceTransformersDocumentEmbedder
-from haystack import Document, Pipeline
 from dotenv import load_dotenv
+from term_index import TermIndex
+from corpus import NEWS_SOURCES_DIR
+import services
+from retrieval import NEWS_FOLDER, DEFAULT_TOKEN_BUDGET, DEFAULT_TOP_K
+from llm_cache import LLMCache, folder_signature
+from embedding_matrix import EmbeddingMatrix, dictionary_encode
+from email_graph import EmailStore, BUCKET_SECONDS, parse_time
+from entities import NODES, ALIASES, CURATED_LINKS, BIAS_ENTITIES, NAMESAKES
+from entity_graph import EntityGraph
+from bias_engine import BiasEngine
+from search_index import SearchIndex
+from near_duplicates import MinHashLSH, DEFAULT_MIN_JACCARD
+from date_index import PublicationIndex, BUCKETS
+from resume_index import ResumeIndex
+from embedding_backend import shared_embedder
+from datetime import date
 import numpy as np
-from sklearn.decomposition import PCA
-import matplotlib.pyplot as plt
+import metrics
 
 load_dotenv()
 
 
 
-app = Flask(__name__, static_folder='static', template_folder='templates')
+# Routes live on a blueprint and the app is built by create_app(), so a WSGI server can build it
+# once and fork workers from it (see wsgi.py). The indexes and caches below are module-level, so
+# they are shared by every app built in this process.
+bp = Blueprint('main', __name__)
 
 SOURCE_DIR = 'sources'
-NEWS_SOURCES_DIR = Path('News Articles')
-PATH_TO_PERSISTENT = Path('vectors/')
+CACHE_DIR = Path('cache/')
+LLM_BATCH_MAX = int(os.environ.get('LLM_BATCH_MAX', 32))
 NEWS_SOURCES = sorted(os.listdir(NEWS_SOURCES_DIR))
-RAG_gen_template = """
-Given the following contexts, answer the question to the best of your ability.
-Context: 
 
-    {{ all_context }}
+def get_source_folders():
+    folders = [f for f in os.listdir(SOURCE_DIR) if os.path.isdir(os.path.join(SOURCE_DIR, f))]
+    if 'email_headers.csv' in os.listdir(SOURCE_DIR):
+        folders.append('email_headers.csv')
+    return folders
 
-Question: {{ query }}
-"""
 
-# Creates the answer pipeline
-answer_prompt_builder = PromptBuilder(template=RAG_gen_template, required_variables={"all_context", "query"})
-answer_generator = GoogleAIGeminiGenerator(model="gemini-2.0-flash-lite")
+FOLDERS = get_source_folders()
+# The LLM page can also ask about the news articles themselves
+LLM_FOLDERS = FOLDERS + [NEWS_FOLDER]
 
-answer_pipeline = Pipeline()
+# Per-file term counts for the wordcloud, persisted so files are only re-tokenized when they change
+term_index = TermIndex(SOURCE_DIR, CACHE_DIR / 'term_index.json')
 
+# Assembled contexts and Gemini answers, so repeated questions skip both the file reads and the LLM.
+# Set LLM_CACHE_PATH to keep answers in a sqlite file across restarts.
+llm_cache = LLMCache(ttl=float(os.environ.get('LLM_CACHE_TTL', 3600)),
+                     disk_path=os.environ.get('LLM_CACHE_PATH') or None)
 
-answer_pipeline.add_component("answer_builder", answer_prompt_builder) 
-answer_pipeline.add_component("llm_answer_generator", answer_generator) 
-print("Established llm answer pipeline")
-answer_pipeline.connect("answer_builder", "llm_answer_generator")
+# All article embeddings in one memory-mapped matrix, with PCA projections cached per source set.
+# Rebuilt whenever ingestion rewrites its manifest.
+embedding_matrix = EmbeddingMatrix(CACHE_DIR, services.PATH_TO_PERSISTENT / 'ingest_manifest.json')
 
-print("Initializing ChromaDocumentStore")
-document_store = ChromaDocumentStore(persist_path=str(PATH_TO_PERSISTENT))
 
-# If we haven't yet embedded our documents, do so first. This takes about 3 minutes
-if len(os.listdir(PATH_TO_PERSISTENT)) == 0:
-    print("Documents have not yet been embedded! This could take a couple minutes. Embedding documents...")
+def cache_metrics():
+    # The hit/miss counts the caches already keep, exported to /metrics
+    caches = {"llm_context": llm_cache.contexts, "llm_answer": llm_cache.answers,
+              "pca_projection": embedding_matrix.projections}
+    infos = {name: cache.info() for name, cache in caches.items()}
+    return [("vafinal_cache_lookups_total", "counter", "Cache lookups by cache and result",
+             [({"cache": name, "result": result}, info[result]) for name, info in infos.items() for result in ("hits", "misses")]),
+            ("vafinal_cache_evictions_total", "counter", "Entries dropped for space or age",
+             [({"cache": name}, info["evictions"] + info["expired"]) for name, info in infos.items()]),
+            ("vafinal_cache_entries", "gauge", "Entries currently cached",
+             [({"cache": name}, info["size"]) for name, info in infos.items()])]
 
-    ARTICLE_SOURCE_START = "SOURCE:"
-    ARTICLE_TITLE_START = "TITLE:"
-    ARTICLE_PUBLISHED_START = "PUBLISHED:"
-    ARTICLE_LOCATION_START = "LOCATION:"
-    ARTICLE_AUTHOR_START = "AUTHOR:"
-    ARTICLE_METADATA = [ARTICLE_SOURCE_START, ARTICLE_TITLE_START, ARTICLE_PUBLISHED_START, ARTICLE_LOCATION_START, ARTICLE_AUTHOR_START]
 
-    def create_haystack_doc(file_contents) -> Document|None:
-        meta = {}
-        all_end_indices = []
-        for metadata_start_token in ARTICLE_METADATA:
-            try:
-                metadata_start_idx = file_contents.index(metadata_start_token)
-                metadata_end_idx = metadata_start_idx + file_contents[metadata_start_idx:].index('\n')
-                metadata_start_idx += len(metadata_start_token)
-                metadata_content = file_contents[metadata_start_idx:metadata_end_idx].strip()
-                meta[metadata_start_token.lower()[:-1]] = metadata_content
-                all_end_indices.append(metadata_end_idx)
-                # print(f"For metadata_start_token: {metadata_start_token}, content: {metadata_content}")
-            except ValueError:
-                # print(f"No metadata for {metadata_start_token}")
-                meta[metadata_start_token.lower()[:-1]] = ""
-
-        content = file_contents[max(all_end_indices):].strip()
-
-        return Document(content=content,
-                        meta=meta)
-    
-    # we use the default embedder to embed our documents (hugging face model, sentence-transformers/all-mpnet-base-v2)
-    print("Initializing SentenceTransformersDocumentEmbedder")
-    doc_embedder = SentenceTransformersDocumentEmbedder(meta_fields_to_embed=ARTICLE_METADATA)
-    print("Warming it up...")
-    doc_embedder.warm_up()
-    docs_to_embed = []
-    for data_file in NEWS_SOURCES_DIR.glob('*/*.txt'):
-        with open(data_file, 'r', errors='ignore') as f:
-            text = f.read()
-        docs_to_embed.append(create_haystack_doc(text))
-        # embed those documents, and add them to our Chroma DB
-    print(f"About to embed: {len(docs_to_embed)} documents")
-    docs_with_embeddings = doc_embedder.run(docs_to_embed)
-    document_store.write_documents(docs_with_embeddings["documents"])
-    all_docs = document_store.filter_documents()
-    print(f"After writing, there are: {len(all_docs)} docs embedded!")
+metrics.REGISTRY.register_collector(cache_metrics)
 
-def get_source_folders():
-    folders = [f for f in os.listdir(SOURCE_DIR) if os.path.isdir(os.path.join(SOURCE_DIR, f))]
-    if 'email_headers.csv' in os.listdir(SOURCE_DIR):
-        folders.append('email_headers.csv')
-    return folders
+# email_headers.csv as typed columns plus sparse sender x recipient matrices, parsed once
+email_store = EmailStore(os.path.join(SOURCE_DIR, 'email_headers.csv'), CACHE_DIR)
 
+# Who is mentioned alongside whom across the articles and source documents, rescanning only changed files
+entity_graph = EntityGraph(NODES, ALIASES, CURATED_LINKS, CACHE_DIR / 'entity_mentions.json')
+DEFAULT_MIN_WEIGHT = 5
 
-FOLDERS = get_source_folders()
+# Per-article sentiment towards the Bias page's entities, rescored only when an article's content changes
+bias_engine = BiasEngine(BIAS_ENTITIES, CACHE_DIR / 'bias_scores.json', namesakes=NAMESAKES)
 
-def load_documents_by_folders(selected_folders):
-    text = ""
-    for folder in selected_folders:
-        if folder == 'email_headers.csv':
-            csv_path = os.path.join(SOURCE_DIR, 'email_headers.csv')
-            try:
-                with open(csv_path, 'r', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        subject = row.get('Subject', '')
-                        body = row.get('Body', '') or row.get('Content', '')
-                        text += f"{subject} {body} ".lower()
-            except UnicodeDecodeError:
-                with open(csv_path, 'r', encoding='latin-1') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        subject = row.get('Subject', '')
-                        body = row.get('Body', '') or row.get('Content', '')
-                        text += f"{subject} {body} ".lower()
-        else:
-            folder_path = os.path.join(SOURCE_DIR, folder)
-            for root, _, files in os.walk(folder_path):
-                for file in files:
-                    if file.endswith('.txt'):
-                        file_path = os.path.join(root, file)
-                        try:
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                text += f.read().lower() + " "
-                        except UnicodeDecodeError:
-                            with open(file_path, 'r', encoding='latin-1') as f:
-                                text += f.read().lower() + " "
-    return text
-
-
-def clean_text(text):
-    text = re.sub(r'[^\w\s]', '', text)
-    words = text.split()
-    stopwords = {'the', 'and', 'of', 'in', 'to', 'a', 'for', 'on', 'is', 'with', 'as', 'by', 'an', 'at'}
-    return [w for w in words if w not in stopwords and len(w) > 2]
+# BM25 index with positional postings over the articles and source documents, updated per changed file
+search_index = SearchIndex(CACHE_DIR / 'search_index.json')
+
+# MinHash signatures of every article, bucketed with LSH to find outlets copying each other
+near_duplicates = MinHashLSH(CACHE_DIR)
+
+# Every article's publication date, sorted, with per-outlet daily counts for the timeline
+publication_index = PublicationIndex(CACHE_DIR / 'publication_index.json')
+
+# The resumes from Sources/Resumes and sources/Resumes, read once and looked up by person
+resume_index = ResumeIndex()
+resume_index.refresh()
 
 # Routes for Static Pages 
 
-@app.route('/')
+@bp.route('/')
 def home():
     return render_template('home.html')
 
-@app.route('/timeline')
+@bp.route('/timeline')
 def timeline():
     return render_template('timeline.html')
 
-@app.route('/graph')
+@bp.route('/graph')
 def graph():
     return render_template('graph.html')
 
-@app.route('/people')
+@bp.route('/people')
 def people():
     return render_template('people.html')
 
-@app.route('/similarity_report')
+@bp.route('/similarity_report')
 def similarity_report():
     return render_template('similarity_report.html', news_sources=NEWS_SOURCES)
 
-@app.route('/llm')
+@bp.route('/llm')
 def llm():
-    return render_template('llm.html', folders=FOLDERS)
+    return render_template('llm.html', folders=LLM_FOLDERS)
 
-@app.route('/bias')
+@bp.route('/bias')
 def bias():
     return render_template('bias.html')
 
 
-@app.route('/words')
+@bp.route('/words')
 def words_page():
     return render_template('words.html', folders=FOLDERS)
 
-@app.route('/wordcloud', methods=['POST'])
+@bp.route('/wordcloud', methods=['POST'])
 def wordcloud():
     selected = request.json.get('folders', [])
-    raw_text = load_documents_by_folders(selected)
-    words = clean_text(raw_text)
-    freqs = Counter(words).most_common(int(request.json.get('words', 50)))
+    freqs = term_index.most_common(selected, number_arg(request.json, 'words', 50))
     return jsonify(freqs)
 
 
@@ -201,278 +153,457 @@ def get_all_content(path):
     else:
         with open(path, 'r', errors='ignore') as f:
             all_contents = f.read()
+        metrics.BYTES_READ.inc(len(all_contents), stage="full_context")
+        metrics.DOCUMENTS.inc(stage="full_context")
     
     return all_contents
             
 
 
-@app.route('/llm_query', methods=['POST'])
-def llm_query():
-    user_query = request.json.get('query', "")
-    selected_folders = request.json.get('folders', [])
+def folder_path(folder):
+    if folder == NEWS_FOLDER:
+        return NEWS_SOURCES_DIR
+    return os.path.join(SOURCE_DIR, folder)
+
+
+def build_full_context(selected_folders):
     folder_content = {}
-    for folder in selected_folders:
-        folder_content[folder] = get_all_content(os.path.join(SOURCE_DIR, folder))
+    with metrics.stage("read_files"):
+        for folder in selected_folders:
+            folder_content[folder] = get_all_content(folder_path(folder))
 
     all_context = ""
     for folder in selected_folders:
         all_context += f"Source: {folder}\n\n Content: {folder_content[folder]}\n\n"
+    return all_context
 
-    answer_results = answer_pipeline.run(
-        data={
-            "answer_builder":{
-                "all_context": all_context,
-                "query": user_query
-            }
-        }
-    )
-    answer = str(answer_results['llm_answer_generator']['replies'][0])
-    # supporting_titles = '\n'.join([document.meta['title'] for document in retrieval_results['document_retriever']['documents']])
-    
-    return jsonify(answer)
 
+def parse_llm_request(body):
+    user_query = body.get('query', "")
+    selected_folders = body.get('folders', [])
+    # "full" pastes every selected folder into the prompt; "retrieval" only sends the
+    # chunks closest to the query, up to token_budget
+    mode = body.get('mode', 'full')
+    token_budget = number_arg(body, 'token_budget', DEFAULT_TOKEN_BUDGET)
+    top_k = number_arg(body, 'top_k', DEFAULT_TOP_K)
 
-@app.route('/generate_similarity_report', methods=['POST'])
+    # Any change to a file under the selected folders changes the signature, and so the cache keys
+    signature = folder_signature([folder_path(folder) for folder in selected_folders])
+    answer_key = llm_answer_key(user_query, selected_folders, mode, token_budget, top_k, signature)
+    return user_query, selected_folders, mode, token_budget, top_k, signature, answer_key
+
+
+def llm_answer_key(user_query, selected_folders, mode, token_budget, top_k, signature, **options):
+    if mode == 'retrieval':
+        return llm_cache.answer_key(user_query, selected_folders, signature, mode=mode, token_budget=token_budget, top_k=top_k, **options)
+    return llm_cache.answer_key(user_query, selected_folders, signature, mode=mode, **options)
+
+
+def assemble_llm_context(user_query, selected_folders, mode, token_budget, top_k, signature):
+    # Returns the context for the prompt, and the supporting documents (None outside retrieval mode)
+    if mode == 'retrieval':
+        return services.retrieve_context(user_query, selected_folders, token_budget, top_k)
+    return llm_cache.context(selected_folders, signature, lambda: build_full_context(selected_folders)), None
+
+
+def llm_response(answer, supporting):
+    if supporting is None:
+        return answer
+    return {"answer": answer,
+            "supporting_titles": [doc['title'] for doc in supporting],
+            "supporting": supporting}
+
+
+@bp.route('/llm_query', methods=['POST'])
+def llm_query():
+    user_query, selected_folders, mode, token_budget, top_k, signature, answer_key = parse_llm_request(request.json)
+    cached = llm_cache.answers.get(answer_key)
+    if cached is not None:
+        return jsonify(cached)
+
+    all_context, supporting = assemble_llm_context(user_query, selected_folders, mode, token_budget, top_k, signature)
+
+    metrics.PROMPT_CHARACTERS.inc(len(all_context) + len(user_query), mode=mode)
+    try:
+        with metrics.stage("llm"):
+            answer = services.answer(all_context, user_query)
+    except services.Overloaded as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+    except services.LLMTimeout as e:
+        return jsonify({"error": str(e)}), 504
+
+    response = llm_response(answer, supporting)
+    llm_cache.answers.set(answer_key, response)
+    return jsonify(response)
+
+
+@bp.route('/llm_query_batch', methods=['POST'])
+def llm_query_batch():
+    # Many questions over the same folders: the context is assembled once and the questions are
+    # answered concurrently on the LLM executor. In retrieval mode the chunks are retrieved for
+    # all the questions together. Each answer is cached like a single /llm_query answer.
+    body = request.json
+    questions = body.get('questions', [])
+    if not questions or len(questions) > LLM_BATCH_MAX:
+        return jsonify({"error": f"Send between 1 and {LLM_BATCH_MAX} questions"}), 400
+    _, selected_folders, mode, token_budget, top_k, signature, _ = parse_llm_request(body)
+
+    answers = [None] * len(questions)
+    # A retrieval-mode batch answers from chunks chosen for all its questions, so its answers are
+    # cached apart from single ones; a full-mode context is the same either way
+    options = {"batch": True} if mode == 'retrieval' else {}
+    keys = [llm_answer_key(question, selected_folders, mode, token_budget, top_k, signature, **options)
+            for question in questions]
+    for i, key in enumerate(keys):
+        cached = llm_cache.answers.get(key)
+        if cached is not None:
+            answers[i] = {"question": questions[i], "answer": cached, "cached": True}
+    pending = [i for i, entry in enumerate(answers) if entry is None]
+    if not pending:
+        return jsonify({"answers": answers})
+
+    all_context, supporting = assemble_llm_context("\n".join(questions[i] for i in pending),
+                                                   selected_folders, mode, token_budget, top_k, signature)
+    futures = {}
+    for i in pending:
+        metrics.PROMPT_CHARACTERS.inc(len(all_context) + len(questions[i]), mode=mode)
+        try:
+            futures[i] = services.llm_executor.submit(services.run_answer_pipeline, all_context, questions[i])
+        except services.Overloaded:
+            answers[i] = {"question": questions[i], "error": "busy"}
+    if not futures:
+        return jsonify({"answers": answers}), 503, {"Retry-After": "1"}
+
+    # One deadline for the whole batch, not one per question
+    deadline = time.monotonic() + services.llm_executor.timeout
+    with metrics.stage("llm"):
+        for i, future in futures.items():
+            try:
+                answer = services.llm_executor.result(future, timeout=max(0, deadline - time.monotonic()))
+            except services.LLMTimeout:
+                answers[i] = {"question": questions[i], "error": "timeout"}
+                continue
+            except Exception as e:
+                answers[i] = {"question": questions[i], "error": repr(e)}
+                continue
+            response = llm_response(answer, supporting)
+            llm_cache.answers.set(keys[i], response)
+            answers[i] = {"question": questions[i], "answer": response, "cached": False}
+    return jsonify({"answers": answers})
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@bp.route('/llm_query_stream', methods=['POST'])
+def llm_query_stream():
+    # Same request as /llm_query, but the answer comes back as server-sent events:
+    # "token" events with pieces of the reply as Gemini produces them, then one "done"
+    # event with the supporting documents and timings (or an "error" event)
+    start = time.perf_counter()
+    user_query, selected_folders, mode, token_budget, top_k, signature, answer_key = parse_llm_request(request.json)
+
+    def generate():
+        cached = llm_cache.answers.get(answer_key)
+        if cached is not None:
+            answer = cached if isinstance(cached, str) else cached['answer']
+            yield sse_event("token", {"text": answer})
+            yield sse_event("done", {**({} if isinstance(cached, str) else cached),
+                                     "cached": True,
+                                     "ttft_ms": round(1000 * (time.perf_counter() - start), 1),
+                                     "total_ms": round(1000 * (time.perf_counter() - start), 1)})
+            return
+
+        ttft_ms = None
+        pieces = []
+        try:
+            all_context, supporting = assemble_llm_context(user_query, selected_folders, mode, token_budget, top_k, signature)
+            metrics.PROMPT_CHARACTERS.inc(len(all_context) + len(user_query), mode=mode)
+            llm_start = time.perf_counter()
+            for piece in services.stream_answer(all_context, user_query):
+                if ttft_ms is None:
+                    ttft_ms = round(1000 * (time.perf_counter() - start), 1)
+                    metrics.TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - start)
+                pieces.append(piece)
+                yield sse_event("token", {"text": piece})
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - llm_start, stage="llm_stream")
+        except Exception as e:
+            yield sse_event("error", {"error": repr(e)})
+            return
+
+        response = llm_response("".join(pieces), supporting)
+        llm_cache.answers.set(answer_key, response)
+        total_ms = round(1000 * (time.perf_counter() - start), 1)
+        yield sse_event("done", {**({} if supporting is None else response),
+                                 "cached": False,
+                                 "ttft_ms": ttft_ms,
+                                 "total_ms": total_ms})
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@bp.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+@bp.route('/cache_stats')
+def cache_stats():
+    return jsonify({"llm": llm_cache.info(), "llm_executor": services.llm_executor.info(),
+                    "embeddings": shared_embedder().throughput()})
+
+
+@bp.route('/generate_similarity_report', methods=['POST'])
 def generate_similarity_report():
+    # Columnar response: parallel x/y/id arrays (id being the document id in the store) plus a
+    # dictionary-encoded meta table. Article text is fetched per point from /article/<id> when it is opened.
     sources = request.json.get('sources', [])
-    conditions = [{"field": "meta.source", "operator": "==", "value": source} for source in sources]
-    print(len(conditions))
     if (len(sources) == 0):
-        results = []
         x_axis_title = f"Principal Component 1 ({0:.2f}%)"
         y_axis_title = f"Principal Component 2 ({0:.2f}%)"
 
-        return jsonify({"data": results,
+        return jsonify({"x": [], "y": [], "id": [], "meta": dictionary_encode([]),
                         "x-axis-title": x_axis_title,
                         "y-axis-title": y_axis_title})
-    filters = {}
-    if len(conditions) == 1:
-        filters = {"field": "meta.source", "operator": "==", "value": sources[0]}
-    elif len(conditions) > 1:
-        filters = {
-            "operator": "OR",
-            "conditions": conditions,
-        }
-    # print(filters)
-    current_docs = document_store.filter_documents(filters)
-    num_docs = len(current_docs)
-    print(f"Retrieved {num_docs} documents")
-    embeddings = []
-    texts = []
-    metas = []
-
-    for doc in current_docs:
-        if doc.embedding is not None:
-            embeddings.append(doc.embedding)
-            texts.append(doc.content)
-            metas.append(doc.meta)
-
-    X = np.array(embeddings)
-    pca = PCA(n_components=2)
-    X_reduced = pca.fit_transform(X)
-
-    results = [{"x": X_reduced[i, 0], 
-                "y": X_reduced[i, 1],
-                "meta": metas[i], 
-                "contents": texts[i]}
-                for i in range(num_docs)]
-
-    x_axis_title = f"Principal Component 1 ({100 * pca.explained_variance_ratio_[0]:.2f}%)"
-    y_axis_title = f"Principal Component 2 ({100 * pca.explained_variance_ratio_[1]:.2f}%)"
-
-    return jsonify({"data": results,
+
+    rows, X_reduced, explained_variance_ratio = embedding_matrix.project(services.ingested_document_store(), sources)
+
+    # float32 precision is plenty for a scatter plot, and rounding keeps the JSON short
+    coords = np.round(X_reduced.astype(np.float64), 5)
+
+    x_axis_title = f"Principal Component 1 ({100 * explained_variance_ratio[0]:.2f}%)"
+    y_axis_title = f"Principal Component 2 ({100 * explained_variance_ratio[1]:.2f}%)"
+
+    return jsonify({"x": coords[:, 0].tolist(),
+                    "y": coords[:, 1].tolist(),
+                    "id": [embedding_matrix.ids[row] for row in rows],
+                    "meta": dictionary_encode([embedding_matrix.metas[row] for row in rows]),
                     "x-axis-title": x_axis_title,
                     "y-axis-title": y_axis_title})
 
 
-nodes = [
-    #Organizations
-    {"id": "Protectors of Kronos (POK)", "group": "POK"},
-    {"id": "GAStech International", "group": "GAStech"},
-    {"id": "Kronos Government", "group": "Government"},
-    {"id": "Abila Police", "group": "Government"},
-    {"id": "Tethyn Federal Law Enforcement", "group": "Government"},
-    {"id": "Tethyn Ministry of Foreign Affairs", "group": "Government"},
-    {"id": "Abila Fire Department", "group": "Government"},
-
-    # POK people
-    {"id": "Juliana Vann", "group": "POK"},
-    {"id": "Edvard Vann", "group": "GAStech"},
-    {"id": "Henk Bodrogi", "group": "POK"},
-    {"id": "Elian Karel", "group": "POK"},
-    {"id": "Silvia Marek", "group": "POK"},
-
-    # Government people
-    {"id": "Cesare Nespola", "group": "Government"},
-    {"id": "President Dorel Kapelou II", "group": "Government"},
-    {"id": "Rufus Drymiau", "group": "Government"},
-    {"id": "Vincent Kapelou", "group": "Government"},
-
-
-    # Media people
-    {"id": "Petrus Gerhard", "group": "Media"},
-    {"id": "Maha Salo", "group": "Media"},
-    {"id": "Haneson Ngohebo", "group": "Media"},
-    {"id": "Sara Tuno", "group": "Media"},
-
-    # Experts
-    {"id": "John Rathburn", "group": "Expert"},
-    {"id": "Jon L.", "group": "Citizen"},
-
-    # GAStech executives
-    {"id": "Sten Sanjorge Jr", "group": "GAStech"},
-    {"id": "Sten Sanjorge Sr", "group": "GAStech"},
-    {"id": "Ingrid Barranco", "group": "GAStech"},
-    {"id": "Ada Campo-Corrente", "group": "GAStech"},
-    {"id": "Orhan Strum", "group": "GAStech"},
-    {"id": "Willem Vasco-Pais", "group": "GAStech"},
-
-    # Other GAStech employees (grouped IT/Security/Facilities/Engineering)
-    {"id": "Felix Resumir", "group": "GAStech"},
-    {"id": "Hideki Cocinaro", "group": "GAStech"},
-    {"id": "Inga Ferro", "group": "GAStech"},
-    {"id": "Varja Lagos", "group": "GAStech"},
-    {"id": "Kanon Herrero", "group": "GAStech"},
-    {"id": "Stenig Fusil", "group": "GAStech"},
-    {"id": "Hennie Osvaldo", "group": "GAStech"},
-    {"id": "Isia Vann", "group": "GAStech"},
-    {"id": "Loreto Bodrogi", "group": "GAStech"},
-    {"id": "Bertrand Ovan", "group": "GAStech"},
-    {"id": "Emile Arpa", "group": "GAStech"},
-    {"id": "Varro Awelon", "group": "GAStech"},
-    {"id": "Dante Coginian", "group": "GAStech"},
-    {"id": "Albina Hafon", "group": "GAStech"},
-    {"id": "Benito Hawelon", "group": "GAStech"},
-    {"id": "Claudio Hawelon", "group": "GAStech"},
-    {"id": "Henk Mies", "group": "GAStech"},
-    {"id": "Minke Mies", "group": "GAStech"},
-    {"id": "Ruscella Mies Haber", "group": "GAStech"},
-    {"id": "Valeria Morlun", "group": "GAStech"},
-    {"id": "Adan Morlun", "group": "GAStech"},
-    {"id": "Cecilia Morluniau", "group": "GAStech"},
-    {"id": "Irene Nant", "group": "GAStech"},
-    {"id": "Dylan Scozzese", "group": "GAStech"},
-    {"id": "Mat Bramar", "group": "GAStech"},
-    {"id": "Anda Ribera", "group": "GAStech"},
-    {"id": "Rachel Pantanal", "group": "GAStech"},
-    {"id": "Linda Lagos", "group": "GAStech"},
-    {"id": "Carla Forluniau", "group": "GAStech"},
-    {"id": "Cornelia Lais", "group": "GAStech"},
-    {"id": "Lidelse Dedos", "group": "GAStech"},
-    {"id": "Felix Balas", "group": "GAStech"},
-    {"id": "Lars Azada", "group": "GAStech"},
-    {"id": "Adra Nubarron", "group": "GAStech"},
-    {"id": "Birgitta Frente", "group": "GAStech"},
-    {"id": "Vira Frente", "group": "GAStech"},
-    {"id": "Marin Onda", "group": "GAStech"},
-    {"id": "Elsa Orilla", "group": "GAStech"},
-    {"id": "Kare Orilla", "group": "GAStech"},
-    {"id": "Axel Calzas", "group": "GAStech"},
-    {"id": "Brand Tempestad", "group": "GAStech"},
-    {"id": "Isande Borrasca", "group": "GAStech"},
-    {"id": "Gustav Cazar", "group": "GAStech"},
-    {"id": "Linnea Bergen", "group": "GAStech"},
-    {"id": "Isak Baza", "group": "GAStech"},
-    {"id": "Nils Calixto", "group": "GAStech"},
-    {"id": "Sven Flecha", "group": "GAStech"},
-    {"id": "Lucas Alcazar", "group": "GAStech"},
-]
-
-links = [
-    # Family relationships
-    {"source": "Edvard Vann", "target": "Juliana Vann", "relation": "Family name match"},
-    {"source": "Isia Vann", "target": "Edvard Vann", "relation": "Same family name"},
-    {"source": "Isia Vann", "target": "Juliana Vann", "relation": "Same family name"},
-    {"source": "Henk Bodrogi", "target": "Loreto Bodrogi", "relation": "Same family name"},
-    {"source": "Linda Lagos", "target": "Varja Lagos", "relation": "Same family name"},
-    {"source": "Henk Mies", "target": "Minke Mies", "relation": "Same family name"},
-    {"source": "Henk Mies", "target": "Ruscella Mies Haber", "relation": "Same family name"},
-    {"source": "Adan Morlun", "target": "Valeria Morlun", "relation": "Same family name"},
-    {"source": "Adan Morlun", "target": "Cecilia Morluniau", "relation": "Same family name"},
-    {"source": "Valeria Morlun", "target": "Cecilia Morluniau", "relation": "Same family name"},
-    {"source": "Birgitta Frente", "target": "Vira Frente", "relation": "Same family name"},
-    {"source": "Elsa Orilla", "target": "Kare Orilla", "relation": "Same family name"},
-    {"source": "Nils Calixto", "target": "Lucas Alcazar", "relation": "Same last name grouping"},
-
-    # Leadership transitions
-    {"source": "Henk Bodrogi", "target": "Elian Karel", "relation": "Succeeded by"},
-    {"source": "Elian Karel", "target": "Silvia Marek", "relation": "Succeeded by"},
-
-    # Parent-child
-    {"source": "Jeroen Karel", "target": "Elian Karel", "relation": "Father"},
-    
-    # Political family relationships
-    {"source": "President Dorel Kapelou II", "target": "Vincent Kapelou", "relation": "Uncle"},
-    {"source": "Vincent Kapelou", "target": "Cesare Nespola", "relation": "Successor"},
-    
-    # Public conflicts / tension
-    {"source": "Protectors of Kronos (POK)", "target": "President Dorel Kapelou II", "relation": "Opposes"},
-    {"source": "Protectors of Kronos (POK)", "target": "Vincent Kapelou", "relation": "Threatened"},
-    {"source": "President Dorel Kapelou II", "target": "Protectors of Kronos (POK)", "relation": "Declared terrorist"},
-    {"source": "Rufus Drymiau", "target": "Protectors of Kronos (POK)", "relation": "Declared terrorist"},
-    {"source": "Adrien Carman", "target": "Protectors of Kronos (POK)", "relation": "Condemned protest violence"},
-    {"source": "Officer Emilio Haber", "target": "Protectors of Kronos (POK)", "relation": "Police confrontation"},
-    {"source": "Cesare Nespola", "target": "Henk Bodrogi", "relation": "Met regarding water contamination"},
-    
-    # Memorial and martyr status
-    {"source": "Juliana Vann", "target": "Protectors of Kronos (POK)", "relation": "Martyr figure"},
-    {"source": "Elian Karel", "target": "Protectors of Kronos (POK)", "relation": "Martyr figure"},
+@bp.route('/article/<doc_id>')
+def article(doc_id):
+    # doc_id is the store's id for the article, a hash of its text and metadata, so it names the
+    # same article whatever was ingested since the report was drawn; a 404 means it was removed
+    embedding_matrix.ensure_loaded(services.ingested_document_store())
+    found = embedding_matrix.article(doc_id)
+    if found is None:
+        return jsonify({"error": "No such article, regenerate the report"}), 404
+    return jsonify(found)
 
-    # Government collaboration with GAStech
-    {"source": "President Dorel Kapelou II", "target": "Sten Sanjorge Jr", "relation": "Attended events with"},
-    {"source": "President Dorel Kapelou II", "target": "GAStech International", "relation": "Kleptocracy ties"},
 
-    # Ministerial action
-    {"source": "Cesare Nespola", "target": "Dr. Ronald Gerald", "relation": "Licensed oncologist"},
+@bp.route('/ready')
+def ready():
+    # e.g. /ready?require=answer_pipeline to only check what /llm_query needs
+    required = [name for name in request.args.get('require', '').split(',') if name]
+    is_ready, statuses = services.readiness(required)
+    return jsonify({"ready": is_ready, "services": statuses}), (200 if is_ready else 503)
 
-    # Media coverage
-    {"source": "Haneson Ngohebo", "target": "Sten Sanjorge Jr", "relation": "Reported on"},
-    {"source": "Sara Tuno", "target": "Sten Sanjorge Jr", "relation": "Reported on"},
-    {"source": "Haneson Ngohebo", "target": "Edvard Vann", "relation": "Reported on"},
-    {"source": "Haneson Ngohebo", "target": "President Dorel Kapelou II", "relation": "Reported on"},
 
-    # Homeland Illumination
-    {"source": "Petrus Gerhard", "target": "Maha Salo", "relation": "Colleague"},
+@bp.route('/people_data')
+def people_data():
+    # ?center=<id>&hops=<k> returns only the k-hop neighbourhood of one node, and min_weight
+    # drops co-occurrence links seen in fewer documents. Curated links are always included.
+    center = request.args.get('center')
+    if center is not None and center not in entity_graph.node_by_id:
+        return jsonify({"error": f"Unknown entity {center}"}), 404
+    return jsonify(entity_graph.subgraph(center=center,
+                                         hops=number_arg(request.args, 'hops', 1),
+                                         min_weight=number_arg(request.args, 'min_weight', DEFAULT_MIN_WEIGHT)))
+
+
+@bp.route('/people_evidence')
+def people_evidence():
+    # The documents behind a co-occurrence link
+    return jsonify(entity_graph.link_evidence(request.args.get('source', ''), request.args.get('target', '')))
+
+
+def number_arg(values, name, default, kind=int):
+    # A non-negative int (or float) from the query string or a JSON body; a missing or empty value
+    # gives default, anything else that isn't a non-negative number aborts the request with a 400
+    value = values.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        number = kind(value)
+    except (TypeError, ValueError, OverflowError):
+        number = None
+    if number is None or not math.isfinite(number) or number < 0:
+        abort(make_response(jsonify({"error": f"{name} must be a non-negative {kind.__name__}"}), 400))
+    return number
+
+
+def date_window():
+    # ?start=&end= as ISO dates (YYYY-MM-DD); raises ValueError if either is malformed
+    return [date.fromisoformat(request.args[name]).isoformat() if request.args.get(name) else None
+            for name in ('start', 'end')]
+
+
+@bp.route('/bias_data')
+def bias_data():
+    # Sentiment and mention counts per entity and outlet, in the shape of the old static/data/bias_data.json.
+    # ?start=&end= (YYYY-MM-DD) only count articles published in that range; ?entities=a,b limits the entities.
+    try:
+        start, end = date_window()
+    except ValueError:
+        return jsonify({"error": "start and end must be YYYY-MM-DD dates"}), 400
+    entities = request.args.get('entities')
+    return jsonify(bias_engine.aggregate(start=start, end=end,
+                                         entities=entities.split(',') if entities else None))
+
+
+@bp.route('/search')
+def search():
+    # ?q= terms and "quoted phrases", optionally filtered by ?source=<outlet>[,<outlet>...] and
+    # ?start=&end= publication dates (YYYY-MM-DD), best matches first
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "Missing q"}), 400
+    try:
+        start, end = date_window()
+    except ValueError:
+        return jsonify({"error": "start and end must be YYYY-MM-DD dates"}), 400
+    sources = request.args.get('source')
+    started = time.perf_counter()
+    results = search_index.search(query,
+                                  sources=set(sources.split(',')) if sources else None,
+                                  start=start, end=end,
+                                  limit=number_arg(request.args, 'limit', 10))
+    return jsonify({"query": query, **results, "took_ms": round((time.perf_counter() - started) * 1000, 2)})
+
+
+@bp.route('/derivatives')
+def derivatives():
+    # Near-duplicate article pairs with estimated Jaccard similarity and which one was published first.
+    # ?min_jaccard= (default 0.5), ?source=<outlet> for pairs involving one outlet, ?limit= pairs.
+    return jsonify(near_duplicates.derivatives(min_jaccard=number_arg(request.args, 'min_jaccard', DEFAULT_MIN_JACCARD, float),
+                                               source=request.args.get('source') or None,
+                                               limit=number_arg(request.args, 'limit', None)))
+
+
+@bp.route('/timeline_data')
+def timeline_data():
+    # Articles per outlet per ?bucket=day|week|month|year (default month) over ?start=&end= (YYYY-MM-DD),
+    # for ?source=<outlet>[,<outlet>...]. ?articles=<n> also lists the first n articles in the range.
+    bucket = request.args.get('bucket', 'month')
+    if bucket not in BUCKETS:
+        return jsonify({"error": f"bucket must be one of {', '.join(BUCKETS)}"}), 400
+    try:
+        start, end = [date.fromisoformat(value) if value else None for value in date_window()]
+    except ValueError:
+        return jsonify({"error": "start and end must be YYYY-MM-DD dates"}), 400
+    sources = request.args.get('source')
+    return jsonify(publication_index.timeline(start=start, end=end, bucket=bucket,
+                                              sources=set(sources.split(',')) if sources else None,
+                                              articles_limit=number_arg(request.args, 'articles', 0)))
+
+
+def email_window():
+    # ?start=&end= as epoch seconds or ISO dates; raises ValueError if either is malformed
+    return parse_time(request.args.get('start')), parse_time(request.args.get('end'))
+
+
+EMAIL_WINDOW_ERROR = "start and end must be epoch seconds or ISO dates"
+
+
+@bp.route('/email/people')
+def email_people():
+    return jsonify(email_store.people_summary())
+
+
+@bp.route('/email/graph')
+def email_graph():
+    # Who emailed whom, between start and end (epoch seconds or ISO dates), for pairs with
+    # at least min_count emails
+    try:
+        start, end = email_window()
+    except ValueError:
+        return jsonify({"error": EMAIL_WINDOW_ERROR}), 400
+    return jsonify(email_store.graph(start, end, number_arg(request.args, 'min_count', 1)))
+
+
+@bp.route('/email/ego/<name>')
+def email_ego(name):
+    try:
+        start, end = email_window()
+    except ValueError:
+        return jsonify({"error": EMAIL_WINDOW_ERROR}), 400
+    ego = email_store.ego_network(name, start, end, number_arg(request.args, 'min_count', 1))
+    if ego is None:
+        return jsonify({"error": f"No emails for {name}"}), 404
+    return jsonify(ego)
+
+
+@bp.route('/email/top_correspondents/<name>')
+def email_top_correspondents(name):
+    try:
+        start, end = email_window()
+    except ValueError:
+        return jsonify({"error": EMAIL_WINDOW_ERROR}), 400
+    top = email_store.top_correspondents(name, number_arg(request.args, 'n', 10), start, end)
+    if top is None:
+        return jsonify({"error": f"No emails for {name}"}), 404
+    return jsonify(top)
+
+
+@bp.route('/email/volume')
+def email_volume():
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in BUCKET_SECONDS:
+        return jsonify({"error": f"bucket must be one of {sorted(BUCKET_SECONDS)}"}), 400
+    try:
+        start, end = email_window()
+    except ValueError:
+        return jsonify({"error": EMAIL_WINDOW_ERROR}), 400
+    return jsonify(email_store.volume(start, end, bucket, request.args.get('person')))
+
+
+@bp.route('/resume_text/<name>')
+def resume_text(name):
+    return jsonify({"text": resume_index.text(name) or ""})
 
-    # Expert commentary
-    {"source": "John Rathburn", "target": "Protectors of Kronos (POK)", "relation": "Assessed risk from"},
 
-    # Government collaborations
-    {"source": "Tethyn Federal Law Enforcement", "target": "Abila Police", "relation": "Assists"},
-    {"source": "Tethyn Ministry of Foreign Affairs", "target": "Abila Police", "relation": "Assists"},
+@bp.route('/resumes')
+def resumes():
+    # Several resumes in one request: /resumes?names=Ada Campo-Corrente,Axel Calzas. Names without
+    # a resume are left out.
+    names = [name for name in request.args.get('names', '').split(',') if name.strip()]
+    return jsonify({"resumes": resume_index.texts(names)})
 
-    # Miscellaneous citizen protest
-    {"source": "Jon L.", "target": "Kronos Government", "relation": "Critical of"},
-    {"source": "Jon L.", "target": "GAStech International", "relation": "Critical of"},
 
-    # GAStech internal
-    {"source": "Sten Sanjorge Jr", "target": "Sten Sanjorge Sr", "relation": "Son of"},
-    {"source": "Ingrid Barranco", "target": "GAStech International", "relation": "CFO"},
-    {"source": "Ada Campo-Corrente", "target": "GAStech International", "relation": "CIO"},
-    {"source": "Orhan Strum", "target": "GAStech International", "relation": "COO"},
-    {"source": "Willem Vasco-Pais", "target": "GAStech International", "relation": "Environmental Officer"},
-]
 
 
-@app.route('/people_data')
-def people_data():
-    return jsonify({"nodes": nodes, "links": links})
+# --- Start the App ---
 
+def create_app(warmup=None):
+    # warmup (default: the WARMUP environment variable, else "background") says when the Gemini
+    # pipeline, the Chroma stores and ingestion are built: "background" on a thread so pages that
+    # don't need them are served straight away, "lazy" on first use, or "eager" before returning,
+    # which is what a preloading server wants so its workers inherit everything ready-made.
+    app = Flask(__name__, static_folder='static', template_folder='templates')
+    app.register_blueprint(bp)
 
-@app.route('/resume_text/<name>')
-def resume_text(name):
-    filename = f"Resume-{name}.txt"
-    print(filename)
-    path = os.path.join("sources", "Resumes", filename)
-    if os.path.exists(path):
-        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-            return jsonify({"text": f.read()})
-    return jsonify({"text": ""})
+    # Request timings, per-stage timers and counters for /metrics. Set PROFILING=1 to let a request
+    # sent with "X-Profile: 1" be stack-sampled into cache/profiles/.
+    metrics.init_app(app, CACHE_DIR / 'profiles', allow_profiling=os.environ.get('PROFILING') == '1')
 
+    warmup = warmup or os.environ.get('WARMUP', 'background')
+    if warmup == 'background':
+        services.start_background_warmup()
+    elif warmup == 'eager':
+        services.warm_up()
+    return app
 
 
+def reset_after_fork():
+    # Sqlite and Chroma connections must not be shared between processes, so each forked worker
+    # opens its own. The models and in-memory indexes are kept.
+    llm_cache.answers.reopen()
+    services.reset_after_fork()
 
-# --- Start the App ---
 
 if __name__ == '__main__':
-    app.run(debug=True, use_reloader=False)
+    create_app().run(debug=True, use_reloader=False, threaded=True)
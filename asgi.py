@@ -0,0 +1,12 @@
+import os
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import create_app
+
+# For an ASGI server, e.g. `uvicorn asgi:app`, with a single worker: uvicorn imports the app in each
+# worker separately, so with --workers every worker would load the models and ingest the corpus
+# into the same stores at once. For several processes use gunicorn and wsgi.py, which warms up
+# once before forking. The Flask views still run on asgiref's thread pool; LLM calls go through
+# the same bounded executor as under WSGI.
+app = WsgiToAsgi(create_app(warmup=os.environ.get('WARMUP', 'eager')))
@@ -0,0 +1,120 @@
+"""
+Measures article embedding throughput (documents per second) for each embedding backend.
+
+    python benchmarks/embedding_throughput.py --backends sentence-transformers,onnx,onnx-int8 --limit 500
+    python benchmarks/embedding_throughput.py --corpus benchmarks/.work/scale-1 --backends stub
+
+Every backend embeds the same articles, with the same text the app embeds (the body alone; see
+make_doc_embedder in ingest.py), three ways: "cold" with an empty embedding cache, "warm" with
+the cache those embeddings filled, and, with --haystack, as the app used to before backends were
+selectable: one SentenceTransformersDocumentEmbedder.run call with default settings. Model loading is timed
+separately. When sentence-transformers is among the backends, the others also report their
+mean cosine similarity to its embeddings, to show what quantization costs in accuracy.
+"""
+from pathlib import Path
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from corpus import ARTICLE_METADATA, article_files, parse_article, read_article
+from embedding_backend import BACKENDS, MODEL, BatchEmbedder, EmbeddingCache, backend_name, document_text
+from haystack import Document
+
+
+def load_documents(articles_dir, limit):
+    docs = []
+    for file_path in article_files(articles_dir):
+        meta, content = parse_article(read_article(file_path))
+        docs.append(Document(content=content, meta=meta))
+        if limit and len(docs) >= limit:
+            break
+    return docs
+
+
+def rate(count, seconds):
+    return round(count / seconds, 1) if seconds else None
+
+
+def measure_backend(backend, texts, cache_dir):
+    embedder = BatchEmbedder(backend, cache=EmbeddingCache(Path(cache_dir) / f"{backend}.sqlite"))
+    start = time.perf_counter()
+    embedder.load()
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectors = embedder.embed(texts)
+    cold_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    embedder.embed(texts)
+    warm_seconds = time.perf_counter() - start
+    return {"load_seconds": round(load_seconds, 2),
+            "cold_seconds": round(cold_seconds, 2),
+            "cold_docs_per_second": rate(len(texts), cold_seconds),
+            "warm_seconds": round(warm_seconds, 3),
+            "warm_docs_per_second": rate(len(texts), warm_seconds)}, np.array(vectors)
+
+
+def measure_haystack(docs):
+    from haystack.components.embedders import SentenceTransformersDocumentEmbedder
+
+    embedder = SentenceTransformersDocumentEmbedder(model=MODEL, meta_fields_to_embed=ARTICLE_METADATA,
+                                                    progress_bar=False)
+    start = time.perf_counter()
+    embedder.warm_up()
+    load_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    embedder.run(docs)
+    seconds = time.perf_counter() - start
+    return {"load_seconds": round(load_seconds, 2),
+            "cold_seconds": round(seconds, 2),
+            "cold_docs_per_second": rate(len(docs), seconds)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding backends by documents per second")
+    parser.add_argument('--corpus', default='.', help="directory holding 'News Articles/'")
+    parser.add_argument('--backends', default=None, help=f"comma-separated, from {BACKENDS} (default: EMBEDDER_BACKEND)")
+    parser.add_argument('--limit', type=int, default=0, help="embed only the first n articles")
+    parser.add_argument('--haystack', action='store_true', help="also time the plain SentenceTransformersDocumentEmbedder")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    docs = load_documents(Path(args.corpus) / 'News Articles', args.limit)
+    texts = [document_text(doc, ARTICLE_METADATA) for doc in docs]
+    backends = args.backends.split(',') if args.backends else [backend_name()]
+    results = {"documents": len(docs), "cpus": os.cpu_count(), "backends": {}}
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        vectors = {}
+        for backend in backends:
+            results["backends"][backend], vectors[backend] = measure_backend(backend, texts, cache_dir)
+        if 'sentence-transformers' in vectors:
+            reference = vectors['sentence-transformers']
+            for backend, matrix in vectors.items():
+                if backend != 'sentence-transformers' and backend != 'stub':
+                    cosine = (reference * matrix).sum(axis=1) / (np.linalg.norm(reference, axis=1) * np.linalg.norm(matrix, axis=1))
+                    results["backends"][backend]["mean_cosine_to_sentence_transformers"] = round(float(cosine.mean()), 4)
+    if args.haystack:
+        results["backends"]["haystack-default"] = measure_haystack(docs)
+
+    print(f"{len(docs)} articles, {os.cpu_count()} CPUs")
+    baseline = results["backends"].get("haystack-default", results["backends"].get(backends[0]))
+    for backend, stats in results["backends"].items():
+        speedup = (stats["cold_docs_per_second"] or 0) / (baseline["cold_docs_per_second"] or float('inf'))
+        print(f"  {backend:22s} load {stats['load_seconds']:7.2f}s  cold {stats['cold_docs_per_second']:>9} docs/s"
+              f"  ({speedup:5.2f}x)  warm {stats.get('warm_docs_per_second', '-'):>9} docs/s")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
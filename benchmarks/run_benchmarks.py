@@ -0,0 +1,224 @@
+"""
+Benchmarks the app's hot paths on synthetic corpora at several scales.
+
+    python benchmarks/run_benchmarks.py --scales 1,10,100 --output benchmarks/results/$(git rev-parse --short HEAD).json
+    python benchmarks/run_benchmarks.py --scales 1 --compare benchmarks/results/<older>.json
+
+For each scale a corpus is generated (once, under --workdir) and a fresh worker process runs the
+app from inside it with a cold cache: it times each startup step (embedding and ingesting the
+corpus), then drives the Flask test client against each endpoint. Gemini and the sentence
+embedders are replaced by the offline stubs (LLM_BACKEND=stub, EMBEDDER_BACKEND=stub), so the numbers
+measure this code rather than the network or the model.
+
+Each endpoint reports its first (cold) call and latency percentiles over --iterations further
+calls, the response size, and the process's peak RSS so far. The "cold" variants reset the
+relevant in-memory cache before every call, to measure the work the cache normally saves.
+"""
+from pathlib import Path
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from synthetic_corpus import generate_corpus
+
+STUB_ENV = {"LLM_BACKEND": "stub", "EMBEDDER_BACKEND": "stub", "WARMUP": "lazy",
+            "STUB_TOKEN_DELAY": "0", "STUB_FIRST_TOKEN_DELAY": "0",
+            "ANONYMIZED_TELEMETRY": "False"}
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def timed(call):
+    start = time.perf_counter()
+    response = call()
+    return (time.perf_counter() - start) * 1000, response
+
+
+def measure(call, iterations, reset=None):
+    # call() returns a test-client response; reset(), if given, runs untimed before every call
+    if reset is not None:
+        reset()
+    first_ms, response = timed(call)
+    samples = []
+    for _ in range(iterations):
+        if reset is not None:
+            reset()
+        elapsed, response = timed(call)
+        samples.append(elapsed)
+    samples = np.array(samples) if samples else np.array([first_ms])
+    return {"status": response.status_code,
+            "first_ms": round(first_ms, 2),
+            "p50_ms": round(float(np.percentile(samples, 50)), 2),
+            "p90_ms": round(float(np.percentile(samples, 90)), 2),
+            "p99_ms": round(float(np.percentile(samples, 99)), 2),
+            "mean_ms": round(float(samples.mean()), 2),
+            "iterations": len(samples),
+            "payload_bytes": len(response.get_data()),
+            "peak_rss_mb": peak_rss_mb()}
+
+
+def run_worker(corpus_dir, iterations, cold_iterations):
+    # Runs inside the generated corpus: every path the app uses is relative to the working directory
+    os.chdir(corpus_dir)
+    results = {"startup": {}, "endpoints": {}}
+
+    import_ms, _ = timed(lambda: __import__('app'))
+    import app as app_module
+    import services
+    from embedding_backend import shared_embedder
+    results["startup"]["import_app_ms"] = round(import_ms, 2)
+    for service in services.ALL_SERVICES:
+        elapsed, _ = timed(service.get)
+        results["startup"][f"{service.name}_ms"] = round(elapsed, 2)
+    results["startup"]["peak_rss_mb"] = peak_rss_mb()
+    results["startup"]["embedding"] = shared_embedder().throughput()
+
+    client = app_module.create_app().test_client()
+    outlets = sorted(os.listdir(app_module.NEWS_SOURCES_DIR))
+    queries = iter(range(10 ** 9))
+
+    def post(path, body):
+        return lambda: client.post(path, json=body)
+
+    def llm(mode, folders):
+        # A new question every call, so the answer cache never hits
+        return lambda: client.post('/llm_query', json={"query": f"What happened to resource {next(queries)}?",
+                                                       "folders": folders, "mode": mode})
+
+    def reset_term_index():
+        app_module.term_index.files.clear()
+        app_module.term_index.folder_totals.clear()
+
+    endpoints = results["endpoints"]
+    wordcloud = post('/wordcloud', {"folders": app_module.FOLDERS, "words": 50})
+    endpoints["wordcloud_cold"] = measure(wordcloud, cold_iterations, reset=reset_term_index)
+    endpoints["wordcloud"] = measure(wordcloud, iterations)
+
+    endpoints["llm_query_full_cold_context"] = measure(llm("full", ["Resumes"]), cold_iterations,
+                                                       reset=app_module.llm_cache.contexts.clear)
+    endpoints["llm_query_full"] = measure(llm("full", ["Resumes"]), iterations)
+    endpoints["llm_query_retrieval"] = measure(llm("retrieval", [app_module.NEWS_FOLDER, "Resumes"]), iterations)
+
+    similarity = post('/generate_similarity_report', {"sources": outlets})
+    endpoints["similarity_report_cold"] = measure(similarity, cold_iterations,
+                                                  reset=app_module.embedding_matrix.projections.clear)
+    endpoints["similarity_report"] = measure(similarity, iterations)
+    endpoints["similarity_report_one_outlet"] = measure(post('/generate_similarity_report', {"sources": outlets[:1]}), iterations)
+
+    for name, path in [("bias_data", "/bias_data"),
+                       ("search", "/search?q=government%20protest"),
+                       ("search_phrase", "/search?q=%22the%20government%22&start=2014-01-01"),
+                       ("timeline_data", "/timeline_data?bucket=month"),
+                       ("derivatives", "/derivatives?limit=100"),
+                       ("people_data", "/people_data"),
+                       ("email_graph", "/email/graph?min_count=5")]:
+        endpoints[name] = measure(lambda: client.get(path), iterations)
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def run_scale(scale, args):
+    corpus_dir = generate_corpus(Path(args.workdir) / f"scale-{scale}", scale, args.seed)
+    # Start every run from a cold cache and an empty vector store
+    for generated in ['cache', 'vectors']:
+        shutil.rmtree(corpus_dir / generated, ignore_errors=True)
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        result_path = f.name
+    command = [sys.executable, str(Path(__file__).resolve()), '--worker', str(corpus_dir),
+               '--result', result_path, '--iterations', str(args.iterations),
+               '--cold-iterations', str(args.cold_iterations)]
+    print(f"Scale {scale}x: running in {corpus_dir}")
+    subprocess.run(command, env={**os.environ, **STUB_ENV}, check=True,
+                   stdout=None if args.verbose else subprocess.DEVNULL)
+    with open(result_path, 'r', encoding='utf-8') as f:
+        result = json.load(f)
+    os.remove(result_path)
+    articles = sum(1 for _ in (corpus_dir / 'News Articles').glob('*/*.txt'))
+    result["corpus"] = {"scale": scale, "articles": articles,
+                        "bytes": sum(p.stat().st_size for p in corpus_dir.rglob('*.txt'))}
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline):
+    # p50 per endpoint and startup step, baseline vs current, for the scales both runs have
+    for scale, result in current["scales"].items():
+        old = baseline["scales"].get(scale)
+        if old is None:
+            continue
+        print(f"\nScale {scale}x (baseline {str(baseline.get('commit'))[:10]} -> {str(current.get('commit'))[:10]})")
+        rows = [(f"startup.{step}", old["startup"].get(step), value)
+                for step, value in result["startup"].items() if step.endswith('_ms')]
+        rows += [(name, old["endpoints"].get(name, {}).get("p50_ms"), stats["p50_ms"])
+                 for name, stats in result["endpoints"].items()]
+        for name, before, after in rows:
+            change = f"{after / before:6.2f}x" if before else "     -"
+            print(f"  {name:38s} {before if before is not None else '-':>12} {after:>12} {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the app on synthetic corpora")
+    parser.add_argument('--scales', default='1,10,100', help="comma-separated corpus multiples")
+    parser.add_argument('--iterations', type=int, default=20, help="timed calls per endpoint")
+    parser.add_argument('--cold-iterations', type=int, default=3, help="timed calls per cache-reset endpoint")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', default=str(REPO_ROOT / 'benchmarks' / '.work'))
+    parser.add_argument('--output', default=str(REPO_ROOT / 'benchmarks' / 'results' / 'latest.json'))
+    parser.add_argument('--compare', help="an earlier results file to compare against")
+    parser.add_argument('--verbose', action='store_true', help="show the app's own output")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(args.worker, args.iterations, args.cold_iterations)
+        with open(args.result, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        return
+
+    results = {"commit": git_commit(),
+               "created": time.strftime('%Y-%m-%dT%H:%M:%S'),
+               "python": platform.python_version(),
+               "platform": platform.platform(),
+               "cpus": os.cpu_count(),
+               "iterations": args.iterations,
+               "scales": {}}
+    for scale in [int(scale) for scale in args.scales.split(',')]:
+        results["scales"][str(scale)] = run_scale(scale, args)
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
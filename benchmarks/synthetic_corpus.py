@@ -0,0 +1,179 @@
+"""
+Generates a synthetic corpus laid out like the real one, at any multiple of its size:
+
+    News Articles/<outlet>/<n>.txt   SOURCE/TITLE/AUTHOR/PUBLISHED/LOCATION headers, then the body
+    sources/Resumes/*.txt            free text
+    sources/Historical_Documents/*.txt
+    sources/email_headers.csv        From,To,Date,Subject
+
+Scale 1 matches the real corpus (29 outlets, ~845 articles of ~150 words, 26 resumes, ~1175
+emails between ~55 people); scale n has n times as many outlets, documents, emails and people.
+A share of the articles are light rewrites of another outlet's article, and the PUBLISHED dates
+use the same mix of formats as the real articles, so every index has realistic work to do.
+"""
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import argparse
+import calendar
+import csv
+import json
+import random
+import shutil
+import sys
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from bias_engine import POSITIVE_WORDS, NEGATIVE_WORDS
+from entities import NODES, BIAS_ENTITIES
+
+OUTLETS_PER_SCALE = 29
+ARTICLES_PER_OUTLET = 29
+RESUMES_PER_SCALE = 26
+HISTORICAL_PER_SCALE = 6
+EMAILS_PER_SCALE = 1175
+PEOPLE_PER_SCALE = 55
+# Share of articles that are a lightly edited copy of an earlier article from another outlet
+DERIVATIVE_SHARE = 0.2
+# Share of articles whose PUBLISHED line holds a byline instead of a date
+UNDATED_SHARE = 0.05
+
+COMMON_WORDS = ["the", "of", "and", "to", "in", "a", "is", "that", "for", "on", "was", "with", "as", "by",
+                "at", "from", "his", "her", "said", "has", "have", "were", "not", "their", "which", "an",
+                "government", "police", "city", "company", "people", "officials", "today", "year", "abila",
+                "kronos", "tethys", "gas", "protest", "report", "minister", "employees", "water", "elodis"]
+SYLLABLES = ["ka", "ro", "ne", "ti", "sa", "lo", "mi", "ve", "da", "ru", "po", "te", "zi", "an", "el",
+             "or", "um", "is", "ba", "go"]
+ENTITY_NAMES = [node['id'] for node in NODES] + [alias for aliases in BIAS_ENTITIES.values() for alias in aliases]
+DATE_FORMATS = [lambda d: d.strftime('%Y/%m/%d'),
+                lambda d: f"{d.day} {calendar.month_name[d.month]} {d.year}",
+                lambda d: f"{calendar.month_name[d.month]} {d.day}, {d.year}"]
+CORPUS_VERSION = 1
+
+
+class WordSampler:
+    # Zipf-distributed words: a few hundred common ones, a long tail of made-up ones, sentiment
+    # words and entity names mixed in at a realistic rate
+
+    def __init__(self, rng, vocabulary_size=4000):
+        self.rng = rng
+        made_up = set()
+        while len(made_up) < vocabulary_size:
+            made_up.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+        tail = sorted(POSITIVE_WORDS) + sorted(NEGATIVE_WORDS) + sorted(made_up)
+        rng.shuffle(tail)
+        self.words = COMMON_WORDS + tail
+        cumulative = 0.0
+        self.cum_weights = []
+        for rank in range(1, len(self.words) + 1):
+            cumulative += 1.0 / rank
+            self.cum_weights.append(cumulative)
+
+    def sentence(self):
+        words = self.rng.choices(self.words, cum_weights=self.cum_weights, k=self.rng.randint(8, 24))
+        if self.rng.random() < 0.3:
+            words.insert(self.rng.randrange(len(words)), self.rng.choice(ENTITY_NAMES))
+        return " ".join(words).capitalize() + "."
+
+    def text(self, n_words):
+        sentences = []
+        while sum(len(sentence.split()) for sentence in sentences) < n_words:
+            sentences.append(self.sentence())
+        paragraphs = [" ".join(sentences[i:i + 4]) for i in range(0, len(sentences), 4)]
+        return "\n\n".join(paragraphs)
+
+
+def rewrite(rng, sampler, body, edit_rate=0.1):
+    # A "derivative" article: the same text with about edit_rate of the words swapped
+    words = body.split(" ")
+    for i in range(len(words)):
+        if rng.random() < edit_rate and "\n" not in words[i]:
+            words[i] = rng.choice(sampler.words[:500])
+    return " ".join(words)
+
+
+def random_date(rng):
+    # Mostly 2014 coverage with a long tail of older articles, like the real corpus
+    if rng.random() < 0.3:
+        return date(2014, 1, 1) + timedelta(days=rng.randrange(85))
+    return date(1982, 1, 1) + timedelta(days=rng.randrange(365 * 32))
+
+
+def write_articles(root, rng, sampler, scale):
+    outlets = [f"Synthetic Outlet {i:04d}" for i in range(OUTLETS_PER_SCALE * scale)]
+    published = []
+    article_id = 0
+    for outlet in outlets:
+        (root / 'News Articles' / outlet).mkdir(parents=True)
+        for _ in range(ARTICLES_PER_OUTLET):
+            article_id += 1
+            if published and rng.random() < DERIVATIVE_SHARE:
+                original_date, title, original_body = rng.choice(published)
+                day = original_date + timedelta(days=rng.randint(0, 3))
+                body = rewrite(rng, sampler, original_body)
+            else:
+                day = random_date(rng)
+                title = " ".join(sampler.rng.choices(sampler.words[:800], k=rng.randint(4, 9))).upper()
+                body = sampler.text(max(12, int(rng.lognormvariate(4.8, 0.6))))
+                published.append((day, title, body))
+            if rng.random() < UNDATED_SHARE:
+                published_line = f"By {sampler.sentence().split()[0]} {rng.choice(SYLLABLES).capitalize()}"
+            else:
+                published_line = rng.choice(DATE_FORMATS)(day)
+            header = (f"SOURCE: {outlet}\nTITLE: {title}\nAUTHOR: {rng.choice(SYLLABLES).capitalize()} "
+                      f"{rng.choice(SYLLABLES).capitalize()}\nPUBLISHED: {published_line}\n\nLOCATION: ABILA, Kronos\n\n")
+            (root / 'News Articles' / outlet / f"{article_id}.txt").write_text(header + body + "\n", encoding='utf-8')
+    return outlets
+
+
+def write_sources(root, rng, sampler, scale):
+    (root / 'sources' / 'Resumes').mkdir(parents=True)
+    (root / 'sources' / 'Historical_Documents').mkdir(parents=True)
+    for i in range(RESUMES_PER_SCALE * scale):
+        (root / 'sources' / 'Resumes' / f"Resume-Person{i:05d}.txt").write_text(sampler.text(rng.randint(60, 250)), encoding='utf-8')
+    for i in range(HISTORICAL_PER_SCALE * scale):
+        (root / 'sources' / 'Historical_Documents' / f"Document{i:04d}.txt").write_text(sampler.text(rng.randint(300, 1500)), encoding='utf-8')
+
+
+def write_emails(root, rng, sampler, scale):
+    people = [f"Person{i:05d}.Employee@gastech.com.kronos" for i in range(PEOPLE_PER_SCALE * scale)]
+    start = datetime(2014, 1, 6, 8, 0)
+    with open(root / 'sources' / 'email_headers.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["From", "To", "Date", "Subject"])
+        for _ in range(EMAILS_PER_SCALE * scale):
+            # People mostly write to a neighbourhood of colleagues, so the graph has structure
+            sender = rng.randrange(len(people))
+            recipients = {(sender + rng.randint(-8, 8)) % len(people) for _ in range(rng.randint(1, 5))}
+            sent = start + timedelta(minutes=rng.randrange(60 * 24 * 12))
+            writer.writerow([people[sender], ", ".join(people[r] for r in sorted(recipients)),
+                             f"{sent.month}/{sent.day}/{sent.year} {sent.hour}:{sent.minute:02d}",
+                             " ".join(rng.choices(sampler.words[:300], k=rng.randint(2, 6))).capitalize()])
+
+
+def generate_corpus(root, scale, seed=0):
+    # Writes the corpus under root, unless one with the same parameters is already there
+    root = Path(root)
+    marker = root / 'corpus.json'
+    params = {"scale": scale, "seed": seed, "version": CORPUS_VERSION}
+    if marker.exists() and json.loads(marker.read_text()) == params:
+        return root
+    if root.exists():
+        shutil.rmtree(root)
+    root.mkdir(parents=True)
+    rng = random.Random(seed * 1000 + scale)
+    sampler = WordSampler(rng)
+    write_articles(root, rng, sampler, scale)
+    write_sources(root, rng, sampler, scale)
+    write_emails(root, rng, sampler, scale)
+    marker.write_text(json.dumps(params))
+    return root
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a synthetic corpus shaped like the real one")
+    parser.add_argument('root')
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(generate_corpus(args.root, args.scale, args.seed))
@@ -0,0 +1,217 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from corpus import HEADER_VERSION, NEWS_SOURCES_DIR, article_files, parse_article, parse_published
+from entity_graph import EntityMatcher
+from term_index import read_text_file
+import metrics
+
+REFRESH_INTERVAL = 30
+
+POSITIVE_WORDS = {
+    "accomplished", "achievement", "admired", "agreement", "applauded", "approve", "approved", "benefit",
+    "benefits", "best", "better", "brave", "celebrate", "celebrated", "celebration", "charity", "committed",
+    "compassion", "confident", "cooperation", "courage", "courageous", "dedicated", "dedication", "deserved",
+    "devoted", "dignity", "donated", "effective", "encourage", "encouraged", "excellent", "fair", "faithful",
+    "friendly", "generous", "good", "great", "grow", "growth", "happy", "help", "helped", "helpful", "hero",
+    "heroic", "honest", "honor", "honored", "honour", "hope", "hopeful", "improve", "improved", "improvement",
+    "innovative", "inspiring", "integrity", "justice", "kind", "leader", "leadership", "legitimate", "loyal",
+    "loved", "peace", "peaceful", "popular", "positive", "praise", "praised", "progress", "prosperity",
+    "prosperous", "protect", "proud", "reform", "relief", "rescued", "respect", "respected", "responsible",
+    "safe", "safety", "secure", "strong", "succeed", "success", "successful", "support", "supported",
+    "supporters", "thank", "thanked", "thriving", "trust", "trusted", "unity", "victory", "welcome",
+    "welcomed", "win", "wise",
+}
+
+NEGATIVE_WORDS = {
+    "abduct", "abducted", "abduction", "accused", "alleged", "angry", "anarchist", "anarchists", "arrest",
+    "arrested", "arson", "attack", "attacked", "bad", "blame", "blamed", "bomb", "bribe", "bribery",
+    "cancer", "chaos", "clash", "conflict", "contaminated", "contamination", "corrupt", "corruption",
+    "crime", "crimes", "criminal", "criminals", "crisis", "damage", "danger", "dangerous", "dead", "death",
+    "deaths", "denied", "destroy", "destroyed", "died", "disaster", "disease", "dispute", "extremist",
+    "extremists", "fail", "failed", "failure", "fear", "fraud", "greed", "guilty", "harm", "hostage",
+    "hostages", "illegal", "illness", "injured", "kidnap", "kidnapped", "kidnapping", "kill", "killed",
+    "lawsuit", "lie", "lies", "militant", "militants", "murder", "negligence", "outrage", "poison",
+    "poisoned", "poisoning", "pollution", "problem", "problems", "radical", "radicals", "ransom", "riot",
+    "scandal", "sick", "suspect", "suspected", "suspects", "terror", "terrorism", "terrorist",
+    "terrorists", "threat", "threaten", "threatened", "toxic", "tragedy", "tragic", "unrest", "vandalism",
+    "victim", "victims", "violence", "violent", "weak", "worse", "worst", "wrong",
+}
+
+NEGATORS = {"no", "not", "never", "nor", "without", "cannot"}
+# A negator flips the weight of this many words after it ("not a terrorist", "never been so successful")
+NEGATION_WINDOW = 3
+
+LEXICON = {**{word: 1.0 for word in POSITIVE_WORDS}, **{word: -1.0 for word in NEGATIVE_WORDS}}
+
+# Squashes a sentence's summed word weights into (-1, 1); larger means more words are needed
+# before a sentence counts as strongly positive or negative
+NORMALIZATION_ALPHA = 15
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n+')
+TOKEN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+
+def split_sentences(text):
+    return [sentence.strip() for sentence in SENTENCE_SPLIT.split(text) if sentence.strip()]
+
+
+def score_sentences(sentences):
+    # Lexicon sentiment for a whole batch of sentences at once: every token is weighted in one
+    # flat array, a weight is flipped when one of the NEGATION_WINDOW tokens before it in the same
+    # sentence is a negator, and the weights are summed per sentence with reduceat.
+    tokens = [TOKEN.findall(sentence.lower()) for sentence in sentences]
+    lengths = np.fromiter((len(sentence_tokens) for sentence_tokens in tokens), dtype=np.int64, count=len(tokens))
+    flat = [token for sentence_tokens in tokens for token in sentence_tokens]
+    scores = np.zeros(len(sentences), dtype=np.float64)
+    if not flat:
+        return scores
+
+    weights = np.fromiter((LEXICON.get(token, 0.0) for token in flat), dtype=np.float64, count=len(flat))
+    negator = np.fromiter((token in NEGATORS or token.endswith("n't") for token in flat), dtype=bool, count=len(flat))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    position = np.arange(len(flat)) - np.repeat(starts, lengths)
+    negated = np.zeros(len(flat), dtype=bool)
+    for k in range(1, NEGATION_WINDOW + 1):
+        negated[k:] |= negator[:-k] & (position[k:] >= k)
+    weights[negated] = -weights[negated]
+
+    nonempty = lengths > 0
+    sums = np.add.reduceat(weights, starts[nonempty])
+    scores[nonempty] = sums / np.sqrt(sums * sums + NORMALIZATION_ALPHA)
+    return scores
+
+
+class BiasEngine:
+    """
+    Sentiment towards each tracked entity in every article under articles_dir: each sentence gets a
+    lexicon score, and an entity's score in an article is the sum over the sentences mentioning it.
+    Per-article results are persisted to index_path and an article is only rescored when its
+    content hash changes. Outlet x entity tables are aggregated from those on request.
+    """
+
+    def __init__(self, entities, index_path, articles_dir=NEWS_SOURCES_DIR, namesakes=()):
+        self.entities = list(entities)
+        # Namesakes are other people whose full names contain an entity's alias; they are matched but not scored
+        self.matcher = EntityMatcher(self.entities, entities, ignored=namesakes)
+        self.index_path = Path(index_path)
+        self.articles_dir = Path(articles_dir)
+        # Scores are only reusable if they were computed with the same lexicon and entities
+        scorer = [sorted(LEXICON.items()), sorted(NEGATORS), NEGATION_WINDOW, NORMALIZATION_ALPHA, sorted(entities.items()), sorted(namesakes), HEADER_VERSION]
+        self.scorer_version = hashlib.sha256(json.dumps(scorer).encode('utf-8')).hexdigest()
+        self.lock = threading.Lock()
+        self.articles = {}
+        self.sources = []
+        self.last_refresh = 0
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                if index.get('version') == self.scorer_version:
+                    self.articles = index['articles']
+            except (OSError, ValueError, KeyError):
+                self.articles = {}
+
+    def save(self):
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": self.scorer_version, "articles": self.articles}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def score_articles(self, pending):
+        # pending: [(key, stat, text, sha256)]. All of their sentences are scored in one batch.
+        parsed = []
+        batch = []
+        for key, stat, text, sha256 in pending:
+            meta, body = parse_article(text)
+            sentences = split_sentences(meta.get('title', '') + '.\n' + body)
+            parsed.append((key, stat, sha256, meta, len(batch), sentences))
+            batch.extend(sentences)
+        scores = score_sentences(batch)
+
+        for key, stat, sha256, meta, offset, sentences in parsed:
+            mentions = {}
+            sentiment = {}
+            for i, sentence in enumerate(sentences):
+                for entity, count in self.matcher.count_mentions(sentence).items():
+                    mentions[entity] = mentions.get(entity, 0) + count
+                    total, n = sentiment.get(entity, (0.0, 0))
+                    sentiment[entity] = (total + float(scores[offset + i]), n + 1)
+            published = parse_published(meta.get('published', ''))
+            self.articles[key] = {"mtime": stat.st_mtime,
+                                  "size": stat.st_size,
+                                  "sha256": sha256,
+                                  "source": Path(key).parent.name,
+                                  "published": published.isoformat() if published else None,
+                                  "mentions": mentions,
+                                  "sentiment": {entity: list(value) for entity, value in sentiment.items()}}
+
+    def refresh(self, force=False):
+        with self.lock:
+            if not force and self.sources and time.time() - self.last_refresh < REFRESH_INTERVAL:
+                return
+            changed = False
+            seen = set()
+            pending = []
+            for file_path in article_files(self.articles_dir):
+                key = file_path.as_posix()
+                seen.add(key)
+                stat = file_path.stat()
+                entry = self.articles.get(key)
+                if entry is not None and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+                    continue
+                text = read_text_file(file_path)
+                sha256 = hashlib.sha256(text.encode('utf-8', errors='ignore')).hexdigest()
+                if entry is not None and entry['sha256'] == sha256:
+                    # Touched but not edited: keep the scores
+                    entry['mtime'], entry['size'] = stat.st_mtime, stat.st_size
+                else:
+                    pending.append((key, stat, text, sha256))
+                changed = True
+            for key in [key for key in self.articles if key not in seen]:
+                del self.articles[key]
+                changed = True
+
+            if pending:
+                metrics.DOCUMENTS.inc(len(pending), stage="bias_score")
+                with metrics.stage("bias_score"):
+                    self.score_articles(pending)
+            if changed:
+                self.save()
+            self.sources = sorted({Path(key).parent.name for key in seen})
+            self.last_refresh = time.time()
+
+    def aggregate(self, start=None, end=None, entities=None):
+        # {"sources", "sentiment": {entity: {outlet: mean sentence score}}, "mentions": {entity: {outlet: count}}}
+        # over articles published in [start, end] (ISO dates). Articles without a readable date are
+        # only included when no range is given. Outlets that never mention an entity get no sentiment.
+        self.refresh()
+        entities = self.entities if entities is None else [entity for entity in entities if entity in self.entities]
+        mentions = {entity: {source: 0 for source in self.sources} for entity in entities}
+        totals = {entity: {} for entity in entities}
+        articles = 0
+        for entry in self.articles.values():
+            published = entry['published']
+            if start is not None or end is not None:
+                if published is None or (start is not None and published < start) or (end is not None and published > end):
+                    continue
+            articles += 1
+            source = entry['source']
+            for entity in entities:
+                mentions[entity][source] += entry['mentions'].get(entity, 0)
+                if entity in entry['sentiment']:
+                    total, n = totals[entity].get(source, (0.0, 0))
+                    score, count = entry['sentiment'][entity]
+                    totals[entity][source] = (total + score, n + count)
+
+        sentiment = {entity: {source: round(total / n, 2) for source, (total, n) in sorted(by_source.items())}
+                     for entity, by_source in totals.items()}
+        return {"sources": self.sources, "sentiment": sentiment, "mentions": mentions, "articles": articles}
@@ -0,0 +1,78 @@
+from datetime import date
+from pathlib import Path
+import calendar
+import re
+
+NEWS_SOURCES_DIR = Path('News Articles')
+
+ARTICLE_SOURCE_START = "SOURCE:"
+ARTICLE_TITLE_START = "TITLE:"
+ARTICLE_PUBLISHED_START = "PUBLISHED:"
+ARTICLE_LOCATION_START = "LOCATION:"
+ARTICLE_AUTHOR_START = "AUTHOR:"
+ARTICLE_METADATA = [ARTICLE_SOURCE_START, ARTICLE_TITLE_START, ARTICLE_PUBLISHED_START, ARTICLE_LOCATION_START, ARTICLE_AUTHOR_START]
+
+
+# Bumped whenever parse_article returns different metadata for the same file, so indexes that
+# persist parsed headers know to rebuild
+HEADER_VERSION = 2
+
+
+def parse_article(file_contents):
+    # Pulls the SOURCE/TITLE/PUBLISHED/LOCATION/AUTHOR header lines out of an article,
+    # returning (meta, body) where meta is keyed by the lowercased header name. Some articles
+    # have the byline or title on the PUBLISHED line and the date on the next non-empty line;
+    # then that line is used as the published date.
+    meta = {}
+    all_end_indices = []
+    for metadata_start_token in ARTICLE_METADATA:
+        try:
+            metadata_start_idx = file_contents.index(metadata_start_token)
+            metadata_end_idx = metadata_start_idx + file_contents[metadata_start_idx:].index('\n')
+            metadata_start_idx += len(metadata_start_token)
+            metadata_content = file_contents[metadata_start_idx:metadata_end_idx].strip()
+            if metadata_start_token == 'PUBLISHED:' and parse_published(metadata_content) is None:
+                following = re.match(r'\s*(\S[^\n]*)', file_contents[metadata_end_idx:])
+                if following and parse_published(following[1]) is not None:
+                    metadata_content = following[1].strip()
+                    metadata_end_idx += following.end()
+            meta[metadata_start_token.lower()[:-1]] = metadata_content
+            all_end_indices.append(metadata_end_idx)
+        except ValueError:
+            meta[metadata_start_token.lower()[:-1]] = ""
+
+    content = file_contents[max(all_end_indices, default=0):].strip()
+    return meta, content
+
+
+def read_article(data_file):
+    with open(data_file, 'r', errors='ignore') as f:
+        return f.read()
+
+
+def article_files(articles_dir=NEWS_SOURCES_DIR):
+    return sorted(Path(articles_dir).glob('*/*.txt'))
+
+
+MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): number for number, name in enumerate(calendar.month_abbr) if name})
+
+
+def parse_published(value):
+    # The PUBLISHED header comes as "2005/04/06", "20 January 2014", "20January 2014" or
+    # "October 12, 2013", sometimes with trailing junk. Returns a date, or None if there isn't one
+    # (a few articles have the byline or the title on that line instead).
+    value = value.strip()
+    try:
+        match = re.match(r'(\d{4})/(\d{1,2})/(\d{1,2})', value)
+        if match:
+            return date(int(match[1]), int(match[2]), int(match[3]))
+        match = re.match(r'(\d{1,2})\s*([A-Za-z]+)\.?,?\s+(\d{4})', value)
+        if match and match[2].lower() in MONTHS:
+            return date(int(match[3]), MONTHS[match[2].lower()], int(match[1]))
+        match = re.match(r'([A-Za-z]+)\.?\s+(\d{1,2}),?\s+(\d{4})', value)
+        if match and match[1].lower() in MONTHS:
+            return date(int(match[3]), MONTHS[match[1].lower()], int(match[2]))
+    except ValueError:
+        pass
+    return None
@@ -0,0 +1,185 @@
+from datetime import date, timedelta
+from pathlib import Path
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from corpus import HEADER_VERSION, NEWS_SOURCES_DIR, article_files, parse_article, parse_published, read_article
+
+REFRESH_INTERVAL = 30
+BUCKETS = ["day", "week", "month", "year"]
+
+
+def bucket_start(day, bucket):
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    if bucket == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def next_bucket(day, bucket):
+    # The start of the bucket after day's, or date.max when that would be past the end of the calendar
+    try:
+        if bucket == "week":
+            return day + timedelta(days=7)
+        if bucket == "month":
+            return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+        if bucket == "year":
+            return date(day.year + 1, 1, 1)
+        return day + timedelta(days=1)
+    except (OverflowError, ValueError):
+        return date.max
+
+
+class PublicationIndex:
+    """
+    The PUBLISHED date of every article, parsed once and persisted to index_path (articles are
+    re-read only when their mtime or size changes). In memory the dated articles are kept sorted
+    by day, alongside an outlet x day histogram and its prefix sums, so any bucketed count over any
+    date range is a handful of array subtractions.
+    """
+
+    def __init__(self, index_path, articles_dir=NEWS_SOURCES_DIR):
+        self.index_path = Path(index_path)
+        self.articles_dir = Path(articles_dir)
+        self.lock = threading.Lock()
+        # path -> {"mtime", "size", "title", "source", "published"}
+        self.articles = {}
+        self.last_refresh = 0
+        self.built = False
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                if index.get('header_version') == HEADER_VERSION:
+                    self.articles = index['articles']
+            except (OSError, ValueError, KeyError):
+                self.articles = {}
+
+    def refresh(self, force=False):
+        with self.lock:
+            if not force and self.built and time.time() - self.last_refresh < REFRESH_INTERVAL:
+                return
+            changed = False
+            seen = set()
+            for file_path in article_files(self.articles_dir):
+                key = file_path.as_posix()
+                seen.add(key)
+                stat = file_path.stat()
+                entry = self.articles.get(key)
+                if entry is None or entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size:
+                    meta, _ = parse_article(read_article(file_path))
+                    published = parse_published(meta.get('published', ''))
+                    self.articles[key] = {"mtime": stat.st_mtime,
+                                          "size": stat.st_size,
+                                          "title": meta.get('title', ''),
+                                          "source": file_path.parent.name,
+                                          "published": published.isoformat() if published else None}
+                    changed = True
+            for key in [key for key in self.articles if key not in seen]:
+                del self.articles[key]
+                changed = True
+
+            if changed:
+                self.index_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.index_path.with_suffix('.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({"header_version": HEADER_VERSION, "articles": self.articles}, f)
+                os.replace(tmp_path, self.index_path)
+            if changed or not self.built:
+                self.build()
+            self.last_refresh = time.time()
+
+    def build(self):
+        self.sources = sorted({entry['source'] for entry in self.articles.values()})
+        source_ids = {source: i for i, source in enumerate(self.sources)}
+        dated = sorted((entry['published'], key) for key, entry in self.articles.items() if entry['published'])
+        self.undated = {source: 0 for source in self.sources}
+        for entry in self.articles.values():
+            if not entry['published']:
+                self.undated[entry['source']] += 1
+
+        # Sorted date index: one row per dated article, ordered by publication day
+        self.keys = [key for _, key in dated]
+        self.days = np.array([date.fromisoformat(published).toordinal() for published, _ in dated], dtype=np.int64)
+        self.source_of = np.array([source_ids[self.articles[key]['source']] for key in self.keys], dtype=np.int32)
+
+        # Outlet x day counts from the first to the last publication day, plus prefix sums along days
+        self.first_day = int(self.days[0]) if len(self.days) else date.today().toordinal()
+        n_days = int(self.days[-1]) - self.first_day + 1 if len(self.days) else 0
+        daily = np.zeros((len(self.sources), n_days), dtype=np.int32)
+        np.add.at(daily, (self.source_of, self.days - self.first_day), 1)
+        self.cumulative = np.zeros((len(self.sources), n_days + 1), dtype=np.int64)
+        np.cumsum(daily, axis=1, out=self.cumulative[:, 1:])
+        self.built = True
+
+    def span(self):
+        if not len(self.days):
+            return None, None
+        return date.fromordinal(int(self.days[0])), date.fromordinal(int(self.days[-1]))
+
+    def counts_between(self, rows, start_day, end_day):
+        # Articles per selected outlet published in [start_day, end_day) (ordinals), from the prefix sums
+        n_days = self.cumulative.shape[1] - 1
+        lo = np.clip(start_day - self.first_day, 0, n_days)
+        hi = np.clip(end_day - self.first_day, 0, n_days)
+        return self.cumulative[rows][:, hi] - self.cumulative[rows][:, lo]
+
+    def timeline(self, start=None, end=None, bucket="month", sources=None, articles_limit=0):
+        # Article counts per bucket and outlet over [start, end] (dates; defaults to the whole
+        # corpus), optionally restricted to some outlets, plus up to articles_limit of the articles
+        # themselves in date order. Undated articles can't be placed and are only counted.
+        # The range is clamped to the first and last publication days, so however wide it is asked
+        # for, there are never more buckets than the corpus spans.
+        self.refresh()
+        first, last = self.span()
+        if first is None:
+            start = end = None
+        else:
+            start = max(start or first, first)
+            end = min(end or last, last)
+        selected = self.sources if sources is None else [source for source in self.sources if source in sources]
+        rows = np.array([self.sources.index(source) for source in selected], dtype=np.int64)
+        if start is None or end is None or start > end:
+            return {"bucket": bucket, "buckets": [], "sources": selected, "counts": {}, "total": [],
+                    "undated": {source: self.undated[source] for source in selected}, "articles": []}
+
+        edges = [bucket_start(start, bucket)]
+        while edges[-1] <= end:
+            edges.append(next_bucket(edges[-1], bucket))
+            if edges[-1] == date.max:
+                break
+        ordinals = np.array([edge.toordinal() for edge in edges], dtype=np.int64)
+        # The first and last buckets are clipped to the requested range
+        ordinals[0] = start.toordinal()
+        ordinals[-1] = end.toordinal() + 1
+        counts = self.counts_between(rows, ordinals[:-1], ordinals[1:]) if len(rows) else np.zeros((0, len(edges) - 1), dtype=np.int64)
+
+        articles = []
+        if articles_limit:
+            lo = np.searchsorted(self.days, start.toordinal(), side='left')
+            hi = np.searchsorted(self.days, end.toordinal(), side='right')
+            allowed = set(rows.tolist())
+            for i in range(lo, hi):
+                if int(self.source_of[i]) in allowed:
+                    entry = self.articles[self.keys[i]]
+                    articles.append({"path": self.keys[i], "title": entry['title'], "source": entry['source'],
+                                     "published": entry['published']})
+                    if len(articles) >= articles_limit:
+                        break
+
+        return {"bucket": bucket,
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "buckets": [edge.isoformat() for edge in edges[:-1]],
+                "sources": selected,
+                "counts": {source: counts[i].tolist() for i, source in enumerate(selected)},
+                "total": counts.sum(axis=0).tolist(),
+                "undated": {source: self.undated[source] for source in selected},
+                "articles": articles}
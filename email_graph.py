@@ -0,0 +1,225 @@
+from datetime import datetime, timezone
+from pathlib import Path
+import csv
+import json
+import threading
+
+import numpy as np
+from scipy import sparse
+
+from term_index import read_text_file
+
+# The CSV's dates carry no zone. They are read as UTC, as are ISO dates without one in query
+# strings, so timestamps and the day buckets built on them agree whatever the server's zone is.
+EMAIL_DATE_FORMAT = '%m/%d/%Y %H:%M'
+# Bumped whenever parse_csv produces different columns from the same file
+COLUMNS_VERSION = 2
+BUCKET_SECONDS = {"hour": 3600, "day": 86400, "week": 7 * 86400}
+
+
+def address_to_name(address):
+    # "Sten.Sanjorge Jr.@gastech.com.kronos" -> "Sten Sanjorge Jr", matching the people graph ids
+    local_part = address.strip().split('@')[0]
+    return " ".join(part for part in local_part.replace('.', ' ').split())
+
+
+def parse_time(value):
+    # Accepts epoch seconds or an ISO date/datetime, as passed in query strings; raises ValueError otherwise
+    if value is None or value == "":
+        return None
+    try:
+        return int(float(value))
+    except (ValueError, OverflowError):
+        parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return int(parsed.timestamp())
+
+
+class EmailStore:
+    """
+    email_headers.csv parsed once into typed columns: a timestamp per email, a sender id, and the
+    recipient ids as a CSR-style offsets/ids pair. The columns are cached as an .npz next to a JSON
+    sidecar (people and subjects) and re-parsed only when the CSV's mtime or size changes.
+
+    On top of that sits one edge per (email, recipient), sorted by time, from which sparse
+    sender x recipient count matrices are summed for any time window.
+    """
+
+    def __init__(self, csv_path, cache_dir):
+        self.csv_path = Path(csv_path)
+        self.columns_path = Path(cache_dir) / 'email_columns.npz'
+        self.sidecar_path = Path(cache_dir) / 'email_columns.json'
+        self.lock = threading.Lock()
+        self.signature = None
+        self.full_adjacency = None
+
+    def csv_signature(self):
+        stat = self.csv_path.stat()
+        return [COLUMNS_VERSION, stat.st_mtime, stat.st_size]
+
+    def ensure_loaded(self):
+        signature = self.csv_signature()
+        if signature == self.signature:
+            return
+        with self.lock:
+            if signature == self.signature:
+                return
+            if not self.load_columns(signature):
+                self.parse_csv()
+                self.save_columns(signature)
+            self.build_edges()
+            self.signature = signature
+
+    def parse_csv(self):
+        people = {}
+        timestamps, senders, offsets, recipients, subjects = [], [], [0], [], []
+        for row in csv.DictReader(read_text_file(self.csv_path).splitlines()):
+            try:
+                timestamp = datetime.strptime(row['Date'].strip(), EMAIL_DATE_FORMAT).replace(tzinfo=timezone.utc)
+            except (KeyError, ValueError):
+                continue
+            sender = people.setdefault(address_to_name(row['From']), len(people))
+            to_ids = []
+            for address in row.get('To', '').split(','):
+                if address.strip():
+                    recipient = people.setdefault(address_to_name(address), len(people))
+                    if recipient not in to_ids:
+                        to_ids.append(recipient)
+            timestamps.append(int(timestamp.timestamp()))
+            senders.append(sender)
+            recipients.extend(to_ids)
+            offsets.append(len(recipients))
+            subjects.append(row.get('Subject', ''))
+
+        self.people = list(people)
+        self.timestamps = np.array(timestamps, dtype=np.int64)
+        self.senders = np.array(senders, dtype=np.int32)
+        self.recipient_offsets = np.array(offsets, dtype=np.int64)
+        self.recipient_ids = np.array(recipients, dtype=np.int32)
+        self.subjects = subjects
+
+    def save_columns(self, signature):
+        self.columns_path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(self.columns_path, timestamps=self.timestamps, senders=self.senders,
+                 recipient_offsets=self.recipient_offsets, recipient_ids=self.recipient_ids)
+        with open(self.sidecar_path, 'w', encoding='utf-8') as f:
+            json.dump({"signature": signature, "people": self.people, "subjects": self.subjects}, f)
+
+    def load_columns(self, signature):
+        if not self.columns_path.exists() or not self.sidecar_path.exists():
+            return False
+        with open(self.sidecar_path, 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+        if sidecar.get('signature') != signature:
+            return False
+        with np.load(self.columns_path) as columns:
+            self.timestamps = columns['timestamps']
+            self.senders = columns['senders']
+            self.recipient_offsets = columns['recipient_offsets']
+            self.recipient_ids = columns['recipient_ids']
+        self.people = sidecar['people']
+        self.subjects = sidecar['subjects']
+        return True
+
+    def build_edges(self):
+        # One edge per (email, recipient), leaving out people copying themselves in
+        counts = np.diff(self.recipient_offsets)
+        edge_email = np.repeat(np.arange(len(self.timestamps)), counts)
+        edge_sender = self.senders[edge_email]
+        keep = edge_sender != self.recipient_ids
+        order = np.argsort(self.timestamps[edge_email[keep]], kind='stable')
+        self.edge_email = edge_email[keep][order]
+        self.edge_time = self.timestamps[self.edge_email]
+        self.edge_sender = edge_sender[keep][order]
+        self.edge_recipient = self.recipient_ids[keep][order]
+        self.person_ids = {name: i for i, name in enumerate(self.people)}
+        self.full_adjacency = None
+        self.full_adjacency = self.adjacency()
+
+        # Emails per day, so volume queries over whole days never touch the individual rows
+        self.day_start = int(self.timestamps.min() // 86400 * 86400) if len(self.timestamps) else 0
+        days = (self.timestamps - self.day_start) // 86400
+        self.daily_volume = np.bincount(days, minlength=int(days.max()) + 1 if len(days) else 0)
+
+    def edge_slice(self, start=None, end=None):
+        lo = 0 if start is None else np.searchsorted(self.edge_time, start, side='left')
+        hi = len(self.edge_time) if end is None else np.searchsorted(self.edge_time, end, side='right')
+        return slice(lo, hi)
+
+    def adjacency(self, start=None, end=None):
+        # Sparse people x people matrix of email counts from sender (row) to recipient (column)
+        if start is None and end is None and self.full_adjacency is not None:
+            return self.full_adjacency
+        window = self.edge_slice(start, end)
+        n = len(self.people)
+        data = np.ones(window.stop - window.start, dtype=np.int32)
+        return sparse.coo_matrix((data, (self.edge_sender[window], self.edge_recipient[window])), shape=(n, n)).tocsr()
+
+    def person_id(self, name):
+        self.ensure_loaded()
+        return self.person_ids.get(name)
+
+    def top_correspondents(self, name, n=10, start=None, end=None):
+        person = self.person_id(name)
+        if person is None:
+            return None
+        matrix = self.adjacency(start, end)
+        sent = np.asarray(matrix[person].todense()).ravel()
+        received = np.asarray(matrix[:, person].todense()).ravel()
+        total = sent + received
+        order = np.argsort(-total, kind='stable')
+        return [{"name": self.people[i], "sent": int(sent[i]), "received": int(received[i]), "total": int(total[i])}
+                for i in order[:n] if total[i] > 0]
+
+    def graph(self, start=None, end=None, min_count=1, people=None):
+        # Nodes and weighted links for the people graph, optionally restricted to a set of people
+        self.ensure_loaded()
+        matrix = self.adjacency(start, end).tocoo()
+        keep = matrix.data >= min_count
+        rows, cols, data = matrix.row[keep], matrix.col[keep], matrix.data[keep]
+        if people is not None:
+            allowed = np.zeros(len(self.people), dtype=bool)
+            allowed[list(people)] = True
+            mask = allowed[rows] & allowed[cols]
+            rows, cols, data = rows[mask], cols[mask], data[mask]
+        node_ids = sorted(set(rows.tolist()) | set(cols.tolist()) | set(people or []))
+        return {"nodes": [{"id": self.people[i]} for i in node_ids],
+                "links": [{"source": self.people[r], "target": self.people[c], "count": int(d)}
+                          for r, c, d in zip(rows, cols, data)]}
+
+    def ego_network(self, name, start=None, end=None, min_count=1):
+        person = self.person_id(name)
+        if person is None:
+            return None
+        matrix = self.adjacency(start, end)
+        neighbours = set(matrix[person].indices.tolist()) | set(matrix[:, person].tocoo().row.tolist())
+        return self.graph(start, end, min_count, people=neighbours | {person})
+
+    def volume(self, start=None, end=None, bucket="day", name=None):
+        # Email counts per time bucket in [start, end], optionally only those sent by one person
+        self.ensure_loaded()
+        bucket_seconds = BUCKET_SECONDS[bucket]
+        if bucket == "day" and name is None and start is None and end is None:
+            counts = self.daily_volume
+            origin = self.day_start
+        else:
+            mask = np.ones(len(self.timestamps), dtype=bool)
+            if start is not None:
+                mask &= self.timestamps >= start
+            if end is not None:
+                mask &= self.timestamps <= end
+            if name is not None:
+                person = self.person_ids.get(name)
+                mask &= self.senders == (-1 if person is None else person)
+            times = self.timestamps[mask]
+            origin = (int(times.min()) // bucket_seconds * bucket_seconds) if len(times) else (start or 0)
+            counts = np.bincount((times - origin) // bucket_seconds) if len(times) else np.array([], dtype=np.int64)
+        return [{"start": datetime.fromtimestamp(origin + i * bucket_seconds, timezone.utc).isoformat(), "count": int(count)}
+                for i, count in enumerate(counts)]
+
+    def people_summary(self):
+        self.ensure_loaded()
+        sent = np.bincount(self.senders, minlength=len(self.people))
+        received = np.bincount(self.edge_recipient, minlength=len(self.people))
+        return [{"name": name, "sent": int(sent[i]), "received": int(received[i])} for i, name in enumerate(self.people)]
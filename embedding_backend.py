@@ -0,0 +1,280 @@
+from dataclasses import replace
+from pathlib import Path
+from typing import List
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from haystack import Document, component
+
+import metrics
+
+# EMBEDDER_BACKEND picks how texts are embedded, everywhere the app embeds them:
+#   sentence-transformers  the PyTorch model (the default, and what the store was first built with)
+#   onnx                   the same model exported to ONNX, run by onnxruntime on the CPU
+#   onnx-int8              a dynamically int8-quantized ONNX export: fastest on CPU, slightly less exact
+#   stub                   hashed bag of words, no model at all (see stub_embedder.py)
+BACKENDS = ["sentence-transformers", "onnx", "onnx-int8", "stub"]
+MODEL = os.environ.get('EMBEDDER_MODEL', 'sentence-transformers/all-mpnet-base-v2')
+# Which of the model repo's quantized exports onnx-int8 loads; pick the one matching the CPU
+# (e.g. onnx/model_qint8_avx512_vnni.onnx on recent Xeons, onnx/model_qint8_arm64.onnx on ARM)
+ONNX_INT8_FILE = os.environ.get('EMBEDDER_ONNX_FILE', 'onnx/model_quint8_avx2.onnx')
+THREADS = int(os.environ.get('EMBEDDER_THREADS', os.cpu_count() or 1))
+# Batches are formed from length-sorted texts so they hold about this many (padded) tokens:
+# many short texts per batch, few long ones
+BATCH_TOKENS = int(os.environ.get('EMBEDDER_BATCH_TOKENS', 8192))
+MAX_BATCH_SIZE = int(os.environ.get('EMBEDDER_MAX_BATCH', 128))
+CACHE_PATH = Path(os.environ.get('EMBEDDING_CACHE', 'vectors/embedding_cache.sqlite'))
+
+
+def backend_name():
+    backend = os.environ.get('EMBEDDER_BACKEND', 'sentence-transformers')
+    if backend not in BACKENDS:
+        raise ValueError(f"EMBEDDER_BACKEND must be one of {BACKENDS}, not {backend!r}")
+    return backend
+
+
+def embedder_signature(backend=None):
+    # Identifies the vectors a backend produces: embeddings with different signatures must not be
+    # mixed in one store or served from one cache entry
+    backend = backend or backend_name()
+    if backend == 'stub':
+        return 'stub'
+    if backend == 'onnx-int8':
+        return f"{MODEL}:{backend}:{ONNX_INT8_FILE}"
+    return f"{MODEL}:{backend}"
+
+
+class SentenceTransformerEncoder:
+    """
+    The embedding model, on the CPU, through sentence-transformers' torch or onnxruntime backend,
+    using threads intra-op threads.
+    """
+
+    def __init__(self, backend, model=MODEL, threads=THREADS):
+        from sentence_transformers import SentenceTransformer
+        if backend == 'sentence-transformers':
+            import torch
+            torch.set_num_threads(threads)
+            self.model = SentenceTransformer(model, device='cpu')
+        else:
+            import onnxruntime
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+            model_kwargs = {"provider": "CPUExecutionProvider", "session_options": options}
+            if backend == 'onnx-int8':
+                model_kwargs["file_name"] = ONNX_INT8_FILE
+            self.model = SentenceTransformer(model, device='cpu', backend='onnx', model_kwargs=model_kwargs)
+        self.max_tokens = self.model.max_seq_length
+
+    def token_length(self, text):
+        # Roughly four characters per token, which is all the batching needs
+        return min(self.max_tokens, len(text) // 4 + 2)
+
+    def encode(self, texts):
+        return self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True,
+                                 show_progress_bar=False).astype(np.float32)
+
+
+def make_encoder(backend=None):
+    backend = backend or backend_name()
+    if backend == 'stub':
+        from stub_embedder import StubEncoder
+        return StubEncoder()
+    return SentenceTransformerEncoder(backend)
+
+
+def length_sorted_batches(lengths, max_tokens=BATCH_TOKENS, max_size=MAX_BATCH_SIZE):
+    # Indices grouped into batches of similar length, longest first, each padding to at most
+    # about max_tokens tokens in total
+    order = sorted(range(len(lengths)), key=lambda i: -lengths[i])
+    batches = []
+    batch = []
+    for i in order:
+        # Sorted longest first, so a batch pads to the length of its first text
+        if batch and ((len(batch) + 1) * lengths[batch[0]] > max_tokens or len(batch) >= max_size):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class EmbeddingCache:
+    """
+    Embeddings on disk in sqlite, keyed by the sha256 of the embedder signature and the exact
+    text, so a text is never embedded twice by the same model, across runs and across the article
+    and chunk stores.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = Path(path)
+        self.open()
+
+    def open(self):
+        self.lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+        self.db.commit()
+
+    def reopen(self):
+        # For a forked process: its own connection and lock
+        self.open()
+
+    @staticmethod
+    def key(signature, text):
+        return hashlib.sha256(f"{signature}\0{text}".encode('utf-8', errors='ignore')).hexdigest()
+
+    def get_many(self, keys):
+        found = {}
+        with self.lock:
+            # sqlite allows a limited number of parameters per statement
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                rows = self.db.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part)
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def put_many(self, items):
+        with self.lock:
+            self.db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items])
+            self.db.commit()
+
+
+class BatchEmbedder:
+    """
+    Embeds lists of texts with the configured backend: texts already in the cache are looked up,
+    the rest are embedded in length-sorted batches and added to the cache as each batch finishes.
+    The model is loaded on first use. Keeps running totals for throughput().
+    """
+
+    def __init__(self, backend=None, cache=None):
+        self.backend = backend or backend_name()
+        self.signature = embedder_signature(self.backend)
+        self.cache = cache
+        self.encoder = None
+        self.lock = threading.Lock()
+        self.totals = {"texts": 0, "embedded": 0, "cached": 0, "seconds": 0.0}
+
+    def load(self):
+        with self.lock:
+            if self.encoder is None:
+                self.encoder = make_encoder(self.backend)
+        return self.encoder
+
+    def embed(self, texts):
+        start = time.perf_counter()
+        vectors = [None] * len(texts)
+        keys = [EmbeddingCache.key(self.signature, text) for text in texts]
+        cached = self.cache.get_many(list(set(keys))) if self.cache is not None else {}
+        # Identical texts within one call are embedded once
+        pending = {}
+        for i, key in enumerate(keys):
+            if key in cached:
+                vectors[i] = cached[key]
+            else:
+                pending.setdefault(key, []).append(i)
+
+        if pending:
+            encoder = self.load()
+            unique = list(pending)
+            lengths = [encoder.token_length(texts[pending[key][0]]) for key in unique]
+            for batch in length_sorted_batches(lengths):
+                batch_keys = [unique[j] for j in batch]
+                embeddings = encoder.encode([texts[pending[key][0]] for key in batch_keys])
+                for key, vector in zip(batch_keys, embeddings):
+                    for i in pending[key]:
+                        vectors[i] = vector
+                if self.cache is not None:
+                    self.cache.put_many(zip(batch_keys, embeddings))
+
+        elapsed = time.perf_counter() - start
+        hits = len(texts) - sum(len(indices) for indices in pending.values())
+        metrics.EMBEDDINGS.inc(len(pending), backend=self.backend, source="model")
+        metrics.EMBEDDINGS.inc(hits, backend=self.backend, source="cache")
+        with self.lock:
+            self.totals["texts"] += len(texts)
+            self.totals["embedded"] += len(pending)
+            self.totals["cached"] += hits
+            self.totals["seconds"] += elapsed
+        return vectors
+
+    def throughput(self):
+        with self.lock:
+            totals = dict(self.totals)
+        totals["seconds"] = round(totals["seconds"], 3)
+        totals["texts_per_second"] = round(totals["texts"] / totals["seconds"], 1) if totals["seconds"] else None
+        return {"backend": self.backend, "signature": self.signature, **totals}
+
+
+def document_text(doc, meta_fields_to_embed):
+    # What SentenceTransformersDocumentEmbedder embeds: the chosen meta values, then the content
+    fields = [str(doc.meta[field]) for field in meta_fields_to_embed if doc.meta.get(field)]
+    return "\n".join(fields + [doc.content or ""])
+
+
+@component
+class BackendDocumentEmbedder:
+    """
+    Drop-in for SentenceTransformersDocumentEmbedder that embeds through a BatchEmbedder.
+    """
+
+    def __init__(self, embedder, meta_fields_to_embed=None):
+        self.embedder = embedder
+        self.meta_fields_to_embed = meta_fields_to_embed or []
+
+    def warm_up(self):
+        self.embedder.load()
+
+    @component.output_types(documents=List[Document])
+    def run(self, documents: List[Document]):
+        vectors = self.embedder.embed([document_text(doc, self.meta_fields_to_embed) for doc in documents])
+        return {"documents": [replace(doc, embedding=vector.tolist()) for doc, vector in zip(documents, vectors)]}
+
+
+@component
+class BackendTextEmbedder:
+    """
+    Drop-in for SentenceTransformersTextEmbedder that embeds through a BatchEmbedder.
+    """
+
+    def __init__(self, embedder):
+        self.embedder = embedder
+
+    def warm_up(self):
+        self.embedder.load()
+
+    @component.output_types(embedding=List[float])
+    def run(self, text: str):
+        return {"embedding": self.embedder.embed([text])[0].tolist()}
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_embedder():
+    # One BatchEmbedder (one model in memory, one cache connection) per process, used for the
+    # articles, the chunks and the queries
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = BatchEmbedder(cache=EmbeddingCache())
+        return _shared
+
+
+def reset_after_fork():
+    global _shared_lock
+    _shared_lock = threading.Lock()
+    if _shared is not None:
+        _shared.lock = threading.Lock()
+        if _shared.cache is not None:
+            _shared.cache.reopen()
@@ -0,0 +1,149 @@
+from pathlib import Path
+import json
+import os
+import threading
+
+import numpy as np
+
+from llm_cache import LRUCache
+import metrics
+
+META_FIELDS = ["title", "source", "published", "location", "author"]
+
+# Above this many rows the randomized SVD solver is much faster than a full SVD for 2 components
+RANDOMIZED_MIN_ROWS = 500
+
+
+def manifest_token(manifest_path):
+    # Changes whenever ingestion rewrites its manifest, i.e. whenever the store changed
+    try:
+        stat = os.stat(manifest_path)
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+class EmbeddingMatrix:
+    """
+    Every article embedding from the document store as one float32 matrix, saved to an .npy file
+    and memory-mapped back in, with the ids, metadata and contents in a JSON sidecar and a row
+    index per source. Selecting sources is then a NumPy fancy-index rather than a Chroma query.
+    PCA projections are cached per source set. Both are rebuilt when the ingestion manifest changes.
+    """
+
+    def __init__(self, cache_dir, manifest_path):
+        self.cache_dir = Path(cache_dir)
+        self.matrix_path = self.cache_dir / 'embeddings.npy'
+        self.meta_path = self.cache_dir / 'embeddings_meta.json'
+        self.manifest_path = manifest_path
+        self.lock = threading.Lock()
+        self.token = None
+        self.matrix = None
+        self.ids = []
+        self.metas = []
+        self.contents = []
+        self.row_by_id = {}
+        self.source_rows = {}
+        self.projections = LRUCache(maxsize=64, ttl=None)
+
+    def ensure_loaded(self, document_store):
+        token = manifest_token(self.manifest_path)
+        if self.matrix is not None and token == self.token:
+            return
+        with self.lock:
+            if self.matrix is not None and token == self.token:
+                return
+            if not self.load_from_disk(token):
+                self.build(document_store, token)
+            self.source_rows = {}
+            for row, meta in enumerate(self.metas):
+                self.source_rows.setdefault(meta.get('source', ''), []).append(row)
+            self.source_rows = {source: np.array(rows, dtype=np.int64) for source, rows in self.source_rows.items()}
+            self.row_by_id = {doc_id: row for row, doc_id in enumerate(self.ids)}
+            self.projections.clear()
+            self.token = token
+
+    def load_from_disk(self, token):
+        if token is None or not self.matrix_path.exists() or not self.meta_path.exists():
+            return False
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+        if sidecar.get('token') != token:
+            return False
+        self.matrix = np.load(self.matrix_path, mmap_mode='r')
+        self.ids = sidecar['ids']
+        self.metas = sidecar['metas']
+        self.contents = sidecar['contents']
+        return True
+
+    def build(self, document_store, token):
+        embeddings = []
+        self.ids, self.metas, self.contents = [], [], []
+        with metrics.stage("filter_documents"):
+            documents = document_store.filter_documents()
+        metrics.DOCUMENTS.inc(len(documents), stage="filter_documents")
+        for doc in documents:
+            if doc.embedding is not None:
+                embeddings.append(doc.embedding)
+                self.ids.append(doc.id)
+                self.metas.append(doc.meta)
+                self.contents.append(doc.content)
+        self.matrix = np.array(embeddings, dtype=np.float32)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        np.save(self.matrix_path, self.matrix)
+        tmp_path = self.meta_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"token": token, "ids": self.ids, "metas": self.metas, "contents": self.contents}, f)
+        os.replace(tmp_path, self.meta_path)
+        self.matrix = np.load(self.matrix_path, mmap_mode='r')
+
+    def rows_for_sources(self, sources):
+        rows = [self.source_rows[source] for source in sources if source in self.source_rows]
+        if not rows:
+            return np.array([], dtype=np.int64)
+        return np.sort(np.concatenate(rows))
+
+    def article(self, doc_id):
+        # None if the store no longer holds that document
+        row = self.row_by_id.get(doc_id)
+        if row is None:
+            return None
+        return {"id": doc_id, "meta": self.metas[row], "contents": self.contents[row]}
+
+    def project(self, document_store, sources):
+        # Returns (rows, 2-d coordinates, explained variance ratio) for the selected sources
+        self.ensure_loaded(document_store)
+        key = json.dumps(sorted(set(sources)))
+        cached = self.projections.get(key)
+        if cached is not None:
+            return cached
+
+        rows = self.rows_for_sources(sources)
+        metrics.DOCUMENTS.inc(len(rows), stage="pca")
+        X = np.asarray(self.matrix[rows], dtype=np.float32)
+        if len(rows) < 2:
+            projection = (rows, np.zeros((len(rows), 2), dtype=np.float32), np.zeros(2))
+        else:
+            from sklearn.decomposition import PCA
+
+            svd_solver = 'randomized' if len(rows) >= RANDOMIZED_MIN_ROWS else 'full'
+            pca = PCA(n_components=2, svd_solver=svd_solver, random_state=0)
+            with metrics.stage("pca"):
+                X_reduced = pca.fit_transform(X).astype(np.float32)
+            projection = (rows, X_reduced, pca.explained_variance_ratio_)
+        self.projections.set(key, projection)
+        return projection
+
+
+def dictionary_encode(metas, fields=META_FIELDS):
+    # {field: {"values": [distinct values], "index": [position of each row's value]}}. Sources and
+    # dates repeat a lot, so this is far smaller than a dict per point.
+    table = {}
+    for field in fields:
+        positions = {}
+        index = []
+        for meta in metas:
+            index.append(positions.setdefault(meta.get(field, ""), len(positions)))
+        table[field] = {"values": list(positions), "index": index}
+    return table
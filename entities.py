@@ -0,0 +1,214 @@
+# The people and organisations on the People/Orgs graph, and the relationships we pulled out of
+# the articles by hand. Co-occurrence links are computed from the corpus in entity_graph.py.
+
+NODES = [
+    #Organizations
+    {"id": "Protectors of Kronos (POK)", "group": "POK"},
+    {"id": "GAStech International", "group": "GAStech"},
+    {"id": "Kronos Government", "group": "Government"},
+    {"id": "Abila Police", "group": "Government"},
+    {"id": "Tethyn Federal Law Enforcement", "group": "Government"},
+    {"id": "Tethyn Ministry of Foreign Affairs", "group": "Government"},
+    {"id": "Abila Fire Department", "group": "Government"},
+
+    # POK people
+    {"id": "Juliana Vann", "group": "POK"},
+    {"id": "Edvard Vann", "group": "GAStech"},
+    {"id": "Henk Bodrogi", "group": "POK"},
+    {"id": "Elian Karel", "group": "POK"},
+    {"id": "Silvia Marek", "group": "POK"},
+    {"id": "Jeroen Karel", "group": "POK"},
+
+    # Government people
+    {"id": "Cesare Nespola", "group": "Government"},
+    {"id": "President Dorel Kapelou II", "group": "Government"},
+    {"id": "Rufus Drymiau", "group": "Government"},
+    {"id": "Vincent Kapelou", "group": "Government"},
+    {"id": "Adrien Carman", "group": "Government"},
+    {"id": "Officer Emilio Haber", "group": "Government"},
+
+
+    # Media people
+    {"id": "Petrus Gerhard", "group": "Media"},
+    {"id": "Maha Salo", "group": "Media"},
+    {"id": "Haneson Ngohebo", "group": "Media"},
+    {"id": "Sara Tuno", "group": "Media"},
+
+    # Experts
+    {"id": "John Rathburn", "group": "Expert"},
+    {"id": "Dr. Ronald Gerald", "group": "Expert"},
+    {"id": "Jon L.", "group": "Citizen"},
+
+    # GAStech executives
+    {"id": "Sten Sanjorge Jr", "group": "GAStech"},
+    {"id": "Sten Sanjorge Sr", "group": "GAStech"},
+    {"id": "Ingrid Barranco", "group": "GAStech"},
+    {"id": "Ada Campo-Corrente", "group": "GAStech"},
+    {"id": "Orhan Strum", "group": "GAStech"},
+    {"id": "Willem Vasco-Pais", "group": "GAStech"},
+
+    # Other GAStech employees (grouped IT/Security/Facilities/Engineering)
+    {"id": "Felix Resumir", "group": "GAStech"},
+    {"id": "Hideki Cocinaro", "group": "GAStech"},
+    {"id": "Inga Ferro", "group": "GAStech"},
+    {"id": "Varja Lagos", "group": "GAStech"},
+    {"id": "Kanon Herrero", "group": "GAStech"},
+    {"id": "Stenig Fusil", "group": "GAStech"},
+    {"id": "Hennie Osvaldo", "group": "GAStech"},
+    {"id": "Isia Vann", "group": "GAStech"},
+    {"id": "Loreto Bodrogi", "group": "GAStech"},
+    {"id": "Bertrand Ovan", "group": "GAStech"},
+    {"id": "Emile Arpa", "group": "GAStech"},
+    {"id": "Varro Awelon", "group": "GAStech"},
+    {"id": "Dante Coginian", "group": "GAStech"},
+    {"id": "Albina Hafon", "group": "GAStech"},
+    {"id": "Benito Hawelon", "group": "GAStech"},
+    {"id": "Claudio Hawelon", "group": "GAStech"},
+    {"id": "Henk Mies", "group": "GAStech"},
+    {"id": "Minke Mies", "group": "GAStech"},
+    {"id": "Ruscella Mies Haber", "group": "GAStech"},
+    {"id": "Valeria Morlun", "group": "GAStech"},
+    {"id": "Adan Morlun", "group": "GAStech"},
+    {"id": "Cecilia Morluniau", "group": "GAStech"},
+    {"id": "Irene Nant", "group": "GAStech"},
+    {"id": "Dylan Scozzese", "group": "GAStech"},
+    {"id": "Mat Bramar", "group": "GAStech"},
+    {"id": "Anda Ribera", "group": "GAStech"},
+    {"id": "Rachel Pantanal", "group": "GAStech"},
+    {"id": "Linda Lagos", "group": "GAStech"},
+    {"id": "Carla Forluniau", "group": "GAStech"},
+    {"id": "Cornelia Lais", "group": "GAStech"},
+    {"id": "Lidelse Dedos", "group": "GAStech"},
+    {"id": "Felix Balas", "group": "GAStech"},
+    {"id": "Lars Azada", "group": "GAStech"},
+    {"id": "Adra Nubarron", "group": "GAStech"},
+    {"id": "Birgitta Frente", "group": "GAStech"},
+    {"id": "Vira Frente", "group": "GAStech"},
+    {"id": "Marin Onda", "group": "GAStech"},
+    {"id": "Elsa Orilla", "group": "GAStech"},
+    {"id": "Kare Orilla", "group": "GAStech"},
+    {"id": "Axel Calzas", "group": "GAStech"},
+    {"id": "Brand Tempestad", "group": "GAStech"},
+    {"id": "Isande Borrasca", "group": "GAStech"},
+    {"id": "Gustav Cazar", "group": "GAStech"},
+    {"id": "Linnea Bergen", "group": "GAStech"},
+    {"id": "Isak Baza", "group": "GAStech"},
+    {"id": "Nils Calixto", "group": "GAStech"},
+    {"id": "Sven Flecha", "group": "GAStech"},
+    {"id": "Lucas Alcazar", "group": "GAStech"},
+]
+
+CURATED_LINKS = [
+    # Family relationships
+    {"source": "Edvard Vann", "target": "Juliana Vann", "relation": "Family name match"},
+    {"source": "Isia Vann", "target": "Edvard Vann", "relation": "Same family name"},
+    {"source": "Isia Vann", "target": "Juliana Vann", "relation": "Same family name"},
+    {"source": "Henk Bodrogi", "target": "Loreto Bodrogi", "relation": "Same family name"},
+    {"source": "Linda Lagos", "target": "Varja Lagos", "relation": "Same family name"},
+    {"source": "Henk Mies", "target": "Minke Mies", "relation": "Same family name"},
+    {"source": "Henk Mies", "target": "Ruscella Mies Haber", "relation": "Same family name"},
+    {"source": "Adan Morlun", "target": "Valeria Morlun", "relation": "Same family name"},
+    {"source": "Adan Morlun", "target": "Cecilia Morluniau", "relation": "Same family name"},
+    {"source": "Valeria Morlun", "target": "Cecilia Morluniau", "relation": "Same family name"},
+    {"source": "Birgitta Frente", "target": "Vira Frente", "relation": "Same family name"},
+    {"source": "Elsa Orilla", "target": "Kare Orilla", "relation": "Same family name"},
+    {"source": "Nils Calixto", "target": "Lucas Alcazar", "relation": "Same last name grouping"},
+
+    # Leadership transitions
+    {"source": "Henk Bodrogi", "target": "Elian Karel", "relation": "Succeeded by"},
+    {"source": "Elian Karel", "target": "Silvia Marek", "relation": "Succeeded by"},
+
+    # Parent-child
+    {"source": "Jeroen Karel", "target": "Elian Karel", "relation": "Father"},
+    
+    # Political family relationships
+    {"source": "President Dorel Kapelou II", "target": "Vincent Kapelou", "relation": "Uncle"},
+    {"source": "Vincent Kapelou", "target": "Cesare Nespola", "relation": "Successor"},
+    
+    # Public conflicts / tension
+    {"source": "Protectors of Kronos (POK)", "target": "President Dorel Kapelou II", "relation": "Opposes"},
+    {"source": "Protectors of Kronos (POK)", "target": "Vincent Kapelou", "relation": "Threatened"},
+    {"source": "President Dorel Kapelou II", "target": "Protectors of Kronos (POK)", "relation": "Declared terrorist"},
+    {"source": "Rufus Drymiau", "target": "Protectors of Kronos (POK)", "relation": "Declared terrorist"},
+    {"source": "Adrien Carman", "target": "Protectors of Kronos (POK)", "relation": "Condemned protest violence"},
+    {"source": "Officer Emilio Haber", "target": "Protectors of Kronos (POK)", "relation": "Police confrontation"},
+    {"source": "Cesare Nespola", "target": "Henk Bodrogi", "relation": "Met regarding water contamination"},
+    
+    # Memorial and martyr status
+    {"source": "Juliana Vann", "target": "Protectors of Kronos (POK)", "relation": "Martyr figure"},
+    {"source": "Elian Karel", "target": "Protectors of Kronos (POK)", "relation": "Martyr figure"},
+
+    # Government collaboration with GAStech
+    {"source": "President Dorel Kapelou II", "target": "Sten Sanjorge Jr", "relation": "Attended events with"},
+    {"source": "President Dorel Kapelou II", "target": "GAStech International", "relation": "Kleptocracy ties"},
+
+    # Ministerial action
+    {"source": "Cesare Nespola", "target": "Dr. Ronald Gerald", "relation": "Licensed oncologist"},
+
+    # Media coverage
+    {"source": "Haneson Ngohebo", "target": "Sten Sanjorge Jr", "relation": "Reported on"},
+    {"source": "Sara Tuno", "target": "Sten Sanjorge Jr", "relation": "Reported on"},
+    {"source": "Haneson Ngohebo", "target": "Edvard Vann", "relation": "Reported on"},
+    {"source": "Haneson Ngohebo", "target": "President Dorel Kapelou II", "relation": "Reported on"},
+
+    # Homeland Illumination
+    {"source": "Petrus Gerhard", "target": "Maha Salo", "relation": "Colleague"},
+
+    # Expert commentary
+    {"source": "John Rathburn", "target": "Protectors of Kronos (POK)", "relation": "Assessed risk from"},
+
+    # Government collaborations
+    {"source": "Tethyn Federal Law Enforcement", "target": "Abila Police", "relation": "Assists"},
+    {"source": "Tethyn Ministry of Foreign Affairs", "target": "Abila Police", "relation": "Assists"},
+
+    # Miscellaneous citizen protest
+    {"source": "Jon L.", "target": "Kronos Government", "relation": "Critical of"},
+    {"source": "Jon L.", "target": "GAStech International", "relation": "Critical of"},
+
+    # GAStech internal
+    {"source": "Sten Sanjorge Jr", "target": "Sten Sanjorge Sr", "relation": "Son of"},
+    {"source": "Ingrid Barranco", "target": "GAStech International", "relation": "CFO"},
+    {"source": "Ada Campo-Corrente", "target": "GAStech International", "relation": "CIO"},
+    {"source": "Orhan Strum", "target": "GAStech International", "relation": "COO"},
+    {"source": "Willem Vasco-Pais", "target": "GAStech International", "relation": "Environmental Officer"},
+]
+
+
+# Other ways the corpus refers to an entity. Every entity also matches its own id. Matching ignores
+# case and punctuation, and the longest match wins, so "President Dorel Kapelou II" is never also
+# counted as a mention of someone called "Kapelou".
+ALIASES = {
+    "Protectors of Kronos (POK)": ["Protectors of Kronos", "POK"],
+    "GAStech International": ["GAStech"],
+    "Kronos Government": ["Government of Kronos", "Kronos federal government"],
+    "Abila Police": ["Abila Police Department", "Abila police force"],
+    "Abila Fire Department": ["Abila Fire"],
+    "President Dorel Kapelou II": ["Dorel Kapelou", "President Kapelou", "Kapelou II"],
+    "Cesare Nespola": ["Minister Nespola"],
+    "Officer Emilio Haber": ["Emilio Haber"],
+    "Dr. Ronald Gerald": ["Ronald Gerald"],
+    "Sten Sanjorge Jr": ["Sanjorge Jr"],
+    "Sten Sanjorge Sr": ["Sanjorge Sr"],
+}
+
+# The people compared on the Bias page, under the names bias.js uses, and what the articles call them
+BIAS_ENTITIES = {
+    "Carmine Osvaldo": [],
+    "Chief Legal Officer": ["general counsel"],
+    "Elian Karel": [],
+    "GAStech COO": ["Orhan Strum", "Mr. Strum"],
+    "Hank Fluss": ["Mr. Fluss"],
+    "Henk Bodrogi": [],
+    "Jeroen Karel": [],
+    "Lorenzo Di Stefano": ["Di Stefano"],
+    "Mandor Vann": [],
+    "Silvia Marek": ["Marek"],
+    "Sten Sanjorge Jr.": ["Sanjorge Jr"],
+    "Valentine Mies": [],
+}
+
+# Other people in the corpus who share a surname with a bias entity. They are in the bias matcher's
+# lexicon only so that their full name wins over a shorter alias; they are never scored.
+NAMESAKES = ["Antaura Karel", "Beatriz Fluss", "Edvard Vann", "Ingrid Sanjorge", "Isia Vann",
+             "Julian Vann", "Juliana Vann", "Loreto Bodrogi", "Minke Mies", "Neske Vann",
+             "Sten Sanjorge Sr"]
@@ -0,0 +1,252 @@
+from collections import deque
+from itertools import combinations
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from corpus import NEWS_SOURCES_DIR, parse_article
+from term_index import read_text_file
+
+# Sources/collated_sources is every outlet's articles pasted together, so scanning it would count
+# each article twice
+DOCUMENT_ROOTS = [NEWS_SOURCES_DIR, Path('sources'), Path('Sources')]
+SKIPPED_DIRS = {'collated_sources'}
+REFRESH_INTERVAL = 30
+
+
+def document_files(roots=DOCUMENT_ROOTS):
+    for root in roots:
+        for dirpath, dirnames, files in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d not in SKIPPED_DIRS)
+            for file in sorted(files):
+                if file.endswith('.txt'):
+                    yield Path(dirpath) / file
+
+
+def document_meta(file_path, text):
+    # Articles carry SOURCE/TITLE/... headers; for source documents the folder and file name stand in
+    if Path(NEWS_SOURCES_DIR) in file_path.parents:
+        meta, body = parse_article(text)
+    else:
+        meta, body = {"title": file_path.stem, "source": file_path.parent.name, "published": ""}, text
+    meta['title'] = meta.get('title') or file_path.stem
+    meta['source'] = meta.get('source') or file_path.parent.name
+    return meta, body
+
+
+def normalize(text):
+    # Lowercase, with every run of punctuation/whitespace turned into one space, so
+    # "Sten Sanjorge, Jr." and "sten sanjorge jr" compare equal
+    return re.sub(r'[^a-z0-9]+', ' ', text.lower())
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: finds every occurrence of every pattern in one pass over the text,
+    however many patterns there are. Patterns and text should be normalized first.
+    """
+
+    def __init__(self, patterns):
+        # patterns: {pattern: value}
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for pattern, value in patterns.items():
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append((len(pattern), value))
+
+        # Breadth-first, so a state's failure link is always resolved before its children's
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text):
+        # Yields (start, end, value) for every match
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for length, value in self.output[state]:
+                yield i + 1 - length, i + 1, value
+
+
+class EntityMatcher:
+
+    def __init__(self, entities, aliases, ignored=()):
+        # ignored names are matched, so that they shadow shorter names inside them, but not counted
+        patterns = {}
+        for name in ignored:
+            pattern = normalize(name).strip()
+            if pattern:
+                patterns[pattern] = None
+        for entity in entities:
+            for name in [entity] + aliases.get(entity, []):
+                pattern = normalize(name).strip()
+                if pattern:
+                    patterns[pattern] = entity
+        self.automaton = AhoCorasick(patterns)
+
+    def count_mentions(self, text):
+        # Whole-word matches only, and where matches overlap the leftmost-longest one wins
+        text = normalize(text)
+        matches = [(start, end, entity) for start, end, entity in self.automaton.find(text)
+                   if (start == 0 or text[start - 1] == ' ') and (end == len(text) or text[end] == ' ')]
+        matches.sort(key=lambda match: (match[0], -match[1]))
+        counts = {}
+        last_end = 0
+        for start, end, entity in matches:
+            if start >= last_end:
+                if entity is not None:
+                    counts[entity] = counts.get(entity, 0) + 1
+                last_end = end
+        return counts
+
+
+class EntityGraph:
+    """
+    Entity mentions per document for every article and source document, persisted to index_path
+    and only rescanned for files whose mtime or size changed. From those, a weighted co-occurrence
+    graph (two entities are linked once per document mentioning both) is kept as an adjacency index,
+    with the documents behind each link as evidence.
+    """
+
+    def __init__(self, nodes, aliases, curated_links, index_path, roots=DOCUMENT_ROOTS):
+        self.nodes = nodes
+        self.node_by_id = {node['id']: node for node in nodes}
+        self.curated_links = curated_links
+        self.matcher = EntityMatcher([node['id'] for node in nodes], aliases)
+        self.index_path = Path(index_path)
+        self.roots = [Path(root) for root in roots]
+        self.lock = threading.Lock()
+        self.documents = {}
+        self.last_refresh = 0
+        self.adjacency = {}
+        self.evidence = {}
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self.documents = json.load(f)
+            except (OSError, ValueError):
+                self.documents = {}
+
+    def scan(self, file_path, stat):
+        text = read_text_file(file_path)
+        meta, _ = document_meta(file_path, text)
+        return {"mtime": stat.st_mtime,
+                "size": stat.st_size,
+                "sha256": hashlib.sha256(text.encode('utf-8', errors='ignore')).hexdigest(),
+                "title": meta['title'],
+                "source": meta['source'],
+                "published": meta.get('published', ''),
+                "entities": self.matcher.count_mentions(text)}
+
+    def refresh(self, force=False):
+        with self.lock:
+            if not force and self.adjacency and time.time() - self.last_refresh < REFRESH_INTERVAL:
+                return
+            changed = False
+            seen = set()
+            for file_path in document_files(self.roots):
+                key = file_path.as_posix()
+                seen.add(key)
+                stat = file_path.stat()
+                entry = self.documents.get(key)
+                if entry is None or entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size:
+                    self.documents[key] = self.scan(file_path, stat)
+                    changed = True
+            for key in [key for key in self.documents if key not in seen]:
+                del self.documents[key]
+                changed = True
+
+            if changed:
+                self.index_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.index_path.with_suffix('.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.documents, f)
+                os.replace(tmp_path, self.index_path)
+            if changed or not self.adjacency:
+                self.build()
+            self.last_refresh = time.time()
+
+    def build(self):
+        adjacency = {node['id']: {} for node in self.nodes}
+        evidence = {}
+        seen_hashes = set()
+        for key, entry in sorted(self.documents.items()):
+            # The same resume lives in both sources/ and Sources/; count it once
+            if entry['sha256'] in seen_hashes:
+                continue
+            seen_hashes.add(entry['sha256'])
+            for a, b in combinations(sorted(entry['entities']), 2):
+                adjacency[a][b] = adjacency[a].get(b, 0) + 1
+                adjacency[b][a] = adjacency[b].get(a, 0) + 1
+                evidence.setdefault((a, b), []).append(key)
+        self.adjacency = adjacency
+        self.evidence = evidence
+
+    def neighbours(self, node_id, min_weight):
+        for neighbour, weight in self.adjacency.get(node_id, {}).items():
+            if weight >= min_weight:
+                yield neighbour
+        for link in self.curated_links:
+            if link['source'] == node_id:
+                yield link['target']
+            elif link['target'] == node_id:
+                yield link['source']
+
+    def subgraph(self, center=None, hops=1, min_weight=1):
+        # The whole graph, or just what is within `hops` links of `center`. Co-occurrence links
+        # below min_weight are left out; the hand-curated links are always kept.
+        self.refresh()
+        if center is None:
+            keep = set(self.node_by_id)
+        else:
+            keep = {center}
+            frontier = [center]
+            for _ in range(hops):
+                next_frontier = []
+                for node_id in frontier:
+                    for neighbour in self.neighbours(node_id, min_weight):
+                        if neighbour not in keep:
+                            keep.add(neighbour)
+                            next_frontier.append(neighbour)
+                frontier = next_frontier
+
+        links = [{**link, "kind": "curated"} for link in self.curated_links
+                 if link['source'] in keep and link['target'] in keep]
+        for a in sorted(keep):
+            for b, weight in self.adjacency.get(a, {}).items():
+                if a < b and b in keep and weight >= min_weight:
+                    links.append({"source": a, "target": b, "weight": weight, "kind": "cooccurrence",
+                                  "relation": f"Co-mentioned in {weight} documents"})
+        nodes = [self.node_by_id[node_id] for node_id in sorted(keep) if node_id in self.node_by_id]
+        return {"nodes": nodes, "links": links}
+
+    def link_evidence(self, a, b):
+        self.refresh()
+        keys = self.evidence.get(tuple(sorted((a, b))), [])
+        return [{"path": key,
+                 "title": self.documents[key]['title'],
+                 "source": self.documents[key]['source'],
+                 "published": self.documents[key]['published'],
+                 "mentions": {a: self.documents[key]['entities'].get(a, 0), b: self.documents[key]['entities'].get(b, 0)}}
+                for key in keys]
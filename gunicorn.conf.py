@@ -0,0 +1,20 @@
+import os
+
+# gunicorn -c gunicorn.conf.py wsgi:app
+#
+# The app (models, Chroma stores, ingested corpus, indexes) is built once in the master and the
+# workers are forked from it. Each worker serves requests on threads; LLM calls are handed to the
+# bounded executor in services.py, so a request thread waiting on Gemini never blocks the others.
+bind = os.environ.get('BIND', '127.0.0.1:5000')
+preload_app = True
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+# Enough threads for every running and queued LLM call plus headroom for the other endpoints
+threads = int(os.environ.get('LLM_WORKERS', 4)) + int(os.environ.get('LLM_QUEUE', 8)) + 8
+# Longer than LLM_TIMEOUT, so a slow answer gets a 504 from the app rather than a killed worker
+timeout = int(float(os.environ.get('LLM_TIMEOUT', 60))) + 30
+
+
+def post_fork(server, worker):
+    import app
+    app.reset_after_fork()
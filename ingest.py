@@ -0,0 +1,247 @@
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import os
+import time
+
+from haystack import Document
+from haystack_integrations.document_stores.chroma import ChromaDocumentStore
+
+from corpus import NEWS_SOURCES_DIR, ARTICLE_METADATA, parse_article, read_article, article_files
+from embedding_backend import BackendDocumentEmbedder, embedder_signature, shared_embedder
+from retrieval import SOURCE_DIR, CHUNK_COLLECTION, chunkable_files, chunk_file
+from term_index import read_text_file
+import metrics
+
+PATH_TO_PERSISTENT = Path('vectors/')
+MANIFEST_NAME = 'ingest_manifest.json'
+CHUNK_MANIFEST_NAME = 'chunk_manifest.json'
+
+
+def create_haystack_doc(file_contents) -> Document|None:
+    meta, content = parse_article(file_contents)
+    return Document(content=content,
+                    meta=meta)
+
+
+def make_doc_embedder():
+    # Embeds with all-mpnet-base-v2 through the backend chosen by EMBEDDER_BACKEND (see
+    # embedding_backend.py). Only the body is embedded: ARTICLE_METADATA lists the header markers
+    # ("SOURCE:", ...), not the meta keys parse_article produces ("source", ...), so no metadata
+    # is prepended. This is how the stored vectors were made, so it must not change without
+    # re-embedding the corpus.
+    return BackendDocumentEmbedder(shared_embedder(), meta_fields_to_embed=ARTICLE_METADATA)
+
+
+def make_chunk_embedder():
+    return BackendDocumentEmbedder(shared_embedder(), meta_fields_to_embed=["title"])
+
+
+def make_chunk_store(persist_path=PATH_TO_PERSISTENT):
+    # Chunks live in their own collection so they never show up in the article similarity report
+    return ChromaDocumentStore(collection_name=CHUNK_COLLECTION, persist_path=str(persist_path), distance_function="cosine")
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8', errors='ignore')).hexdigest()
+
+
+class IngestManifest:
+    """
+    Records, for every ingested file, the hash of its contents and the id of the document it
+    produced. "version" is bumped whenever the store changes so caches built on top of it
+    (embedding matrices, PCA projections) know to rebuild. "embedder" is the signature of the
+    backend the stored embeddings came from; if it changes, everything is embedded again.
+    """
+
+    def __init__(self, manifest_path):
+        self.manifest_path = Path(manifest_path)
+        self.version = 0
+        self.files = {}
+        # Stores built before backends were selectable were embedded by sentence-transformers
+        self.embedder = embedder_signature('sentence-transformers')
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.version = data.get('version', 0)
+            self.files = data.get('files', {})
+            self.embedder = data.get('embedder', self.embedder)
+
+    def exists(self):
+        return self.manifest_path.exists()
+
+    def save(self):
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": self.version, "embedder": self.embedder, "files": self.files}, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+
+def read_manifest_version(persist_path=PATH_TO_PERSISTENT):
+    return IngestManifest(Path(persist_path) / MANIFEST_NAME).version
+
+
+def ingest_articles(document_store, articles_dir=NEWS_SOURCES_DIR, persist_path=PATH_TO_PERSISTENT, doc_embedder=None):
+    """
+    Brings the document store in line with the article files on disk. Only new or changed
+    files are parsed and embedded, and documents whose files have gone are deleted. The
+    embedding model is only loaded if there is something to embed.
+    """
+    manifest = IngestManifest(Path(persist_path) / MANIFEST_NAME)
+    bootstrapping = not manifest.exists()
+    reembed = manifest.embedder != embedder_signature()
+    existing_ids = set()
+    if bootstrapping:
+        # A store embedded before the manifest existed: documents that are already there keep
+        # their embeddings, since their ids are derived from the same content and meta
+        existing_ids = {doc.id for doc in document_store.filter_documents()}
+
+    seen = set()
+    to_embed = {}
+    unchanged = 0
+    for data_file in article_files(articles_dir):
+        key = data_file.as_posix()
+        seen.add(key)
+        text = read_article(data_file)
+        file_hash = content_hash(text)
+        entry = manifest.files.get(key)
+        if entry is not None and entry['sha256'] == file_hash and not reembed:
+            unchanged += 1
+            continue
+        doc = create_haystack_doc(text)
+        if doc.id in existing_ids and not reembed:
+            manifest.files[key] = {"sha256": file_hash, "doc_id": doc.id}
+            unchanged += 1
+            continue
+        to_embed[key] = (file_hash, doc)
+
+    removed = [key for key in manifest.files if key not in seen]
+    if bootstrapping:
+        # Anything in the store that no article file produces any more is stale
+        live_ids = {entry['doc_id'] for entry in manifest.files.values()}
+        stale_ids = existing_ids - live_ids
+    else:
+        stale_ids = set()
+
+    # Ids of changed or removed files go, unless another file still produces the same document
+    replaced_ids = {manifest.files[key]['doc_id'] for key in list(to_embed) + removed if key in manifest.files}
+    for key in removed:
+        del manifest.files[key]
+
+    if to_embed:
+        if doc_embedder is None:
+            doc_embedder = make_doc_embedder()
+        docs_to_embed = []
+        queued_ids = set()
+        for file_hash, doc in to_embed.values():
+            if doc.id not in queued_ids:
+                docs_to_embed.append(doc)
+                queued_ids.add(doc.id)
+        print(f"About to embed: {len(docs_to_embed)} documents")
+        metrics.DOCUMENTS.inc(len(docs_to_embed), stage="embed_articles")
+        embed_start = time.perf_counter()
+        with metrics.stage("embed_articles"):
+            docs_with_embeddings = doc_embedder.run(docs_to_embed)
+        embed_seconds = time.perf_counter() - embed_start
+        # Overwrite anything with the same id so a rerun after a crash can't fail on duplicates
+        with metrics.stage("write_articles"):
+            document_store.delete_documents([doc.id for doc in docs_with_embeddings["documents"]])
+            document_store.write_documents(docs_with_embeddings["documents"])
+        for key, (file_hash, doc) in to_embed.items():
+            manifest.files[key] = {"sha256": file_hash, "doc_id": doc.id}
+
+    live_ids = {entry['doc_id'] for entry in manifest.files.values()}
+    ids_to_delete = sorted((replaced_ids | stale_ids) - live_ids)
+    if ids_to_delete:
+        document_store.delete_documents(ids_to_delete)
+
+    summary = {"embedded": len(to_embed),
+               "deleted": len(ids_to_delete),
+               "unchanged": unchanged}
+    if to_embed:
+        summary["docs_per_second"] = round(len(docs_to_embed) / max(embed_seconds, 1e-9), 1)
+    if to_embed or ids_to_delete or bootstrapping or reembed:
+        manifest.version += 1
+        manifest.embedder = embedder_signature()
+        manifest.save()
+    summary["version"] = manifest.version
+    print(f"Ingestion finished: {summary}")
+    return summary
+
+
+def ingest_chunks(chunk_store, source_dir=SOURCE_DIR, articles_dir=NEWS_SOURCES_DIR, persist_path=PATH_TO_PERSISTENT, doc_embedder=None):
+    """
+    Splits the sources/ folders, the email headers and the news articles into chunks and embeds
+    them into chunk_store for retrieval. Like ingest_articles, only new or changed files are
+    re-chunked and re-embedded, and the chunks of deleted files are removed.
+    """
+    manifest = IngestManifest(Path(persist_path) / CHUNK_MANIFEST_NAME)
+    reembed = manifest.embedder != embedder_signature()
+
+    seen = set()
+    to_embed = {}
+    unchanged = 0
+    for folder, data_file in chunkable_files(source_dir, articles_dir):
+        key = data_file.as_posix()
+        seen.add(key)
+        text = read_text_file(data_file)
+        file_hash = content_hash(text)
+        entry = manifest.files.get(key)
+        if entry is not None and entry['sha256'] == file_hash and not reembed:
+            unchanged += 1
+            continue
+        to_embed[key] = (file_hash, [Document(content=content, meta=meta) for content, meta in chunk_file(folder, data_file, text)])
+
+    removed = [key for key in manifest.files if key not in seen]
+    old_ids = [doc_id for key in list(to_embed) + removed if key in manifest.files for doc_id in manifest.files[key]['doc_ids']]
+    if old_ids:
+        chunk_store.delete_documents(old_ids)
+    for key in removed:
+        del manifest.files[key]
+
+    docs_to_embed = [doc for _, docs in to_embed.values() for doc in docs]
+    if docs_to_embed:
+        if doc_embedder is None:
+            doc_embedder = make_chunk_embedder()
+        print(f"About to embed: {len(docs_to_embed)} chunks")
+        metrics.DOCUMENTS.inc(len(docs_to_embed), stage="embed_chunks")
+        embed_start = time.perf_counter()
+        with metrics.stage("embed_chunks"):
+            docs_with_embeddings = doc_embedder.run(docs_to_embed)
+        embed_seconds = time.perf_counter() - embed_start
+        with metrics.stage("write_chunks"):
+            chunk_store.delete_documents([doc.id for doc in docs_with_embeddings["documents"]])
+            chunk_store.write_documents(docs_with_embeddings["documents"])
+    for key, (file_hash, docs) in to_embed.items():
+        manifest.files[key] = {"sha256": file_hash, "doc_ids": [doc.id for doc in docs]}
+
+    summary = {"files_embedded": len(to_embed),
+               "chunks_embedded": len(docs_to_embed),
+               "chunks_deleted": len(old_ids),
+               "unchanged": unchanged}
+    if docs_to_embed:
+        summary["docs_per_second"] = round(len(docs_to_embed) / max(embed_seconds, 1e-9), 1)
+    if to_embed or removed or reembed:
+        manifest.version += 1
+        manifest.embedder = embedder_signature()
+        manifest.save()
+    summary["version"] = manifest.version
+    print(f"Chunk ingestion finished: {summary}")
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Embed new or changed news articles and source documents into the Chroma document store")
+    parser.add_argument('--articles-dir', default=str(NEWS_SOURCES_DIR))
+    parser.add_argument('--source-dir', default=SOURCE_DIR)
+    parser.add_argument('--persist-path', default=str(PATH_TO_PERSISTENT))
+    parser.add_argument('--skip-chunks', action='store_true', help="Don't update the retrieval chunks used by /llm_query")
+    args = parser.parse_args()
+
+    print("Initializing ChromaDocumentStore")
+    document_store = ChromaDocumentStore(persist_path=args.persist_path)
+    ingest_articles(document_store, articles_dir=args.articles_dir, persist_path=args.persist_path)
+    if not args.skip_chunks:
+        ingest_chunks(make_chunk_store(args.persist_path), source_dir=args.source_dir, articles_dir=args.articles_dir, persist_path=args.persist_path)
@@ -0,0 +1,155 @@
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+def normalize_query(query):
+    # "What is POK?" and "  what is pok " should hit the same answer
+    query = re.sub(r'\s+', ' ', query.strip().lower())
+    return query.rstrip('?!. ')
+
+
+def folder_signature(paths):
+    # (path, mtime, size) for every file under the given paths. Only stats the files,
+    # so it is cheap next to actually reading them.
+    signature = []
+    for path in paths:
+        path = Path(path)
+        if path.is_file():
+            stat = path.stat()
+            signature.append((path.as_posix(), stat.st_mtime, stat.st_size))
+            continue
+        for root, _, files in os.walk(path):
+            for file in sorted(files):
+                file_path = Path(root) / file
+                stat = file_path.stat()
+                signature.append((file_path.as_posix(), stat.st_mtime, stat.st_size))
+    return tuple(signature)
+
+
+def corpus_version(signature):
+    return hashlib.sha1(json.dumps(signature).encode('utf-8')).hexdigest()[:16]
+
+
+class LRUCache:
+    """
+    A thread-safe LRU cache whose entries expire after ttl seconds. With disk_path set, entries
+    are also written to a small sqlite file, so they survive restarts and are shared by every
+    worker process pointed at the same file. Values must be JSON serializable.
+    """
+
+    def __init__(self, maxsize=256, ttl=3600, disk_path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "disk_hits": 0}
+        self.disk_path = disk_path
+        self.db = None
+        self.open_disk()
+
+    def open_disk(self):
+        if self.disk_path is not None:
+            Path(self.disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self.db = sqlite3.connect(str(self.disk_path), check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, stored_at REAL)")
+            self.db.commit()
+
+    def reopen(self):
+        # For a forked process: a fresh lock and sqlite connection, keeping the in-memory entries
+        self.lock = threading.Lock()
+        self.open_disk()
+
+    def is_fresh(self, stored_at):
+        return self.ttl is None or time.time() - stored_at < self.ttl
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if self.is_fresh(entry[1]):
+                    self.entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[0]
+                del self.entries[key]
+                self.stats["expired"] += 1
+
+            if self.db is not None:
+                row = self.db.execute("SELECT value, stored_at FROM cache WHERE key = ?", (key,)).fetchone()
+                if row is not None and self.is_fresh(row[1]):
+                    value = json.loads(row[0])
+                    self._put(key, value, row[1])
+                    self.stats["hits"] += 1
+                    self.stats["disk_hits"] += 1
+                    return value
+
+            self.stats["misses"] += 1
+            return default
+
+    def _put(self, key, value, stored_at):
+        self.entries[key] = (value, stored_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def set(self, key, value):
+        stored_at = time.time()
+        with self.lock:
+            self._put(key, value, stored_at)
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)", (key, json.dumps(value), stored_at))
+                if self.ttl is not None:
+                    self.db.execute("DELETE FROM cache WHERE stored_at < ?", (stored_at - self.ttl,))
+                self.db.commit()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            if self.db is not None:
+                self.db.execute("DELETE FROM cache")
+                self.db.commit()
+
+    def info(self):
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {**self.stats,
+                    "size": len(self.entries),
+                    "maxsize": self.maxsize,
+                    "ttl": self.ttl,
+                    "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+                    "on_disk": self.db is not None}
+
+
+class LLMCache:
+    """
+    The two levels of caching in front of /llm_query: the assembled context for a folder set
+    (rebuilt when any file under those folders changes), and the answer for a
+    (normalized query, folder set, corpus version, options) key.
+    """
+
+    def __init__(self, context_maxsize=16, answer_maxsize=256, ttl=3600, disk_path=None):
+        # Contexts can be megabytes, so they are kept in memory only and there are few of them
+        self.contexts = LRUCache(maxsize=context_maxsize, ttl=None)
+        self.answers = LRUCache(maxsize=answer_maxsize, ttl=ttl, disk_path=disk_path)
+
+    def context(self, folders, signature, build):
+        # Keyed on the corpus version too, so a stale context is never returned and just ages out
+        key = json.dumps([sorted(folders), corpus_version(signature)])
+        all_context = self.contexts.get(key)
+        if all_context is None:
+            all_context = build()
+            self.contexts.set(key, all_context)
+        return all_context
+
+    def answer_key(self, query, folders, signature, **options):
+        return json.dumps([normalize_query(query), sorted(folders), corpus_version(signature), options], sort_keys=True)
+
+    def info(self):
+        return {"context": self.contexts.info(), "answer": self.answers.info()}
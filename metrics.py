@@ -0,0 +1,262 @@
+from collections import Counter as Tally
+from contextlib import contextmanager
+from pathlib import Path
+import os
+import sys
+import threading
+import time
+
+# Seconds; covers everything from a cached lookup to a cold Gemini call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PROFILE_HEADER = 'X-Profile'
+PROFILE_INTERVAL = 0.005
+
+
+def format_labels(labelnames, values):
+    if not labelnames:
+        return ""
+    pairs = []
+    for name, value in zip(labelnames, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric:
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, self.labelnames, key, value) for key, value in sorted(self.values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            # [count per bucket (not cumulative), sum, count]
+            series = self.values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        samples = []
+        bucket_labels = self.labelnames + ('le',)
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append((f"{self.name}_bucket", bucket_labels, key + (bound,), cumulative))
+                samples.append((f"{self.name}_bucket", bucket_labels, key + ('+Inf',), count))
+                samples.append((f"{self.name}_sum", self.labelnames, key, round(total, 6)))
+                samples.append((f"{self.name}_count", self.labelnames, key, count))
+        return samples
+
+
+class Registry:
+    """
+    The app's metrics, rendered in the Prometheus text format by /metrics. Besides the metrics
+    created here, collectors can be registered: callables returning [(name, kind, documentation,
+    [(labels dict, value)])], read at render time, for numbers that are already tracked elsewhere
+    (like the cache statistics).
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.add(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector):
+        self.collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labelnames, key, value in metric.samples():
+                lines.append(f"{name}{format_labels(labelnames, key)} {value}")
+        for collector in self.collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{format_labels(tuple(labels), tuple(labels.values()))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram('vafinal_request_duration_seconds',
+                                     'Time from receiving a request to returning its response',
+                                     ['endpoint', 'method', 'status'])
+REQUESTS_IN_FLIGHT = REGISTRY.gauge('vafinal_requests_in_flight', 'Requests currently being handled')
+STAGE_SECONDS = REGISTRY.histogram('vafinal_stage_duration_seconds',
+                                   'Time spent in each stage of request handling', ['stage'])
+BYTES_READ = REGISTRY.counter('vafinal_bytes_read_total', 'Characters of corpus text read from disk', ['stage'])
+DOCUMENTS = REGISTRY.counter('vafinal_documents_total', 'Documents read, embedded, scored or projected', ['stage'])
+PROMPT_CHARACTERS = REGISTRY.counter('vafinal_prompt_characters_total',
+                                     'Characters of context and question sent to the LLM', ['mode'])
+EMBEDDINGS = REGISTRY.counter('vafinal_embeddings_total', 'Texts embedded by the model or found in the embedding cache',
+                              ['backend', 'source'])
+LLM_PENDING = REGISTRY.gauge('vafinal_llm_pending', 'LLM calls running or queued on the executor')
+LLM_REJECTED = REGISTRY.counter('vafinal_llm_rejected_total', 'LLM calls refused or abandoned', ['reason'])
+TIME_TO_FIRST_TOKEN = REGISTRY.histogram('vafinal_llm_time_to_first_token_seconds',
+                                         'Time from a streaming request to its first answer token')
+
+# The stages timed during the current request on this thread, for the Server-Timing header
+_request = threading.local()
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        timings = getattr(_request, 'timings', None)
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack every interval seconds from a background thread, and
+    tallies the stacks in collapsed form ("module:function;module:function ... count"), which
+    flamegraph.pl and speedscope read directly. Cheap enough to switch on for a single request.
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Tally()
+        self.running = threading.Event()
+        self.thread = threading.Thread(target=self.sample, name="profiler", daemon=True)
+
+    def start(self):
+        self.running.set()
+        self.thread.start()
+
+    def stop(self):
+        self.running.clear()
+        self.thread.join()
+        return self.stacks
+
+    def sample(self):
+        while self.running.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def save(self, path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def init_app(app, profile_dir, allow_profiling=False):
+    # Times every request by route and status, adds a Server-Timing header with the stages it went
+    # through, and, if allow_profiling, samples the stack of any request sent with "X-Profile: 1"
+    # into profile_dir, naming the file in an X-Profile-File response header.
+    from flask import request
+
+    @app.before_request
+    def start_request():
+        REQUESTS_IN_FLIGHT.inc()
+        _request.start = time.perf_counter()
+        _request.timings = {}
+        _request.profiler = None
+        if allow_profiling and request.headers.get(PROFILE_HEADER) == '1':
+            _request.profiler = SamplingProfiler(threading.get_ident())
+            _request.profiler.start()
+
+    @app.after_request
+    def finish_request(response):
+        start = getattr(_request, 'start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, method=request.method, status=response.status_code)
+        timings = [f'{name};dur={1000 * seconds:.2f}' for name, seconds in _request.timings.items()]
+        response.headers['Server-Timing'] = ", ".join(timings + [f'total;dur={1000 * elapsed:.2f}'])
+        if _request.profiler is not None:
+            _request.profiler.stop()
+            path = Path(profile_dir) / f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint.strip('/').replace('/', '_') or 'root'}-{os.getpid()}.txt"
+            _request.profiler.save(path)
+            _request.profiler = None
+            response.headers['X-Profile-File'] = path.as_posix()
+        return response
+
+    @app.teardown_request
+    def end_request(error=None):
+        if getattr(_request, 'profiler', None) is not None:
+            # The request failed before after_request could stop it
+            _request.profiler.stop()
+            _request.profiler = None
+        if getattr(_request, 'start', None) is not None:
+            REQUESTS_IN_FLIGHT.dec()
+            _request.start = None
+            _request.timings = None
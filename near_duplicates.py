@@ -0,0 +1,198 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from corpus import HEADER_VERSION, NEWS_SOURCES_DIR, article_files, parse_article, parse_published, read_article
+
+REFRESH_INTERVAL = 30
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+# 32 bands of 4 rows: pairs above ~0.42 Jaccard almost always share a band, pairs below ~0.2 rarely do
+BANDS = 32
+ROWS_PER_BAND = NUM_PERM // BANDS
+MERSENNE_PRIME = np.uint64(4294967311)
+DEFAULT_MIN_JACCARD = 0.5
+
+
+def shingles(text):
+    # Hashes of every run of SHINGLE_WORDS words, so copied paragraphs survive small edits elsewhere
+    words = re.findall(r'[a-z0-9]+', text.lower())
+    if len(words) < SHINGLE_WORDS:
+        words = words + [''] * (SHINGLE_WORDS - len(words))
+    return np.unique(np.fromiter((zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode('utf-8'))
+                                  for i in range(len(words) - SHINGLE_WORDS + 1)), dtype=np.uint64))
+
+
+class MinHashLSH:
+    """
+    MinHash signatures for every article, bucketed by band so that likely near-duplicates are
+    found by lookup instead of comparing every pair. Signatures are persisted to cache_dir and only
+    computed for new or edited articles; each one is matched against the existing buckets as it is
+    added, so the candidate pairs stay up to date without a full rebuild.
+    """
+
+    def __init__(self, cache_dir, articles_dir=NEWS_SOURCES_DIR):
+        self.articles_dir = Path(articles_dir)
+        self.signatures_path = Path(cache_dir) / 'minhash_signatures.npy'
+        self.sidecar_path = Path(cache_dir) / 'minhash_articles.json'
+        rng = np.random.default_rng(1)
+        self.a = rng.integers(1, 2 ** 32, NUM_PERM, dtype=np.uint64)
+        self.b = rng.integers(0, 2 ** 32, NUM_PERM, dtype=np.uint64)
+        self.lock = threading.Lock()
+        # path -> {"mtime", "size", "sha256", "title", "source", "published"}
+        self.articles = {}
+        self.signatures = {}
+        # one {band hash: set of paths} per band
+        self.buckets = [{} for _ in range(BANDS)]
+        # (path, path) -> estimated Jaccard similarity
+        self.pairs = {}
+        self.last_refresh = 0
+        self.loaded = False
+
+    def signature(self, text):
+        # a * x fits in 64 bits because both are below 2^32; the min over shingles is taken per permutation
+        hashes = shingles(text)
+        permuted = (self.a[:, None] * hashes[None, :] % MERSENNE_PRIME + self.b[:, None]) % MERSENNE_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def band_keys(self, signature):
+        return [signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes() for band in range(BANDS)]
+
+    def add(self, key, signature):
+        candidates = set()
+        for band, band_key in enumerate(self.band_keys(signature)):
+            bucket = self.buckets[band].setdefault(band_key, set())
+            candidates |= bucket
+            bucket.add(key)
+        for other in candidates:
+            jaccard = float(np.mean(signature == self.signatures[other]))
+            self.pairs[tuple(sorted((key, other)))] = jaccard
+        self.signatures[key] = signature
+
+    def remove(self, key):
+        signature = self.signatures.pop(key)
+        for band, band_key in enumerate(self.band_keys(signature)):
+            bucket = self.buckets[band].get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band][band_key]
+        for pair in [pair for pair in self.pairs if key in pair]:
+            del self.pairs[pair]
+
+    def load(self):
+        if not self.signatures_path.exists() or not self.sidecar_path.exists():
+            return
+        try:
+            with open(self.sidecar_path, 'r', encoding='utf-8') as f:
+                sidecar = json.load(f)
+            matrix = np.load(self.signatures_path)
+        except (OSError, ValueError):
+            return
+        if (sidecar.get('num_perm') != NUM_PERM or sidecar.get('shingle_words') != SHINGLE_WORDS
+                or sidecar.get('header_version') != HEADER_VERSION):
+            return
+        self.articles = sidecar['articles']
+        for key, row in zip(sidecar['keys'], matrix):
+            self.add(key, row)
+
+    def save(self):
+        self.signatures_path.parent.mkdir(parents=True, exist_ok=True)
+        keys = list(self.signatures)
+        matrix = np.array([self.signatures[key] for key in keys], dtype=np.uint32).reshape(len(keys), NUM_PERM)
+        with open(self.signatures_path, 'wb') as f:
+            np.save(f, matrix)
+        tmp_path = self.sidecar_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"num_perm": NUM_PERM, "shingle_words": SHINGLE_WORDS, "header_version": HEADER_VERSION,
+                       "keys": keys, "articles": self.articles}, f)
+        os.replace(tmp_path, self.sidecar_path)
+
+    def refresh(self, force=False):
+        with self.lock:
+            if not self.loaded:
+                self.load()
+                self.loaded = True
+            elif not force and time.time() - self.last_refresh < REFRESH_INTERVAL:
+                return
+
+            changed = False
+            seen = set()
+            for file_path in article_files(self.articles_dir):
+                key = file_path.as_posix()
+                seen.add(key)
+                stat = file_path.stat()
+                entry = self.articles.get(key)
+                if entry is not None and key in self.signatures and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+                    continue
+                text = read_article(file_path)
+                sha256 = hashlib.sha256(text.encode('utf-8', errors='ignore')).hexdigest()
+                if entry is not None and key in self.signatures and entry['sha256'] == sha256:
+                    entry['mtime'], entry['size'] = stat.st_mtime, stat.st_size
+                else:
+                    meta, body = parse_article(text)
+                    published = parse_published(meta.get('published', ''))
+                    if key in self.signatures:
+                        self.remove(key)
+                    self.articles[key] = {"mtime": stat.st_mtime,
+                                          "size": stat.st_size,
+                                          "sha256": sha256,
+                                          "title": meta.get('title', ''),
+                                          "source": meta.get('source') or file_path.parent.name,
+                                          "published": published.isoformat() if published else None}
+                    self.add(key, self.signature(body))
+                changed = True
+            for key in [key for key in self.articles if key not in seen]:
+                if key in self.signatures:
+                    self.remove(key)
+                del self.articles[key]
+                changed = True
+
+            if changed:
+                self.save()
+            self.last_refresh = time.time()
+
+    def article(self, key):
+        entry = self.articles[key]
+        return {"path": key, "title": entry['title'], "source": entry['source'], "published": entry['published']}
+
+    def derivatives(self, min_jaccard=DEFAULT_MIN_JACCARD, source=None, limit=None):
+        # Near-duplicate pairs, most similar first, each attributed to whichever article was
+        # published first (primary is None when the dates are equal or unknown). The per-outlet
+        # summary counts how often each outlet published first and how often it followed whom.
+        self.refresh()
+        pairs = []
+        outlets = {}
+        for (a, b), jaccard in self.pairs.items():
+            if jaccard < min_jaccard:
+                continue
+            first, second = self.articles[a], self.articles[b]
+            if source is not None and source not in (first['source'], second['source']):
+                continue
+            primary = None
+            if first['published'] and second['published'] and first['published'] != second['published']:
+                primary = a if first['published'] < second['published'] else b
+            pairs.append({"articles": [self.article(a), self.article(b)],
+                          "jaccard": round(jaccard, 3),
+                          "primary": primary})
+            if primary is not None:
+                derivative = b if primary == a else a
+                primary_source = self.articles[primary]['source']
+                derivative_source = self.articles[derivative]['source']
+                if primary_source != derivative_source:
+                    outlets.setdefault(primary_source, {"primary": 0, "derivative": 0, "copied_from": {}})['primary'] += 1
+                    summary = outlets.setdefault(derivative_source, {"primary": 0, "derivative": 0, "copied_from": {}})
+                    summary['derivative'] += 1
+                    summary['copied_from'][primary_source] = summary['copied_from'].get(primary_source, 0) + 1
+
+        pairs.sort(key=lambda pair: (-pair['jaccard'], pair['articles'][0]['path'], pair['articles'][1]['path']))
+        return {"pairs": pairs if limit is None else pairs[:limit],
+                "total": len(pairs),
+                "outlets": dict(sorted(outlets.items()))}
@@ -1,17 +1,108 @@
-from docx import Document
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+import argparse
+import hashlib
+import json
+import os
+
+from docx import Document
+
+from resume_index import CONVERTED_DIR
 
 source_dir = Path("sources/resumedox")
-output_dir = Path("sources/resumetxt")
-output_dir.mkdir(parents=True, exist_ok=True)
+# Read from here by ResumeIndex along with the Resumes folders
+output_dir = CONVERTED_DIR
+# What each .txt was converted from, so unchanged .docx files are skipped on the next run
+MANIFEST = ".manifest.json"
+
 
-for docx_file in source_dir.glob("*.docx"):
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def convert(docx_file, output_path):
+    # Runs in a worker process; returns an error message, or None on success
+    tmp_path = Path(output_path).with_suffix('.tmp')
     try:
         doc = Document(docx_file)
         text = "\n".join(paragraph.text for paragraph in doc.paragraphs if paragraph.text.strip())
-        output_path = output_dir / (docx_file.stem + ".txt")
-        with open(output_path, "w", encoding="utf-8") as f:
+        with open(tmp_path, "w", encoding="utf-8") as f:
             f.write(text)
-        print(f"Converted: {docx_file.name} → {output_path.name}")
+        os.replace(tmp_path, output_path)
+        return None
     except Exception as e:
-        print(f"Failed to convert {docx_file.name}: {e}")
+        tmp_path.unlink(missing_ok=True)
+        return str(e)
+
+
+def convert_all(source_dir=source_dir, output_dir=output_dir, workers=None, force=False):
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / MANIFEST
+    manifest = {}
+    if manifest_path.exists():
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+
+    # mtime and size first; only if they changed is the file hashed, and only if the hash changed
+    # (or the .txt is missing) is it converted again
+    pending = {}
+    current = {}
+    docx_files = sorted(source_dir.glob("*.docx"))
+    for docx_file in docx_files:
+        stat = docx_file.stat()
+        output_path = output_dir / (docx_file.stem + ".txt")
+        entry = None if force else manifest.get(docx_file.name)
+        if entry is not None and output_path.exists():
+            if entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+                current[docx_file.name] = entry
+                continue
+            sha = file_hash(docx_file)
+            if entry['sha256'] == sha:
+                current[docx_file.name] = {**entry, "mtime": stat.st_mtime, "size": stat.st_size}
+                continue
+        else:
+            sha = file_hash(docx_file)
+        pending[docx_file] = (output_path, {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": sha})
+
+    # A .docx that was deleted takes its .txt with it, or the resume would stay in the index
+    names = {docx_file.name for docx_file in docx_files}
+    removed = [name for name in manifest if name not in names]
+    for name in removed:
+        (output_dir / (Path(name).stem + ".txt")).unlink(missing_ok=True)
+        print(f"Removed: {Path(name).stem}.txt")
+
+    failed = {}
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {docx_file: pool.submit(convert, docx_file, output_path)
+                       for docx_file, (output_path, _) in pending.items()}
+            for docx_file, future in futures.items():
+                error = future.result()
+                if error is None:
+                    current[docx_file.name] = pending[docx_file][1]
+                    print(f"Converted: {docx_file.name} → {pending[docx_file][0].name}")
+                else:
+                    failed[docx_file.name] = error
+                    print(f"Failed to convert {docx_file.name}: {error}")
+
+    tmp_path = manifest_path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(current, f, indent=1)
+    os.replace(tmp_path, manifest_path)
+    print(f"{len(pending) - len(failed)} converted, {len(current) - len(pending) + len(failed)} unchanged, "
+          f"{len(removed)} removed, {len(failed)} failed")
+    return failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert resume .docx files to text, skipping unchanged ones")
+    parser.add_argument('--source', default=str(source_dir))
+    parser.add_argument('--output', default=str(output_dir))
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument('--force', action='store_true', help="convert every file, changed or not")
+    args = parser.parse_args()
+    convert_all(Path(args.source), Path(args.output), args.workers, args.force)
@@ -0,0 +1,65 @@
+from pathlib import Path
+import re
+import threading
+import time
+
+# Where resume_convert.py writes the text of the .docx resumes
+CONVERTED_DIR = Path('sources/resumetxt')
+RESUME_DIRS = [Path('Sources/Resumes'), CONVERTED_DIR, Path('sources/Resumes')]
+REFRESH_INTERVAL = 30
+
+
+def resume_key(name):
+    # "Ada Campo-Corrente", "AdaCampoCorrente" and Resume-AdaCampoCorrente.txt all map to "adacampocorrente"
+    return re.sub(r'[^a-z0-9]', '', re.sub(r'^resume-', '', name.lower()))
+
+
+class ResumeIndex:
+    """
+    The text of every resume in dirs, held in memory and keyed by the person's name, so a node
+    click on the People page is a dictionary lookup. Both resume folders and the converter's
+    output are merged; a file in a later directory wins over one with the same name in an earlier
+    one. Files are re-read only when their mtime or size changes.
+    """
+
+    def __init__(self, dirs=RESUME_DIRS):
+        self.dirs = [Path(d) for d in dirs]
+        self.lock = threading.Lock()
+        # key -> {"path", "mtime", "size", "text"}
+        self.resumes = {}
+        self.last_refresh = 0
+
+    def refresh(self, force=False):
+        with self.lock:
+            if not force and self.last_refresh and time.time() - self.last_refresh < REFRESH_INTERVAL:
+                return
+            resumes = {}
+            for directory in self.dirs:
+                if not directory.is_dir():
+                    continue
+                for file_path in sorted(directory.glob('*.txt')):
+                    key = resume_key(file_path.stem)
+                    stat = file_path.stat()
+                    entry = self.resumes.get(key)
+                    if entry is None or entry['path'] != file_path.as_posix() or entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size:
+                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                            entry = {"path": file_path.as_posix(), "mtime": stat.st_mtime,
+                                     "size": stat.st_size, "text": f.read()}
+                    resumes[key] = entry
+            self.resumes = resumes
+            self.last_refresh = time.time()
+
+    def text(self, name):
+        self.refresh()
+        entry = self.resumes.get(resume_key(name))
+        return entry['text'] if entry else None
+
+    def texts(self, names):
+        # {name: text} for the names that have a resume
+        self.refresh()
+        found = {}
+        for name in names:
+            entry = self.resumes.get(resume_key(name))
+            if entry:
+                found[name] = entry['text']
+        return found
@@ -0,0 +1,114 @@
+from pathlib import Path
+import csv
+import os
+
+from corpus import NEWS_SOURCES_DIR, parse_article
+from term_index import EMAIL_HEADERS_FILE
+
+SOURCE_DIR = 'sources'
+NEWS_FOLDER = 'News Articles'
+CHUNK_COLLECTION = 'chunks'
+
+CHUNK_WORDS = 220
+CHUNK_OVERLAP = 40
+EMAIL_ROWS_PER_CHUNK = 15
+DEFAULT_TOP_K = 20
+DEFAULT_TOKEN_BUDGET = 6000
+
+
+def approx_tokens(text):
+    # Roughly 4 characters per token for English text, which is close enough for budgeting
+    return len(text) // 4 + 1
+
+
+def chunk_words(text, size=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    words = text.split()
+    if not words:
+        return []
+    step = size - overlap
+    return [" ".join(words[i:i + size]) for i in range(0, max(len(words) - overlap, 1), step)]
+
+
+def chunkable_files(source_dir=SOURCE_DIR, articles_dir=NEWS_SOURCES_DIR):
+    # Yields (folder, path) for everything the LLM page can select: each folder under
+    # sources/, the email header CSV, and the news articles as a single "News Articles" folder
+    source_dir = Path(source_dir)
+    for folder in sorted(os.listdir(source_dir)):
+        folder_path = source_dir / folder
+        if folder_path.is_dir():
+            for root, _, files in os.walk(folder_path):
+                for file in sorted(files):
+                    if file.endswith('.txt'):
+                        yield folder, Path(root) / file
+    if (source_dir / EMAIL_HEADERS_FILE).is_file():
+        yield EMAIL_HEADERS_FILE, source_dir / EMAIL_HEADERS_FILE
+    for data_file in sorted(Path(articles_dir).glob('*/*.txt')):
+        yield NEWS_FOLDER, data_file
+
+
+def chunk_file(folder, path, text):
+    # Returns a list of (content, meta) pairs for one file
+    path = Path(path)
+    base_meta = {"folder": folder, "path": path.as_posix(), "title": path.stem, "source": folder, "published": ""}
+    if folder == EMAIL_HEADERS_FILE:
+        rows = [f"From: {row.get('From', '')} | To: {row.get('To', '')} | Date: {row.get('Date', '')} | Subject: {row.get('Subject', '')}"
+                for row in csv.DictReader(text.splitlines())]
+        pieces = ["\n".join(rows[i:i + EMAIL_ROWS_PER_CHUNK]) for i in range(0, len(rows), EMAIL_ROWS_PER_CHUNK)]
+        base_meta["title"] = "Email headers"
+    elif folder == NEWS_FOLDER:
+        meta, body = parse_article(text)
+        pieces = chunk_words(body)
+        base_meta.update({"title": meta["title"] or path.stem,
+                          "source": meta["source"] or path.parent.name,
+                          "published": meta["published"]})
+    else:
+        pieces = chunk_words(text)
+
+    return [(piece, {**base_meta, "chunk": i}) for i, piece in enumerate(pieces)]
+
+
+def retrieve_chunks(query_embedding, chunk_store, folders, top_k=DEFAULT_TOP_K):
+    from haystack_integrations.components.retrievers.chroma import ChromaEmbeddingRetriever
+
+    filters = None
+    if folders:
+        filters = {"field": "meta.folder", "operator": "in", "value": list(folders)}
+    retriever = ChromaEmbeddingRetriever(document_store=chunk_store, top_k=top_k)
+    return retriever.run(query_embedding=query_embedding, filters=filters)["documents"]
+
+
+def assemble_context(chunks, token_budget=DEFAULT_TOKEN_BUDGET):
+    # Packs the retrieved chunks, best first, skipping any that no longer fit in the token
+    # budget. Returns the context string and the chunks that made it in.
+    all_context = ""
+    used = []
+    tokens = 0
+    for chunk in chunks:
+        header = f"Source: {chunk.meta.get('source', '')} - {chunk.meta.get('title', '')}"
+        block = f"{header}\n\n Content: {chunk.content}\n\n"
+        block_tokens = approx_tokens(block)
+        if tokens + block_tokens > token_budget:
+            if used:
+                continue
+            # Always send at least one chunk, cut down to fit
+            block = block[:token_budget * 4]
+            block_tokens = approx_tokens(block)
+        all_context += block
+        tokens += block_tokens
+        used.append(chunk)
+    return all_context, used
+
+
+def supporting_sources(chunks):
+    supporting = []
+    seen = set()
+    for chunk in chunks:
+        key = (chunk.meta.get('folder'), chunk.meta.get('path'))
+        if key in seen:
+            continue
+        seen.add(key)
+        supporting.append({"title": chunk.meta.get('title', ''),
+                           "source": chunk.meta.get('source', ''),
+                           "folder": chunk.meta.get('folder', ''),
+                           "published": chunk.meta.get('published', '')})
+    return supporting
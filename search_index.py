@@ -0,0 +1,237 @@
+from pathlib import Path
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+
+from corpus import HEADER_VERSION, parse_published
+from entity_graph import DOCUMENT_ROOTS, document_files, document_meta
+from term_index import read_text_file
+
+REFRESH_INTERVAL = 30
+BM25_K1 = 1.2
+BM25_B = 0.75
+SNIPPET_CHARS = 240
+
+TOKEN = re.compile(r'[a-z0-9]+')
+QUERY_PART = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+
+def parse_query(query):
+    # Quoted parts are phrases that must appear as written; everything else is a bag of terms.
+    # Returns (terms, phrases), each phrase a list of tokens.
+    terms, phrases = [], []
+    for phrase, word in QUERY_PART.findall(query):
+        tokens = tokenize(phrase if phrase else word)
+        if phrase and len(tokens) > 1:
+            phrases.append(tokens)
+        else:
+            terms.extend(tokens)
+    return terms, phrases
+
+
+def phrase_count(positions_per_token):
+    # How often the tokens occur one after another, given each token's sorted positions in a document
+    following = positions_per_token[0]
+    for offset, positions in enumerate(positions_per_token[1:], start=1):
+        later = set(positions)
+        following = [start for start in following if start + offset in later]
+        if not following:
+            return 0
+    return len(following)
+
+
+class SearchIndex:
+    """
+    BM25 full-text index over the articles and source documents. Each document's positional
+    postings ({term: [token positions]}), length and metadata are persisted to index_path; the
+    inverted index is built from those in memory and patched per document when files change.
+    """
+
+    def __init__(self, index_path, roots=DOCUMENT_ROOTS):
+        self.index_path = Path(index_path)
+        self.roots = [Path(root) for root in roots]
+        self.lock = threading.Lock()
+        # path -> {"mtime", "size", "sha256", "meta", "length", "terms"}
+        self.documents = {}
+        # term -> {path: [positions]}
+        self.postings = {}
+        self.total_length = 0
+        self.last_refresh = 0
+        self.loaded = False
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                if index.get('header_version') == HEADER_VERSION:
+                    self.documents = index['documents']
+            except (OSError, ValueError, KeyError):
+                self.documents = {}
+
+    def add_postings(self, key):
+        document = self.documents[key]
+        for term, positions in document['terms'].items():
+            self.postings.setdefault(term, {})[key] = positions
+        self.total_length += document['length']
+
+    def remove_postings(self, key):
+        document = self.documents[key]
+        for term in document['terms']:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= document['length']
+
+    def index_document(self, file_path, stat, text, sha256):
+        meta, body = document_meta(file_path, text)
+        published = parse_published(meta.get('published', ''))
+        terms = {}
+        tokens = tokenize(meta['title']) + tokenize(body)
+        for position, token in enumerate(tokens):
+            terms.setdefault(token, []).append(position)
+        return {"mtime": stat.st_mtime,
+                "size": stat.st_size,
+                "sha256": sha256,
+                "meta": {"title": meta['title'],
+                         "source": meta['source'],
+                         "published": published.isoformat() if published else None,
+                         "location": meta.get('location', ''),
+                         "author": meta.get('author', '')},
+                "length": len(tokens),
+                "terms": terms}
+
+    def refresh(self, force=False):
+        with self.lock:
+            if not self.loaded:
+                for key in self.documents:
+                    self.add_postings(key)
+                self.loaded = True
+            elif not force and time.time() - self.last_refresh < REFRESH_INTERVAL:
+                return
+
+            changed = False
+            seen = set()
+            for file_path in document_files(self.roots):
+                key = file_path.as_posix()
+                seen.add(key)
+                stat = file_path.stat()
+                document = self.documents.get(key)
+                if document is not None and document['mtime'] == stat.st_mtime and document['size'] == stat.st_size:
+                    continue
+                text = read_text_file(file_path)
+                sha256 = hashlib.sha256(text.encode('utf-8', errors='ignore')).hexdigest()
+                if document is not None and document['sha256'] == sha256:
+                    document['mtime'], document['size'] = stat.st_mtime, stat.st_size
+                else:
+                    if document is not None:
+                        self.remove_postings(key)
+                    self.documents[key] = self.index_document(file_path, stat, text, sha256)
+                    self.add_postings(key)
+                changed = True
+            for key in [key for key in self.documents if key not in seen]:
+                self.remove_postings(key)
+                del self.documents[key]
+                changed = True
+
+            if changed:
+                self.index_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.index_path.with_suffix('.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({"header_version": HEADER_VERSION, "documents": self.documents}, f)
+                os.replace(tmp_path, self.index_path)
+            self.last_refresh = time.time()
+
+    def candidates(self, sources=None, start=None, end=None):
+        # Paths passing the metadata filters, or None when there are no filters
+        if sources is None and start is None and end is None:
+            return None
+        keep = set()
+        for key, document in self.documents.items():
+            meta = document['meta']
+            if sources is not None and meta['source'] not in sources:
+                continue
+            if start is not None or end is not None:
+                published = meta['published']
+                if published is None or (start is not None and published < start) or (end is not None and published > end):
+                    continue
+            keep.add(key)
+        return keep
+
+    def bm25(self, matches, df, n_documents, average_length):
+        # matches: {path: term frequency} for one term or phrase, found in df documents overall -> {path: score}
+        idf = math.log(1 + (n_documents - df + 0.5) / (df + 0.5))
+        scores = {}
+        for key, tf in matches.items():
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.documents[key]['length'] / average_length)
+            scores[key] = idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query, sources=None, start=None, end=None, limit=10):
+        # Documents must contain every phrase and, if there are no phrases, at least one term.
+        # Identical files (the resumes are in both sources/ and Sources/) are returned once.
+        self.refresh()
+        terms, phrases = parse_query(query)
+        allowed = self.candidates(sources, start, end)
+        n_documents = len(self.documents)
+        average_length = self.total_length / n_documents if n_documents else 1
+
+        required = None
+        scores = {}
+        for phrase in phrases:
+            postings = [self.postings.get(token, {}) for token in phrase]
+            matches = {}
+            for key in set.intersection(*(set(p) for p in postings)):
+                count = phrase_count([p[key] for p in postings])
+                if count:
+                    matches[key] = count
+            df = len(matches)
+            if allowed is not None:
+                matches = {key: count for key, count in matches.items() if key in allowed}
+            required = set(matches) if required is None else required & set(matches)
+            for key, score in self.bm25(matches, df, n_documents, average_length).items():
+                scores[key] = scores.get(key, 0.0) + score
+
+        for term in dict.fromkeys(terms):
+            postings = self.postings.get(term, {})
+            matches = {key: len(positions) for key, positions in postings.items()
+                       if (allowed is None or key in allowed) and (required is None or key in required)}
+            for key, score in self.bm25(matches, len(postings), n_documents, average_length).items():
+                scores[key] = scores.get(key, 0.0) + score
+        if required is not None:
+            scores = {key: score for key, score in scores.items() if key in required}
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        results = []
+        seen_hashes = set()
+        for key, score in ranked:
+            sha256 = self.documents[key]['sha256']
+            if sha256 in seen_hashes:
+                continue
+            seen_hashes.add(sha256)
+            if len(results) < limit:
+                results.append({"path": key, "score": round(score, 4), **self.documents[key]['meta'],
+                                "snippet": self.snippet(key, phrases[0] if phrases else terms[:1])})
+        return {"total": len(seen_hashes), "results": results}
+
+    def snippet(self, key, tokens):
+        # The body text around the first occurrence of the phrase or first term, read back from the file
+        try:
+            _, body = document_meta(Path(key), read_text_file(key))
+        except OSError:
+            return ""
+        match = None
+        if tokens:
+            pattern = r'(?<![a-z0-9])' + r'[^a-z0-9]+'.join(map(re.escape, tokens)) + r'(?![a-z0-9])'
+            match = re.search(pattern, body.lower())
+        begin = body.rfind(' ', 0, max(0, match.start() - SNIPPET_CHARS // 2)) + 1 if match else 0
+        snippet = " ".join(body[begin:begin + SNIPPET_CHARS].split())
+        return ("..." if begin else "") + snippet + ("..." if begin + SNIPPET_CHARS < len(body) else "")
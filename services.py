@@ -0,0 +1,331 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from pathlib import Path
+import os
+import queue
+import threading
+import time
+import traceback
+
+import metrics
+
+PATH_TO_PERSISTENT = Path('vectors/')
+RAG_gen_template = """
+Given the following contexts, answer the question to the best of your ability.
+Context:
+
+    {{ all_context }}
+
+Question: {{ query }}
+"""
+
+# At most LLM_WORKERS Gemini calls run at once and LLM_QUEUE more may wait; past that, LLM requests
+# are turned away with a 503 instead of tying up request threads. Calls give up after LLM_TIMEOUT seconds.
+LLM_WORKERS = int(os.environ.get('LLM_WORKERS', 4))
+LLM_QUEUE = int(os.environ.get('LLM_QUEUE', 8))
+LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', 60))
+
+
+class Overloaded(Exception):
+    pass
+
+
+class LLMTimeout(Exception):
+    pass
+
+
+class LazyService:
+    """
+    Builds a heavy object (a pipeline, a document store, ...) the first time it is asked for,
+    and remembers whether it is cold, warming, ready or failed so /ready can report on it.
+    Concurrent callers wait for the one build instead of starting their own.
+    """
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.lock = threading.Lock()
+        self.value = None
+        self.state = "cold"
+        self.error = None
+        self.seconds = None
+
+    def get(self):
+        if self.state == "ready":
+            return self.value
+        with self.lock:
+            if self.state != "ready":
+                self.state = "warming"
+                start = time.perf_counter()
+                try:
+                    self.value = self.factory()
+                except Exception as e:
+                    self.state = "failed"
+                    self.error = repr(e)
+                    raise
+                self.seconds = round(time.perf_counter() - start, 2)
+                self.state = "ready"
+                self.error = None
+        return self.value
+
+    def reset(self):
+        # Back to cold with a fresh lock, for a forked process that must not reuse the parent's value
+        self.lock = threading.Lock()
+        self.value = None
+        self.state = "cold"
+        self.error = None
+        self.seconds = None
+
+    def status(self):
+        status = {"state": self.state}
+        if self.seconds is not None:
+            status["seconds"] = self.seconds
+        if self.error is not None:
+            status["error"] = self.error
+        return status
+
+
+class BoundedExecutor:
+    """
+    A thread pool for the network-bound LLM calls that accepts at most workers + max_queued calls
+    at a time: beyond that, submit() raises Overloaded immediately rather than letting requests
+    pile up behind slow questions. The pool is created on first use in each process, so it is safe
+    to build this before a preloading server forks its workers.
+    """
+
+    def __init__(self, workers, max_queued, timeout):
+        self.workers = workers
+        self.capacity = workers + max_queued
+        self.timeout = timeout
+        self.reset()
+
+    def reset(self):
+        # Also zeroes the gauge, which a forked worker would otherwise inherit from the master
+        self.lock = threading.Lock()
+        self.pool = None
+        self.pending = 0
+        metrics.LLM_PENDING.set(0)
+
+    def submit(self, fn, *args, **kwargs):
+        with self.lock:
+            if self.pending >= self.capacity:
+                metrics.LLM_REJECTED.inc(reason="overloaded")
+                raise Overloaded(f"{self.pending} LLM calls already running or queued")
+            self.pending += 1
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="llm")
+        metrics.LLM_PENDING.inc()
+        try:
+            future = self.pool.submit(fn, *args, **kwargs)
+        except Exception:
+            self.release()
+            raise
+        future.add_done_callback(lambda _: self.release())
+        return future
+
+    def release(self):
+        with self.lock:
+            self.pending -= 1
+        metrics.LLM_PENDING.dec()
+
+    def result(self, future, timeout=None):
+        # A call that times out keeps its slot until it actually finishes, so timeouts still count
+        # against the capacity
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            metrics.LLM_REJECTED.inc(reason="timeout")
+            raise LLMTimeout(f"No answer within {self.timeout if timeout is None else timeout} seconds")
+
+    def info(self):
+        with self.lock:
+            return {"workers": self.workers, "capacity": self.capacity, "pending": self.pending, "timeout": self.timeout}
+
+
+llm_executor = BoundedExecutor(LLM_WORKERS, LLM_QUEUE, LLM_TIMEOUT)
+
+
+def build_answer_pipeline():
+    from haystack import Pipeline
+    from haystack.components.builders.prompt_builder import PromptBuilder
+
+    # Creates the answer pipeline. LLM_BACKEND=stub swaps Gemini for a local canned generator.
+    answer_prompt_builder = PromptBuilder(template=RAG_gen_template, required_variables={"all_context", "query"})
+    if os.environ.get('LLM_BACKEND') == 'stub':
+        from stub_llm import stub_from_env
+        answer_generator = stub_from_env()
+    else:
+        from haystack_integrations.components.generators.google_ai import GoogleAIGeminiGenerator
+        answer_generator = GoogleAIGeminiGenerator(model="gemini-2.0-flash-lite")
+
+    answer_pipeline = Pipeline()
+    answer_pipeline.add_component("answer_builder", answer_prompt_builder)
+    answer_pipeline.add_component("llm_answer_generator", answer_generator)
+    answer_pipeline.connect("answer_builder", "llm_answer_generator")
+    print("Established llm answer pipeline")
+    return answer_pipeline
+
+
+def build_document_store():
+    from haystack_integrations.document_stores.chroma import ChromaDocumentStore
+
+    print("Initializing ChromaDocumentStore")
+    return ChromaDocumentStore(persist_path=str(PATH_TO_PERSISTENT))
+
+
+def run_ingestion():
+    from ingest import ingest_articles
+
+    # Embed any new or changed articles (the first run embeds everything, which takes about 3 minutes)
+    return ingest_articles(document_store.get(), persist_path=PATH_TO_PERSISTENT)
+
+
+def build_chunk_store():
+    from ingest import make_chunk_store
+
+    return make_chunk_store(PATH_TO_PERSISTENT)
+
+
+def build_text_embedder():
+    from embedding_backend import BackendTextEmbedder, shared_embedder
+
+    # Same model and backend as the chunk embedder, so queries and chunks share an embedding space
+    text_embedder = BackendTextEmbedder(shared_embedder())
+    text_embedder.warm_up()
+    return text_embedder
+
+
+def run_chunk_ingestion():
+    from ingest import ingest_chunks
+
+    return ingest_chunks(chunk_store.get(), persist_path=PATH_TO_PERSISTENT)
+
+
+answer_pipeline = LazyService("answer_pipeline", build_answer_pipeline)
+document_store = LazyService("document_store", build_document_store)
+ingestion = LazyService("ingestion", run_ingestion)
+chunk_store = LazyService("chunk_store", build_chunk_store)
+text_embedder = LazyService("text_embedder", build_text_embedder)
+chunk_ingestion = LazyService("chunk_ingestion", run_chunk_ingestion)
+
+ALL_SERVICES = [answer_pipeline, document_store, ingestion, chunk_store, text_embedder, chunk_ingestion]
+
+
+def run_answer_pipeline(all_context, query):
+    result = answer_pipeline.get().run(
+        data={
+            "answer_builder": {
+                "all_context": all_context,
+                "query": query
+            }
+        }
+    )
+    return str(result['llm_answer_generator']['replies'][0])
+
+
+def answer(all_context, query):
+    # One answer, computed on the LLM executor; raises Overloaded or LLMTimeout
+    return llm_executor.result(llm_executor.submit(run_answer_pipeline, all_context, query))
+
+
+def ingested_document_store():
+    # The article store once ingestion has brought it up to date with the corpus; until then it may
+    # be empty or hold stale articles, and the manifest that versions it may not have been written
+    ingestion.get()
+    return document_store.get()
+
+
+def retrieve_context(query, folders, token_budget, top_k):
+    # Embeds the query, pulls the top_k closest chunks from the selected folders and packs as
+    # many as fit in token_budget. Returns the context and the titles/sources it came from.
+    from retrieval import retrieve_chunks, assemble_context, supporting_sources
+
+    chunk_ingestion.get()
+    embedder, store = text_embedder.get(), chunk_store.get()
+    with metrics.stage("embed_query"):
+        query_embedding = embedder.run(text=query)["embedding"]
+    with metrics.stage("retrieve_chunks"):
+        chunks = retrieve_chunks(query_embedding, store, folders, top_k=top_k)
+    metrics.DOCUMENTS.inc(len(chunks), stage="retrieve_chunks")
+    all_context, used = assemble_context(chunks, token_budget=token_budget)
+    return all_context, supporting_sources(used)
+
+
+def stream_answer(all_context, query):
+    # Runs the answer pipeline on the LLM executor and yields the reply in pieces as the generator
+    # streams them. If the generator doesn't stream, the whole reply is yielded at the end.
+    pieces = queue.Queue()
+    finished = object()
+
+    def run_pipeline():
+        try:
+            result = answer_pipeline.get().run(
+                data={
+                    "answer_builder": {
+                        "all_context": all_context,
+                        "query": query
+                    },
+                    "llm_answer_generator": {
+                        "streaming_callback": lambda chunk: pieces.put(chunk.content)
+                    }
+                }
+            )
+            pieces.put((finished, result, None))
+        except Exception as e:
+            pieces.put((finished, None, e))
+
+    llm_executor.submit(run_pipeline)
+    streamed = False
+    while True:
+        try:
+            piece = pieces.get(timeout=llm_executor.timeout)
+        except queue.Empty:
+            metrics.LLM_REJECTED.inc(reason="timeout")
+            raise LLMTimeout(f"No output for {llm_executor.timeout} seconds")
+        if isinstance(piece, tuple) and piece[0] is finished:
+            _, result, error = piece
+            if error is not None:
+                raise error
+            if not streamed:
+                yield str(result['llm_answer_generator']['replies'][0])
+            return
+        if piece:
+            streamed = True
+            yield piece
+
+
+def warm_up():
+    for service in ALL_SERVICES:
+        try:
+            service.get()
+        except Exception:
+            print(f"Warming up {service.name} failed:")
+            traceback.print_exc()
+
+
+def start_background_warmup():
+    thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def reset_after_fork():
+    # The Chroma clients hold sqlite connections, which must not cross a fork: reopen them in the
+    # worker. The models (and ingestion, which is done) are kept. The executor's threads did not
+    # survive the fork, so it starts a new pool.
+    import embedding_backend
+
+    for service in ALL_SERVICES:
+        service.lock = threading.Lock()
+    llm_executor.reset()
+    embedding_backend.reset_after_fork()
+    for service in (document_store, chunk_store):
+        if service.state == "ready":
+            service.reset()
+            service.get()
+
+
+def readiness(names=None):
+    statuses = {service.name: service.status() for service in ALL_SERVICES}
+    wanted = names or list(statuses)
+    ready = all(statuses.get(name, {}).get("state") == "ready" for name in wanted)
+    return ready, statuses
@@ -1,7 +1,7 @@
 let fullData;
 let selectedSources = [];
 
-fetch("static/data/bias_data.json")
+fetch("/bias_data")
   .then(response => response.json())
   .then(data => {
     fullData = data;
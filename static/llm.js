@@ -21,16 +21,85 @@ function submitQuery() {
 
     const folders = Array.from(document.querySelectorAll("input[name='folder']:checked"))
                          .map(cb => cb.value);
+    const mode = d3.select("#retrieval_mode").property("checked") ? "retrieval" : "full";
 
-    fetch("/llm_query", {
-        method: "POST",
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ query: user_query, folders: folders })
-    })
-    .then(async function(response) {
-        return await response.json();
-    })
-    .then(results => updateMessage(typingNode, results));
+    streamQuery({ query: user_query, folders: folders, mode: mode }, typingNode);
+}
+
+// Reads the server-sent events from /llm_query_stream, re-rendering the answer as tokens arrive
+async function streamQuery(body, typingNode) {
+    let answer = "";
+
+    let response;
+    try {
+        response = await fetch("/llm_query_stream", {
+            method: "POST",
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(body)
+        });
+    } catch (error) {
+        showError(typingNode, answer, error.message);
+        return;
+    }
+    // A request refused before streaming started (a bad parameter, say) comes back as JSON
+    if (!response.ok) {
+        const results = await response.json().catch(() => ({}));
+        showError(typingNode, answer, results.error || `${response.status} ${response.statusText}`);
+        return;
+    }
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let eventName = "message";
+            let data = "";
+            rawEvent.split("\n").forEach(line => {
+                if (line.startsWith("event: ")) eventName = line.slice(7);
+                else if (line.startsWith("data: ")) data += line.slice(6);
+            });
+            const payload = JSON.parse(data);
+
+            if (eventName === "token") {
+                answer += payload.text;
+                updateMessage(typingNode, answer);
+            } else if (eventName === "done") {
+                updateMessage(typingNode, formatAnswer({ ...payload, answer: answer }));
+            } else if (eventName === "error") {
+                showError(typingNode, answer, payload.error);
+            }
+        }
+    }
+}
+
+function showError(typingNode, answer, error) {
+    updateMessage(typingNode, answer + "\n\n*Something went wrong: " + error + "*");
+}
+
+// Retrieval answers come back with the documents they were drawn from
+function formatAnswer(results) {
+    if (typeof results === "string") {
+        return results;
+    }
+    let text = results.answer;
+    if (results.supporting && results.supporting.length > 0) {
+        const lines = results.supporting.map(doc => {
+            const published = doc.published ? ` (${doc.published})` : "";
+            return `- ${doc.title} — *${doc.source}*${published}`;
+        });
+        text += "\n\n**Sources:**\n" + lines.join("\n");
+    }
+    return text;
 }
 
 function appendMessage(sender, text) {
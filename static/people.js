@@ -100,15 +100,85 @@ document.addEventListener("DOMContentLoaded", () => {
     row.append("span").text(team);
   });
 
+  // Actual email traffic between GAStech employees, overlaid on the relationship links
+  let emailLinks = [];
+  const showEmails = checkboxContainer.append("label")
+    .style("margin-left", "40px")
+    .style("display", "flex")
+    .style("align-items", "center");
+  showEmails.append("input")
+    .attr("type", "checkbox")
+    .style("margin-right", "5px")
+    .on("change", function () {
+      if (!this.checked) {
+        emailLinks = [];
+        updateGraph();
+        return;
+      }
+      fetch("/email/graph?min_count=15")
+        .then(res => res.json())
+        .then(emailGraph => {
+          emailLinks = emailGraph.links.map(l => ({
+            source: l.source,
+            target: l.target,
+            relation: "",
+            kind: "email",
+            count: l.count
+          }));
+          updateGraph();
+        });
+    });
+  showEmails.append("span").text("Email traffic (15+ emails)");
+
   let nodes = [], links = [], levels = {}, teams = {};
 
-  fetch("/people_data")
-    .then(res => res.json())
-    .then(graphData => {
-      nodes = graphData.nodes;
-      links = graphData.links;
-      return fetch("/static/people_hierarchy_levels.json");
-    })
+  // The graph is loaded a neighbourhood at a time: the organisations' direct links first, then
+  // the neighbours of any node the user clicks. ?center=<name> on the page URL starts from one node.
+  const MIN_WEIGHT = 5;
+  const startCenters = new URLSearchParams(window.location.search).has("center")
+    ? [new URLSearchParams(window.location.search).get("center")]
+    : ["Protectors of Kronos (POK)", "GAStech International"];
+  const expanded = new Set();
+  const linkKeys = new Set();
+
+  // Resumes of the people in the graph, fetched in one request per batch of new nodes
+  const resumes = {};
+  let resumesLoaded = Promise.resolve();
+
+  function linkKey(l) {
+    return [l.kind, ...[l.source, l.target].sort()].join("|");
+  }
+
+  function mergeGraph(graphData) {
+    const known = new Set(nodes.map(n => n.id));
+    const added = graphData.nodes.filter(n => !known.has(n.id));
+    nodes = nodes.concat(added);
+    graphData.links.forEach(l => {
+      const key = linkKey(l);
+      if (!linkKeys.has(key)) {
+        linkKeys.add(key);
+        links.push(l);
+      }
+    });
+    const people = added.filter(n => n.group === "GAStech" && !orgNodes.includes(n.id)).map(n => n.id);
+    if (people.length) {
+      resumesLoaded = Promise.all([resumesLoaded, fetch(`/resumes?names=${encodeURIComponent(people.join(","))}`)
+        .then(res => res.json())
+        .then(data => Object.assign(resumes, data.resumes))
+        .catch(() => null)]);
+    }
+  }
+
+  function expand(center) {
+    if (expanded.has(center)) return Promise.resolve();
+    expanded.add(center);
+    return fetch(`/people_data?center=${encodeURIComponent(center)}&hops=1&min_weight=${MIN_WEIGHT}`)
+      .then(res => res.ok ? res.json() : {nodes: [], links: []})
+      .then(mergeGraph);
+  }
+
+  Promise.all(startCenters.map(expand))
+    .then(() => fetch("/static/people_hierarchy_levels.json"))
     .then(res => res.json())
     .then(levelData => {
       levels = levelData.levels || {};
@@ -122,11 +192,7 @@ document.addEventListener("DOMContentLoaded", () => {
   }
 
   function fetchResumeText(name) {
-    const fileName = name.replace(/[^a-zA-Z0-9]/g, "");
-    return fetch(`/resume_text/${fileName}`)
-      .then(res => res.json())
-      .then(data => data.text || null)
-      .catch(() => null);
+    return resumesLoaded.then(() => resumes[name] || null);
   }
 
   function updateGraph() {
@@ -141,7 +207,7 @@ document.addEventListener("DOMContentLoaded", () => {
 
     const nodeMap = new Map(filteredNodes.map(n => [n.id, n]));
 
-    const filteredLinks = links
+    const filteredLinks = links.concat(emailLinks)
       .map(l => nodeMap.has(l.source) && nodeMap.has(l.target) ? {
         ...l,
         source: nodeMap.get(l.source),
@@ -163,7 +229,13 @@ document.addEventListener("DOMContentLoaded", () => {
       .selectAll("line")
       .data(filteredLinks)
       .enter()
-      .append("line");
+      .append("line")
+      .attr("stroke", d => d.kind === "email" ? "#4a90d9" : d.kind === "cooccurrence" ? "#ddd" : null)
+      .attr("stroke-dasharray", d => d.kind === "email" ? "4 2" : d.kind === "cooccurrence" ? "1 3" : null)
+      .attr("stroke-width", d => d.kind === "email" ? Math.min(1 + d.count / 15, 5)
+                               : d.kind === "cooccurrence" ? Math.min(1 + d.weight / 20, 4) : null);
+
+    link.append("title").text(d => d.kind === "cooccurrence" ? d.relation : "");
 
     const linkLabels = svg.append("g")
       .selectAll("text")
@@ -174,7 +246,7 @@ document.addEventListener("DOMContentLoaded", () => {
       .attr("fill", "#555")
       .attr("dx", 4)
       .attr("dy", -4)
-      .text(d => d.relation);
+      .text(d => d.kind === "cooccurrence" ? "" : d.relation);
 
     const tooltip = d3.select("body").append("div")
       .attr("class", "tooltip")
@@ -199,6 +271,11 @@ document.addEventListener("DOMContentLoaded", () => {
       .attr("fill", d => color(d.group))
       .attr("stroke", d => d.group === "GAStech" ? teamColor(d.team || "Executive") : "none")
       .attr("stroke-width", d => d.group === "GAStech" ? 4 : 0)
+      .style("cursor", d => expanded.has(d.id) ? null : "pointer")
+      .on("click", function (event, d) {
+        // Clicking a node pulls in its neighbours
+        if (!expanded.has(d.id)) expand(d.id).then(updateGraph);
+      })
       .on("mouseover", function (event, d) {
         const mouseX = event.clientX;
         const mouseY = event.clientY;
@@ -242,7 +319,7 @@ document.addEventListener("DOMContentLoaded", () => {
       .data(filteredNodes)
       .enter()
       .append("text")
-      .text(d => orgNodes.includes(d.id) ? d.id : d.initials)
+      .text(d => (orgNodes.includes(d.id) ? d.id : d.initials) + (expanded.has(d.id) ? "" : " +"))
       .attr("font-size", 13)
       .attr("dx", 18)
       .attr("dy", 5);
@@ -1,6 +1,8 @@
 const METADATA = ["title", "source", "published", "location", "author"]
 
 const openDots = new Set();
+// Article text is only fetched when a dot is clicked, and kept here afterwards
+const articleContents = new Map();
 
         
 d3.select("#generate-similarity-report").on("click", function() {
@@ -20,7 +22,40 @@ function generateReport() {
     .then(async function(response){
         return JSON.parse(JSON.stringify((await response.json())));
         })
-    .then(results => drawScatterPlot(results));
+    .then(results => drawScatterPlot(decodeReport(results)));
+}
+
+// The report comes back as parallel x/y/id arrays plus a dictionary-encoded meta table;
+// turn it back into one object per point for d3
+function decodeReport(results) {
+    const data = results['x'].map((x, i) => {
+        const meta = {};
+        Object.entries(results['meta']).forEach(([field, column]) => {
+            meta[field] = column.values[column.index[i]];
+        });
+        return {"x": x, "y": results['y'][i], "id": results['id'][i], "meta": meta};
+    });
+    return {...results, "data": data};
+}
+
+function fetchArticle(d) {
+    // Ids are document ids, which change with the content, so a cached text never goes stale
+    if (articleContents.has(d.id)) {
+        return Promise.resolve(articleContents.get(d.id));
+    }
+    return fetch(`/article/${encodeURIComponent(d.id)}`)
+        .then(response => {
+            if (response.status === 404) {
+                // The article was removed from the store since the report was drawn
+                generateReport();
+                throw new Error("Article removed");
+            }
+            return response.json();
+        })
+        .then(article => {
+            articleContents.set(d.id, article['contents']);
+            return article['contents'];
+        });
 }
 
 function drawScatterPlot(results) {
@@ -187,7 +222,9 @@ function drawScatterPlot(results) {
     }).on("click", (event, d) => {
         console.log("I was clicked!" + d['meta']['title'])
         d3.select(event.currentTarget).transition().attr("r", 10)
-        addArticleViewer(d);
+        fetchArticle(d)
+            .then(contents => addArticleViewer({...d, "contents": contents}))
+            .catch(err => console.error(err));
     });
 }
 
@@ -0,0 +1,32 @@
+import re
+import zlib
+
+import numpy as np
+
+EMBEDDING_DIM = 768
+
+
+def hashed_embedding(text, dim=EMBEDDING_DIM):
+    # Bag of words hashed into dim signed buckets and L2-normalized, so texts sharing words
+    # still end up close together
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in re.findall(r'[a-z0-9]+', text.lower()):
+        h = zlib.crc32(word.encode('utf-8'))
+        vector[h % dim] += 1.0 if h & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class StubEncoder:
+    """
+    Stands in for the sentence-transformers model when EMBEDDER_BACKEND=stub, so retrieval and
+    ingestion can run (and be benchmarked) without downloading or running the model.
+    """
+
+    max_tokens = 512
+
+    def token_length(self, text):
+        return min(self.max_tokens, len(text) // 4 + 2)
+
+    def encode(self, texts):
+        return np.array([hashed_embedding(text) for text in texts], dtype=np.float32)
@@ -0,0 +1,44 @@
+from typing import Callable, List, Optional
+import os
+import time
+
+from haystack import component
+from haystack.dataclasses import StreamingChunk
+from haystack.core.component.types import Variadic
+
+
+@component
+class StubGenerator:
+    """
+    Stands in for GoogleAIGeminiGenerator when LLM_BACKEND=stub, so the answer pipeline and the
+    streaming endpoint can be exercised offline. It replies with a short canned answer, emitting
+    it word by word through streaming_callback with token_delay seconds between words. With
+    fail_after set, it raises after emitting that many words, like a connection dropping mid-answer.
+    """
+
+    def __init__(self, token_delay: float = 0.02, first_token_delay: float = 0.2, fail_after: Optional[int] = None):
+        self.token_delay = token_delay
+        self.first_token_delay = first_token_delay
+        self.fail_after = fail_after
+
+    @component.output_types(replies=List[str])
+    def run(self, parts: Variadic[str], streaming_callback: Optional[Callable[[StreamingChunk], None]] = None):
+        prompt = "".join(str(part) for part in parts)
+        question = prompt.rsplit("Question:", 1)[-1].strip()
+        reply = f"This is a stub answer to: {question}\n\nThe prompt was {len(prompt)} characters long."
+
+        time.sleep(self.first_token_delay)
+        words = reply.split(" ")
+        for i, word in enumerate(words):
+            if self.fail_after is not None and i >= self.fail_after:
+                raise RuntimeError(f"Stub generator failed after {i} words")
+            if streaming_callback is not None:
+                streaming_callback(StreamingChunk(content=word if i == 0 else " " + word))
+                time.sleep(self.token_delay)
+        return {"replies": [reply]}
+
+
+def stub_from_env():
+    return StubGenerator(token_delay=float(os.environ.get('STUB_TOKEN_DELAY', 0.02)),
+                         first_token_delay=float(os.environ.get('STUB_FIRST_TOKEN_DELAY', 0.2)),
+                         fail_after=int(os.environ['STUB_FAIL_AFTER']) if os.environ.get('STUB_FAIL_AFTER') else None)
@@ -0,0 +1,137 @@
+from collections import Counter
+from pathlib import Path
+import csv
+import json
+import os
+import re
+import threading
+
+import metrics
+
+STOPWORDS = {'the', 'and', 'of', 'in', 'to', 'a', 'for', 'on', 'is', 'with', 'as', 'by', 'an', 'at'}
+EMAIL_HEADERS_FILE = 'email_headers.csv'
+
+
+def clean_text(text):
+    text = re.sub(r'[^\w\s]', '', text)
+    words = text.split()
+    return [w for w in words if w not in STOPWORDS and len(w) > 2]
+
+
+def read_text_file(file_path):
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except UnicodeDecodeError:
+        with open(file_path, 'r', encoding='latin-1') as f:
+            return f.read()
+
+
+def read_email_text(csv_path):
+    # The header file only has From/To/Date/Subject, so the subject line is all the text there is
+    rows = csv.DictReader(read_text_file(csv_path).splitlines())
+    return " ".join(row.get('Subject', '') or '' for row in rows)
+
+
+class TermIndex:
+    """
+    Per-file term counts for the folders under SOURCE_DIR. Each file is tokenized once with
+    clean_text and its counts are persisted to index_path; a file is only re-read when its
+    mtime or size changes, so a wordcloud request just merges the cached counters.
+    """
+
+    def __init__(self, source_dir, index_path):
+        self.source_dir = Path(source_dir)
+        self.index_path = Path(index_path)
+        self.lock = threading.Lock()
+        # path -> {"mtime", "size", "counts"}
+        self.files = {}
+        # folder -> (signature of its files, merged Counter)
+        self.folder_totals = {}
+        self.load()
+
+    def load(self):
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self.files = json.load(f)
+            except (OSError, ValueError):
+                self.files = {}
+
+    def save(self):
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.files, f)
+        os.replace(tmp_path, self.index_path)
+
+    def folder_files(self, folder):
+        if folder == EMAIL_HEADERS_FILE:
+            csv_path = self.source_dir / EMAIL_HEADERS_FILE
+            return [csv_path] if csv_path.is_file() else []
+        file_paths = []
+        for root, _, files in os.walk(self.source_dir / folder):
+            for file in files:
+                if file.endswith('.txt'):
+                    file_paths.append(Path(root) / file)
+        return sorted(file_paths)
+
+    def count_file(self, file_path):
+        with metrics.stage("read_files"):
+            if file_path.name == EMAIL_HEADERS_FILE:
+                text = read_email_text(file_path)
+            else:
+                text = read_text_file(file_path)
+        metrics.BYTES_READ.inc(len(text), stage="tokenize")
+        metrics.DOCUMENTS.inc(stage="tokenize")
+        with metrics.stage("tokenize"):
+            return Counter(clean_text(text.lower()))
+
+    def refresh_folder(self, folder):
+        # Re-tokenize only the files whose mtime or size changed since they were last indexed.
+        # Returns the folder's signature, and whether anything had to be rewritten.
+        changed = False
+        signature = []
+        seen = set()
+        for file_path in self.folder_files(folder):
+            key = str(file_path)
+            seen.add(key)
+            stat = file_path.stat()
+            entry = self.files.get(key)
+            if entry is None or entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size:
+                entry = {"mtime": stat.st_mtime,
+                         "size": stat.st_size,
+                         "counts": dict(self.count_file(file_path))}
+                self.files[key] = entry
+                changed = True
+            signature.append((key, entry['mtime'], entry['size']))
+
+        prefix = str(self.source_dir / folder)
+        for key in [k for k in self.files if k not in seen and (k == prefix or k.startswith(prefix + os.sep))]:
+            del self.files[key]
+            changed = True
+        return tuple(signature), changed
+
+    def folder_counts(self, folder):
+        signature, changed = self.refresh_folder(folder)
+        cached = self.folder_totals.get(folder)
+        if cached is not None and cached[0] == signature:
+            return cached[1], changed
+
+        total = Counter()
+        for key, _, _ in signature:
+            total.update(self.files[key]['counts'])
+        self.folder_totals[folder] = (signature, total)
+        return total, changed
+
+    def most_common(self, selected_folders, n=50):
+        with self.lock:
+            merged = Counter()
+            any_changed = False
+            for folder in selected_folders:
+                counts, changed = self.folder_counts(folder)
+                merged.update(counts)
+                any_changed = any_changed or changed
+            if any_changed:
+                self.save()
+        return merged.most_common(n)
@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    """
+    An empty corpus laid out like the real one in a temporary directory, made the working
+    directory (the app's paths are relative). Returns a helper that writes one article.
+    """
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'News Articles').mkdir()
+
+    def write_article(outlet, name, body, title="TITLE", published="2014/01/20"):
+        path = Path('News Articles') / outlet / f"{name}.txt"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"SOURCE: {outlet}\nTITLE: {title}\nPUBLISHED: {published}\n\nLOCATION: ABILA, Kronos\n\n{body}\n",
+                        encoding='utf-8')
+        return path
+
+    return write_article
+
+
+@pytest.fixture
+def client():
+    import app as app_module
+    return app_module.create_app(warmup='lazy').test_client()
+
+
+@pytest.fixture
+def stub_pipeline(monkeypatch):
+    # Builds the answer pipeline around the stub generator with the given STUB_* settings
+    def build(**settings):
+        import services
+        monkeypatch.setenv('LLM_BACKEND', 'stub')
+        monkeypatch.setenv('STUB_FIRST_TOKEN_DELAY', '0')
+        monkeypatch.setenv('STUB_TOKEN_DELAY', '0')
+        monkeypatch.delenv('STUB_FAIL_AFTER', raising=False)
+        for name, value in settings.items():
+            monkeypatch.setenv(f'STUB_{name.upper()}', str(value))
+        pipeline = services.build_answer_pipeline()
+        monkeypatch.setattr(services.answer_pipeline, 'get', lambda: pipeline)
+        return pipeline
+    return build
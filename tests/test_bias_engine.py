@@ -0,0 +1,77 @@
+import math
+
+import numpy as np
+import pytest
+
+from bias_engine import (LEXICON, NEGATION_WINDOW, NEGATORS, NORMALIZATION_ALPHA, TOKEN, BiasEngine,
+                         score_sentences, split_sentences)
+
+
+def reference_score(sentence):
+    # One sentence at a time, word by word: what score_sentences computes in bulk
+    tokens = TOKEN.findall(sentence.lower())
+    total = 0.0
+    for i, token in enumerate(tokens):
+        weight = LEXICON.get(token, 0.0)
+        window = tokens[max(0, i - NEGATION_WINDOW):i]
+        if any(word in NEGATORS or word.endswith("n't") for word in window):
+            weight = -weight
+        total += weight
+    return total / math.sqrt(total * total + NORMALIZATION_ALPHA)
+
+
+SENTENCES = [
+    "The police praised the brave and honest rescuers.",
+    "He is not a terrorist.",
+    "She was never, in all those years, corrupt.",
+    "They didn't fail the test, they did not succeed either and the attack was a tragedy.",
+    "No. Violence",
+    "",
+    "...",
+    "Not not good",
+    "good",
+]
+
+
+def test_batch_scores_match_the_scalar_reference():
+    scores = score_sentences(SENTENCES)
+    assert scores.shape == (len(SENTENCES),)
+    np.testing.assert_allclose(scores, [reference_score(sentence) for sentence in SENTENCES])
+
+
+def test_negation_stays_within_its_sentence_and_window():
+    # The window does not reach across a sentence boundary, nor past NEGATION_WINDOW words
+    assert score_sentences(["Not here.", "Good."])[1] > 0
+    assert score_sentences(["not " + "very " * NEGATION_WINDOW + "good"])[0] > 0
+    assert score_sentences(["not " + "very " * (NEGATION_WINDOW - 1) + "good"])[0] < 0
+    assert list(score_sentences([])) == []
+
+
+def test_split_sentences():
+    assert split_sentences("One. Two!\n\nThree?  Four") == ["One.", "Two!", "Three?", "Four"]
+
+
+def write(directory, outlet, name, published, body):
+    path = directory / outlet / f"{name}.txt"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"SOURCE: {outlet}\nTITLE: News\nPUBLISHED: {published}\n\n{body}\n", encoding='utf-8')
+    return path
+
+
+def test_aggregate_by_outlet_and_date(tmp_path):
+    articles = tmp_path / 'News Articles'
+    write(articles, "Outlet A", "1", "2014/01/10", "Elian Karel was praised. The weather was fine.")
+    write(articles, "Outlet B", "1", "2014/02/10", "Elian Karel was accused of corruption.")
+    engine = BiasEngine({"Elian Karel": []}, tmp_path / 'cache' / 'bias.json', articles_dir=articles)
+
+    result = engine.aggregate()
+    assert result['sources'] == ["Outlet A", "Outlet B"]
+    assert result['mentions'] == {"Elian Karel": {"Outlet A": 1, "Outlet B": 1}}
+    sentiment = result['sentiment']["Elian Karel"]
+    assert sentiment["Outlet A"] > 0 > sentiment["Outlet B"]
+    assert engine.aggregate(start="2014-02-01")['mentions']["Elian Karel"] == {"Outlet A": 0, "Outlet B": 1}
+
+    # Scores are persisted and reused by a new engine with the same lexicon and entities
+    reloaded = BiasEngine({"Elian Karel": []}, tmp_path / 'cache' / 'bias.json', articles_dir=articles)
+    assert set(reloaded.articles) == set(engine.articles)
+    assert BiasEngine({"Mandor Vann": []}, tmp_path / 'cache' / 'bias.json', articles_dir=articles).articles == {}
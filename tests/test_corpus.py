@@ -0,0 +1,24 @@
+from datetime import date
+
+from corpus import parse_article, parse_published
+
+
+def test_parse_published_formats():
+    assert parse_published("2005/04/06") == date(2005, 4, 6)
+    assert parse_published("20 January 2014") == date(2014, 1, 20)
+    assert parse_published("20January 2014") == date(2014, 1, 20)
+    assert parse_published("October 12, 2013 junk") == date(2013, 10, 12)
+    assert parse_published("By Petrus Gerhard") is None
+    assert parse_published("2014/02/30") is None
+
+
+def test_published_falls_back_to_the_next_line():
+    meta, body = parse_article("SOURCE: Outlet\nTITLE: Title\nPUBLISHED: By Petrus Gerhard\n\n2014/01/20\n\nThe body.\n")
+    assert meta['published'] == "2014/01/20"
+    assert body == "The body."
+
+
+def test_undated_article_keeps_its_body():
+    meta, body = parse_article("SOURCE: Outlet\nTITLE: Title\nPUBLISHED: By Petrus Gerhard\n\nThe body.\n")
+    assert parse_published(meta['published']) is None
+    assert body == "The body."
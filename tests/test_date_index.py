@@ -0,0 +1,60 @@
+from datetime import date
+
+from date_index import PublicationIndex
+
+
+def test_timeline_counts_per_bucket_and_outlet(corpus):
+    corpus("Outlet A", "1", "a", published="2014/01/05")
+    corpus("Outlet A", "2", "b", published="20 January 2014")
+    corpus("Outlet B", "1", "c", published="February 3, 2014")
+    corpus("Outlet B", "2", "d", published="By a staff reporter")
+    index = PublicationIndex('cache/dates.json')
+
+    timeline = index.timeline(bucket="month", articles_limit=10)
+    assert timeline['buckets'] == ["2014-01-01", "2014-02-01"]
+    assert timeline['counts'] == {"Outlet A": [2, 0], "Outlet B": [0, 1]}
+    assert timeline['total'] == [2, 1]
+    assert timeline['undated'] == {"Outlet A": 0, "Outlet B": 1}
+    assert [article['published'] for article in timeline['articles']] == ["2014-01-05", "2014-01-20", "2014-02-03"]
+
+    # The first and last buckets are clipped to the requested range
+    clipped = index.timeline(start=date(2014, 1, 10), end=date(2014, 2, 1), bucket="month", sources={"Outlet A"})
+    assert clipped['counts'] == {"Outlet A": [1, 0]}
+
+
+def test_published_date_on_the_next_line(corpus):
+    corpus("Outlet A", "1", "body", published="By Haneson Ngohebo\n\n2014/01/20")
+    index = PublicationIndex('cache/dates.json')
+    assert index.timeline()['total'] == [1]
+    assert index.timeline()['undated'] == {"Outlet A": 0}
+
+
+def test_index_is_persisted_and_follows_edits(corpus):
+    path = corpus("Outlet A", "1", "a", published="2014/01/05")
+    PublicationIndex('cache/dates.json').refresh()
+
+    index = PublicationIndex('cache/dates.json')
+    assert index.articles[path.as_posix()]['published'] == "2014-01-05"
+    path.write_text(path.read_text().replace("2014/01/05", "2014/03/07"))
+    index.refresh(force=True)
+    assert index.timeline(bucket="year")['start'] == "2014-03-07"
+
+
+def test_range_is_clamped_to_the_corpus(corpus):
+    corpus("Outlet A", "1", "a", published="2014/01/05")
+    corpus("Outlet A", "2", "b", published="2014/01/20")
+    index = PublicationIndex('cache/dates.json')
+
+    timeline = index.timeline(start=date(1, 1, 1), end=date.max, bucket="day")
+    assert (timeline['start'], timeline['end']) == ("2014-01-05", "2014-01-20")
+    assert len(timeline['buckets']) == 16 and sum(timeline['total']) == 2
+    assert index.timeline(start=date(2015, 1, 1), end=date.max)['buckets'] == []
+
+
+def test_buckets_stop_at_the_end_of_the_calendar(corpus):
+    corpus("Outlet A", "1", "a", published="9999/12/31")
+    index = PublicationIndex('cache/dates.json')
+    for bucket, first in [("day", "9999-12-31"), ("week", "9999-12-27"), ("month", "9999-12-01"), ("year", "9999-01-01")]:
+        timeline = index.timeline(end=date.max, bucket=bucket)
+        assert timeline['buckets'] == [first]
+        assert timeline['total'] == [1]
@@ -0,0 +1,90 @@
+import time
+
+import pytest
+
+from email_graph import EmailStore, address_to_name, parse_time
+
+CSV = """From,To,Date,Subject
+Ada.Campo-Corrente@gastech.com.kronos,"Loreto.Bodrogi@gastech.com.kronos, Isia.Vann@gastech.com.kronos",1/6/2014 8:00,Patrol
+Loreto.Bodrogi@gastech.com.kronos,Ada.Campo-Corrente@gastech.com.kronos,1/6/2014 9:30,RE: Patrol
+Ada.Campo-Corrente@gastech.com.kronos,"Loreto.Bodrogi@gastech.com.kronos, Ada.Campo-Corrente@gastech.com.kronos",1/7/2014 10:00,Schedule
+Isia.Vann@gastech.com.kronos,Loreto.Bodrogi@gastech.com.kronos,1/13/2014 11:00,Lunch
+Isia.Vann@gastech.com.kronos,Loreto.Bodrogi@gastech.com.kronos,not a date,Dropped
+"""
+ADA, LORETO, ISIA = "Ada Campo-Corrente", "Loreto Bodrogi", "Isia Vann"
+
+
+def make_store(tmp_path):
+    csv_path = tmp_path / 'email_headers.csv'
+    csv_path.write_text(CSV, encoding='utf-8')
+    return EmailStore(csv_path, tmp_path / 'cache')
+
+
+def links(graph):
+    return {(link['source'], link['target']): link['count'] for link in graph['links']}
+
+
+def test_address_to_name():
+    assert address_to_name(" Sten.Sanjorge Jr.@gastech.com.kronos") == "Sten Sanjorge Jr"
+
+
+def test_graph_over_time_windows(tmp_path):
+    store = make_store(tmp_path)
+    # Self-copies are left out, unparseable dates are skipped
+    assert links(store.graph()) == {(ADA, LORETO): 2, (ADA, ISIA): 1, (LORETO, ADA): 1, (ISIA, LORETO): 1}
+    assert links(store.graph(min_count=2)) == {(ADA, LORETO): 2}
+
+    day_one = store.graph(parse_time("2014-01-06"), parse_time("2014-01-06T23:59:59"))
+    assert links(day_one) == {(ADA, LORETO): 1, (ADA, ISIA): 1, (LORETO, ADA): 1}
+    # The window is inclusive at both ends
+    at_nine_thirty = parse_time("2014-01-06T09:30")
+    assert links(store.graph(at_nine_thirty, at_nine_thirty)) == {(LORETO, ADA): 1}
+    assert store.graph(parse_time("2014-02-01"), None) == {"nodes": [], "links": []}
+
+
+def test_ego_network_and_top_correspondents(tmp_path):
+    store = make_store(tmp_path)
+    assert store.top_correspondents(LORETO) == [
+        {"name": ADA, "sent": 1, "received": 2, "total": 3},
+        {"name": ISIA, "sent": 0, "received": 1, "total": 1}]
+    assert store.top_correspondents(LORETO, start=parse_time("2014-01-07"))[0]['total'] == 1
+    assert store.top_correspondents("Nobody") is None
+    assert {node['id'] for node in store.ego_network(ISIA)['nodes']} == {ADA, LORETO, ISIA}
+
+
+def test_volume_buckets(tmp_path):
+    store = make_store(tmp_path)
+    daily = store.volume()
+    assert daily[0] == {"start": "2014-01-06T00:00:00+00:00", "count": 2}
+    assert [entry['count'] for entry in daily] == [2, 1, 0, 0, 0, 0, 0, 1]
+    assert [entry['count'] for entry in store.volume(bucket="week")] == [3, 1]
+    assert [entry['count'] for entry in store.volume(name=ISIA)] == [1]
+    assert [entry['count'] for entry in store.volume(parse_time("2014-01-07"), parse_time("2014-01-07T23:00"))] == [1]
+
+
+def test_columns_are_cached_until_the_csv_changes(tmp_path):
+    make_store(tmp_path).ensure_loaded()
+    store = EmailStore(tmp_path / 'email_headers.csv', tmp_path / 'cache')
+    assert store.load_columns(store.csv_signature())
+
+    (tmp_path / 'email_headers.csv').write_text(CSV + "Isia.Vann@gastech.com.kronos,Ada.Campo-Corrente@gastech.com.kronos,1/14/2014 8:00,New\n")
+    assert links(store.graph())[(ISIA, ADA)] == 1
+
+
+@pytest.fixture
+def server_zone(monkeypatch):
+    # Runs the test with the process in a zone well away from UTC
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_dates_are_utc_whatever_the_server_zone(tmp_path, server_zone):
+    store = make_store(tmp_path)
+    assert parse_time("2014-01-06") == 1388966400
+    assert parse_time("2014-01-06T05:00:00+05:00") == 1388966400
+    assert store.volume()[0] == {"start": "2014-01-06T00:00:00+00:00", "count": 2}
+    day_one = store.graph(parse_time("2014-01-06"), parse_time("2014-01-06T23:59:59"))
+    assert links(day_one) == {(ADA, LORETO): 1, (ADA, ISIA): 1, (LORETO, ADA): 1}
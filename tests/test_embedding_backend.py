@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+import embedding_backend
+from embedding_backend import BatchEmbedder, EmbeddingCache, length_sorted_batches
+
+
+def test_batches_are_longest_first_and_bounded():
+    lengths = [10, 500, 40, 40, 300, 10, 10]
+    batches = length_sorted_batches(lengths, max_tokens=600, max_size=3)
+
+    assert sorted(i for batch in batches for i in batch) == list(range(len(lengths)))
+    assert batches[0] == [1]
+    for batch in batches:
+        assert len(batch) <= 3
+        assert len(batch) * max(lengths[i] for i in batch) <= 600
+        assert [lengths[i] for i in batch] == sorted((lengths[i] for i in batch), reverse=True)
+
+
+def test_a_text_longer_than_the_budget_gets_its_own_batch():
+    assert length_sorted_batches([1000, 5], max_tokens=100) == [[0], [1]]
+    assert length_sorted_batches([]) == []
+
+
+def test_cache_round_trip(tmp_path):
+    cache = EmbeddingCache(tmp_path / 'cache.sqlite')
+    key = EmbeddingCache.key("model", "text")
+    assert key != EmbeddingCache.key("other model", "text")
+    cache.put_many([(key, [0.5, 1.5])])
+
+    found = EmbeddingCache(tmp_path / 'cache.sqlite').get_many([key, "missing"])
+    assert list(found) == [key]
+    assert found[key].dtype == np.float32
+    np.testing.assert_array_equal(found[key], [0.5, 1.5])
+
+
+def test_cache_lookups_span_many_parameters(tmp_path):
+    cache = EmbeddingCache(tmp_path / 'cache.sqlite')
+    items = [(str(i), [float(i)]) for i in range(1200)]
+    cache.put_many(items)
+    assert len(cache.get_many([key for key, _ in items])) == 1200
+
+
+def test_batch_embedder_embeds_each_text_once(tmp_path):
+    embedder = BatchEmbedder('stub', cache=EmbeddingCache(tmp_path / 'cache.sqlite'))
+    texts = ["gas pipeline", "protest in Abila", "gas pipeline"]
+    vectors = embedder.embed(texts)
+    np.testing.assert_array_equal(vectors[0], vectors[2])
+    assert embedder.throughput()['embedded'] == 2
+
+    # A second process finds all three in the cache
+    warm = BatchEmbedder('stub', cache=EmbeddingCache(tmp_path / 'cache.sqlite'))
+    again = warm.embed(texts)
+    assert warm.throughput()['embedded'] == 0 and warm.throughput()['cached'] == 3
+    for before, after in zip(vectors, again):
+        np.testing.assert_array_almost_equal(before, after)
+
+
+def test_backend_name_is_validated(monkeypatch):
+    monkeypatch.setenv('EMBEDDER_BACKEND', 'gpu')
+    with pytest.raises(ValueError):
+        embedding_backend.backend_name()
+
+
+def test_articles_are_embedded_without_their_headers():
+    from corpus import ARTICLE_METADATA, parse_article
+    from haystack import Document
+
+    meta, body = parse_article("SOURCE: Outlet\nTITLE: News\nPUBLISHED: 2014/01/20\n\nThe body.\n")
+    assert embedding_backend.document_text(Document(content=body, meta=meta), ARTICLE_METADATA) == "The body."
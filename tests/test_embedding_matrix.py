@@ -0,0 +1,109 @@
+import os
+
+from haystack import Document
+from haystack.document_stores.in_memory import InMemoryDocumentStore
+import numpy as np
+import pytest
+
+import app as app_module
+from embedding_matrix import EmbeddingMatrix, dictionary_encode
+import services
+
+
+def make_store(*docs):
+    store = InMemoryDocumentStore()
+    store.write_documents([Document(content=content, meta={"source": source, "title": content}, embedding=embedding)
+                           for content, source, embedding in docs])
+    return store
+
+
+def touch_manifest(path, text):
+    path.write_text(text)
+    # A distinct mtime every time, however fast the test runs
+    mtime = 1000 + len(text)
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def matrix(tmp_path):
+    manifest = tmp_path / 'ingest_manifest.json'
+    touch_manifest(manifest, "{}")
+    return EmbeddingMatrix(tmp_path / 'cache', manifest), manifest
+
+
+def test_rows_per_source_and_projection(matrix):
+    matrix, _ = matrix
+    store = make_store(("a1", "A", [1.0, 0.0, 0.0]), ("a2", "A", [0.0, 1.0, 0.0]),
+                       ("b1", "B", [0.0, 0.0, 1.0]), ("none", "B", None))
+    matrix.ensure_loaded(store)
+    assert matrix.matrix.shape == (3, 3)
+    assert sorted(matrix.contents[row] for row in matrix.rows_for_sources(["A"])) == ["a1", "a2"]
+    assert len(matrix.rows_for_sources(["A", "B", "missing"])) == 3
+
+    rows, coords, ratio = matrix.project(store, ["A", "B"])
+    assert coords.shape == (3, 2)
+    assert matrix.project(store, ["B", "A"])[1] is coords
+
+
+def test_rebuilt_only_when_the_manifest_changes(matrix, tmp_path):
+    matrix, manifest = matrix
+    matrix.ensure_loaded(make_store(("a1", "A", [1.0, 0.0])))
+
+    # Same token: neither the store nor the projections are touched again
+    matrix.ensure_loaded(make_store(("b1", "B", [0.0, 1.0]), ("b2", "B", [1.0, 1.0])))
+    assert matrix.contents == ["a1"]
+
+    # A fresh process loads the saved matrix instead of reading the store
+    reloaded = EmbeddingMatrix(tmp_path / 'cache', manifest)
+    reloaded.ensure_loaded(InMemoryDocumentStore())
+    assert reloaded.contents == ["a1"]
+    np.testing.assert_array_equal(reloaded.matrix, [[1.0, 0.0]])
+
+    touch_manifest(manifest, '{"version": 2}')
+    matrix.ensure_loaded(make_store(("b1", "B", [0.0, 1.0]), ("b2", "B", [1.0, 1.0])))
+    assert sorted(matrix.contents) == ["b1", "b2"]
+    assert list(matrix.source_rows) == ["B"]
+
+
+def test_dictionary_encode():
+    table = dictionary_encode([{"source": "A", "title": "x"}, {"source": "B"}, {"source": "A", "title": "y"}],
+                              fields=["source", "title"])
+    assert table == {"source": {"values": ["A", "B"], "index": [0, 1, 0]},
+                     "title": {"values": ["x", "", "y"], "index": [0, 1, 2]}}
+
+
+def test_articles_are_fetched_by_document_id(matrix, client, monkeypatch):
+    matrix, manifest = matrix
+    store = make_store(("a1", "A", [1.0, 0.0]), ("a2", "A", [0.0, 1.0]))
+    monkeypatch.setattr(app_module, 'embedding_matrix', matrix)
+    monkeypatch.setattr(services.document_store, 'get', lambda: store)
+    monkeypatch.setattr(services.ingestion, 'get', lambda: None)
+
+    report = client.post('/generate_similarity_report', json={"sources": ["A"]}).get_json()
+    assert sorted(report['id']) == sorted(doc.id for doc in store.filter_documents())
+    doc_id = report['id'][0]
+    contents = client.get(f"/article/{doc_id}").get_json()['contents']
+
+    # A re-ingest that adds an article reorders the matrix, but the id still names the same one
+    store.write_documents([Document(content="a0", meta={"source": "A", "title": "a0"}, embedding=[1.0, 1.0])])
+    touch_manifest(manifest, '{"version": 2}')
+    assert client.get(f"/article/{doc_id}").get_json()['contents'] == contents
+
+    store.delete_documents([doc_id])
+    touch_manifest(manifest, '{"version": 10}')
+    assert client.get(f"/article/{doc_id}").status_code == 404
+
+
+def test_report_waits_for_ingestion(matrix, client, monkeypatch):
+    matrix, manifest = matrix
+    store = InMemoryDocumentStore()
+    monkeypatch.setattr(app_module, 'embedding_matrix', matrix)
+    monkeypatch.setattr(services.document_store, 'get', lambda: store)
+
+    def ingest():
+        store.write_documents([Document(content="a1", meta={"source": "A"}, embedding=[1.0, 0.0])])
+        touch_manifest(manifest, '{"version": 2}')
+    monkeypatch.setattr(services.ingestion, 'get', ingest)
+
+    report = client.post('/generate_similarity_report', json={"sources": ["A"]}).get_json()
+    assert len(report['id']) == 1
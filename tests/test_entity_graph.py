@@ -0,0 +1,80 @@
+from entity_graph import AhoCorasick, EntityGraph, EntityMatcher
+
+NODES = [{"id": name} for name in ["GAStech", "POK", "Elian Karel", "Sten Sanjorge Jr", "Silvia Marek", "Abila Police"]]
+ALIASES = {"POK": ["Protectors of Kronos"], "Sten Sanjorge Jr": ["Sanjorge"]}
+
+
+def test_automaton_finds_overlapping_patterns():
+    automaton = AhoCorasick({"he": 1, "she": 2, "hers": 3})
+    assert sorted(automaton.find("ushers")) == [(1, 4, 2), (2, 4, 1), (2, 6, 3)]
+
+
+def test_only_whole_words_are_counted():
+    matcher = EntityMatcher(["POK", "GAStech"], ALIASES)
+    assert matcher.count_mentions("POKER night at GAStech's office") == {"GAStech": 1}
+    assert matcher.count_mentions("The Protectors of Kronos (POK) and the pok.") == {"POK": 3}
+    assert matcher.count_mentions("Protectors of Kronosville") == {}
+
+
+def test_longest_match_wins():
+    matcher = EntityMatcher(["Sten Sanjorge Jr", "Elian Karel"], ALIASES)
+    assert matcher.count_mentions("Sten Sanjorge, Jr. met Sanjorge's guests") == {"Sten Sanjorge Jr": 2}
+
+
+def graph(tmp_path, curated=()):
+    return EntityGraph(NODES, ALIASES, list(curated), tmp_path / 'cache' / 'mentions.json', roots=[tmp_path / 'docs'])
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / 'docs' / 'Reports' / f"{name}.txt"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+    return path
+
+
+def test_k_hop_neighbourhoods(tmp_path):
+    # A chain POK - Elian Karel - GAStech - Sten Sanjorge Jr, plus one curated link off the end
+    write(tmp_path, "1", "POK and Elian Karel")
+    write(tmp_path, "2", "POK and Elian Karel again")
+    write(tmp_path, "3", "Elian Karel at GAStech")
+    write(tmp_path, "4", "GAStech hired Sten Sanjorge Jr")
+    entity_graph = graph(tmp_path, [{"source": "Sten Sanjorge Jr", "target": "Silvia Marek", "relation": "colleague"}])
+
+    def ids(**kwargs):
+        return [node['id'] for node in entity_graph.subgraph(**kwargs)['nodes']]
+
+    assert ids(center="POK", hops=1) == ["Elian Karel", "POK"]
+    assert ids(center="POK", hops=2) == ["Elian Karel", "GAStech", "POK"]
+    assert ids(center="POK", hops=4) == ["Elian Karel", "GAStech", "POK", "Silvia Marek", "Sten Sanjorge Jr"]
+    # Weak links are cut, curated ones are always followed
+    assert ids(center="POK", hops=3, min_weight=2) == ["Elian Karel", "POK"]
+    assert ids(center="Silvia Marek", hops=1, min_weight=5) == ["Silvia Marek", "Sten Sanjorge Jr"]
+    assert len(ids()) == len(NODES)
+
+    weights = {(link['source'], link['target']): link.get('weight') for link in entity_graph.subgraph(center="POK")['links']}
+    assert weights == {("Elian Karel", "POK"): 2}
+
+
+def test_edits_update_links_and_evidence(tmp_path):
+    doc = write(tmp_path, "1", "POK and GAStech")
+    entity_graph = graph(tmp_path)
+    assert [e['path'] for e in entity_graph.link_evidence("POK", "GAStech")] == [doc.as_posix()]
+
+    doc.write_text("Only POK here, nobody else at all")
+    entity_graph.refresh(force=True)
+    assert entity_graph.link_evidence("POK", "GAStech") == []
+    assert graph(tmp_path).subgraph(center="POK")['links'] == []
+
+
+def test_namesakes_shadow_a_shared_surname():
+    matcher = EntityMatcher(["Mandor Vann"], {"Mandor Vann": ["Vann"]}, ignored=["Juliana Vann", "Edvard Vann"])
+    assert matcher.count_mentions("Juliana Vann and Edvard Vann met Mandor Vann. Vann left.") == {"Mandor Vann": 2}
+
+
+def test_bias_entities_do_not_credit_namesakes():
+    from entities import BIAS_ENTITIES, NAMESAKES
+
+    matcher = EntityMatcher(list(BIAS_ENTITIES), BIAS_ENTITIES, ignored=NAMESAKES)
+    text = " ".join(NAMESAKES) + ". Juliana Vann spoke to Edvard Vann and Isia Vann."
+    assert matcher.count_mentions(text) == {}
+    assert matcher.count_mentions("Mandor Vann and Sten Sanjorge Jr.") == {"Mandor Vann": 1, "Sten Sanjorge Jr.": 1}
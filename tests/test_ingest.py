@@ -0,0 +1,86 @@
+from dataclasses import replace
+import os
+
+from haystack import component, Document
+from haystack.document_stores.in_memory import InMemoryDocumentStore
+
+from ingest import MANIFEST_NAME, IngestManifest, ingest_articles
+
+
+@component
+class CountingEmbedder:
+    # Gives every document a fixed embedding and remembers what it was asked to embed
+
+    def __init__(self):
+        self.embedded = []
+
+    @component.output_types(documents=list[Document])
+    def run(self, documents: list[Document]):
+        self.embedded.extend(doc.content for doc in documents)
+        return {"documents": [replace(doc, embedding=[1.0, 0.0]) for doc in documents]}
+
+
+def ingest(store, embedder):
+    return ingest_articles(store, persist_path='vectors', doc_embedder=embedder)
+
+
+def test_only_new_or_changed_articles_are_embedded(corpus):
+    first = corpus("Outlet A", "1", "The first story.")
+    corpus("Outlet A", "2", "The second story.")
+    store, embedder = InMemoryDocumentStore(), CountingEmbedder()
+
+    summary = ingest(store, embedder)
+    assert summary['embedded'] == 2 and summary['version'] == 1
+    assert store.count_documents() == 2
+
+    # Nothing changed: nothing is embedded and the version stays put
+    summary = ingest(store, embedder)
+    assert summary == {"embedded": 0, "deleted": 0, "unchanged": 2, "version": 1}
+    assert len(embedder.embedded) == 2
+
+    # An edit replaces that article's document
+    first.write_text(first.read_text().replace("first", "edited"))
+    summary = ingest(store, embedder)
+    assert summary['embedded'] == 1 and summary['deleted'] == 1 and summary['version'] == 2
+    assert embedder.embedded[-1] == "The edited story."
+    assert sorted(doc.content for doc in store.filter_documents()) == ["The edited story.", "The second story."]
+
+
+def test_removed_articles_are_deleted(corpus):
+    gone = corpus("Outlet A", "1", "Soon gone.")
+    corpus("Outlet A", "2", "Staying.")
+    store = InMemoryDocumentStore()
+    ingest(store, CountingEmbedder())
+
+    gone.unlink()
+    summary = ingest(store, CountingEmbedder())
+    assert summary['deleted'] == 1
+    assert [doc.content for doc in store.filter_documents()] == ["Staying."]
+    assert list(IngestManifest(f'vectors/{MANIFEST_NAME}').files) == ["News Articles/Outlet A/2.txt"]
+
+
+def test_identical_articles_share_one_document(corpus):
+    corpus("Outlet A", "1", "Same story.")
+    copy = corpus("Outlet A", "2", "Same story.")
+    store, embedder = InMemoryDocumentStore(), CountingEmbedder()
+    ingest(store, embedder)
+    assert embedder.embedded == ["Same story."]
+
+    # Removing one copy keeps the document the other still produces
+    copy.unlink()
+    assert ingest(store, embedder)['deleted'] == 0
+    assert store.count_documents() == 1
+
+
+def test_existing_store_is_adopted_without_re_embedding(corpus):
+    corpus("Outlet A", "1", "Already embedded.")
+    store = InMemoryDocumentStore()
+    ingest(store, CountingEmbedder())
+    os.remove(f'vectors/{MANIFEST_NAME}')
+
+    # A store built before the manifest existed keeps the documents whose ids still match
+    embedder = CountingEmbedder()
+    summary = ingest(store, embedder)
+    assert embedder.embedded == []
+    assert summary['unchanged'] == 1
+    assert IngestManifest(f'vectors/{MANIFEST_NAME}').exists()
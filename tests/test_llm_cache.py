@@ -0,0 +1,65 @@
+import time
+
+from llm_cache import LLMCache, LRUCache, folder_signature, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  What is   POK? ") == normalize_query("what is pok") == "what is pok"
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.info()['evictions'] == 1
+
+
+def test_entries_expire(monkeypatch):
+    cache = LRUCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 11)
+    assert cache.get("a", "gone") == "gone"
+    assert cache.info()['expired'] == 1
+
+
+def test_disk_entries_survive_a_new_cache(tmp_path):
+    path = tmp_path / 'answers.sqlite'
+    LRUCache(disk_path=path).set("key", {"answer": "yes"})
+
+    cache = LRUCache(disk_path=path)
+    assert cache.get("key") == {"answer": "yes"}
+    assert cache.info()['disk_hits'] == 1
+    cache.clear()
+    assert LRUCache(disk_path=path).get("key") is None
+
+
+def test_answer_key_changes_with_the_corpus(tmp_path):
+    folder = tmp_path / 'Resumes'
+    folder.mkdir()
+    (folder / 'a.txt').write_text("one")
+    cache = LLMCache()
+    before = cache.answer_key("Who?", [str(folder)], folder_signature([folder]))
+    assert cache.answer_key(" who ", [str(folder)], folder_signature([folder])) == before
+
+    (folder / 'b.txt').write_text("two")
+    assert cache.answer_key("Who?", [str(folder)], folder_signature([folder])) != before
+
+
+def test_context_is_built_once_per_corpus_version(tmp_path):
+    cache = LLMCache()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return "context"
+
+    signature = (("a.txt", 1.0, 3),)
+    assert cache.context(["Resumes"], signature, build) == "context"
+    assert cache.context(["Resumes"], signature, build) == "context"
+    cache.context(["Resumes"], (("a.txt", 2.0, 3),), build)
+    assert len(builds) == 2
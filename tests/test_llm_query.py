@@ -0,0 +1,58 @@
+import time
+import uuid
+
+import services
+
+REPLY = "This is a stub answer to: {}\n\nThe prompt was"
+
+
+def batch(client, questions):
+    return client.post('/llm_query_batch', json={"questions": questions, "folders": ["Resumes"]})
+
+
+def test_batch_answers_every_question(client, stub_pipeline):
+    stub_pipeline()
+    questions = [f"Who runs security {uuid.uuid4()}?", f"Who runs IT {uuid.uuid4()}?"]
+    response = batch(client, questions)
+
+    assert response.status_code == 200
+    answers = response.get_json()['answers']
+    assert [entry['question'] for entry in answers] == questions
+    for question, entry in zip(questions, answers):
+        assert entry['cached'] is False
+        assert entry['answer'].startswith(REPLY.format(question))
+
+    # Answers are cached one by one: a repeat with one new question only runs that one
+    new = f"Who left {uuid.uuid4()}?"
+    answers = batch(client, [questions[1], new]).get_json()['answers']
+    assert [entry['cached'] for entry in answers] == [True, False]
+    assert answers[1]['answer'].startswith(REPLY.format(new))
+
+
+def test_batch_size_is_bounded(client, stub_pipeline, monkeypatch):
+    stub_pipeline()
+    import app as app_module
+    monkeypatch.setattr(app_module, 'LLM_BATCH_MAX', 2)
+    assert batch(client, []).status_code == 400
+    assert batch(client, ["a?", "b?", "c?"]).status_code == 400
+
+
+def test_batch_reports_generator_errors_per_question(client, stub_pipeline):
+    stub_pipeline(fail_after=0)
+    answers = batch(client, [f"Anyone {uuid.uuid4()}?"]).get_json()['answers']
+    assert "RuntimeError" in answers[0]['error']
+
+
+def test_llm_query_is_refused_when_the_executor_is_full(client, stub_pipeline, monkeypatch):
+    stub_pipeline()
+    monkeypatch.setattr(services, 'llm_executor', services.BoundedExecutor(workers=1, max_queued=0, timeout=5))
+    blocker = services.llm_executor.submit(time.sleep, 0.3)
+
+    response = client.post('/llm_query', json={"query": f"Anyone {uuid.uuid4()}?", "folders": ["Resumes"]})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == "1"
+    response = batch(client, [f"Anyone {uuid.uuid4()}?"])
+    assert response.status_code == 503
+    assert response.get_json()['answers'][0]['error'] == "busy"
+    blocker.result()
+    assert services.llm_executor.info()['pending'] == 0
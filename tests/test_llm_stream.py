@@ -0,0 +1,73 @@
+import json
+import re
+import time
+import uuid
+
+import services
+
+REPLY = re.compile(r"This is a stub answer to: (.*)\n\nThe prompt was \d+ characters long\.", re.S)
+
+
+def sse_events(response):
+    events = []
+    for block in response.get_data(as_text=True).split("\n\n"):
+        if block.strip():
+            event, data = block.split("\n", 1)
+            events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def ask(client, query):
+    return sse_events(client.post('/llm_query_stream', json={"query": query, "folders": ["Resumes"]}))
+
+
+def test_stream_sends_the_reply_in_pieces(client, stub_pipeline):
+    stub_pipeline()
+    query = f"Who runs security {uuid.uuid4()}?"
+    events = ask(client, query)
+
+    tokens = [data['text'] for event, data in events if event == "token"]
+    assert len(tokens) > 1
+    assert events[-1][0] == "done"
+    assert events[-1][1]['cached'] is False
+    assert events[-1][1]['ttft_ms'] is not None
+    match = REPLY.fullmatch("".join(tokens))
+    assert match and match[1] == query
+
+
+def test_stream_answer_is_cached(client, stub_pipeline):
+    stub_pipeline()
+    query = f"Who runs IT {uuid.uuid4()}?"
+    first = "".join(data['text'] for event, data in ask(client, query) if event == "token")
+
+    events = ask(client, query)
+    assert [event for event, _ in events] == ["token", "done"]
+    assert events[0][1]['text'] == first
+    assert events[1][1]['cached'] is True
+
+
+def test_generator_error_ends_the_stream_with_an_error_event(client, stub_pipeline):
+    stub_pipeline(fail_after=2)
+    query = f"Who left {uuid.uuid4()}?"
+    events = ask(client, query)
+
+    assert [event for event, _ in events] == ["token", "token", "error"]
+    assert "RuntimeError" in events[-1][1]['error']
+
+    # A failed answer is not cached: asking again runs the generator again
+    stub_pipeline()
+    events = ask(client, query)
+    assert events[-1][0] == "done" and events[-1][1]['cached'] is False
+
+
+def test_silent_generator_times_out(client, stub_pipeline, monkeypatch):
+    stub_pipeline(first_token_delay=0.5)
+    monkeypatch.setattr(services.llm_executor, 'timeout', 0.1)
+    start = time.perf_counter()
+    events = ask(client, f"Who is late {uuid.uuid4()}?")
+
+    assert [event for event, _ in events] == ["error"]
+    assert "LLMTimeout" in events[0][1]['error']
+    assert time.perf_counter() - start < 0.5
+    # Let the abandoned call finish before the next test uses the executor
+    time.sleep(0.5)
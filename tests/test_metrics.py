@@ -0,0 +1,66 @@
+from flask import Flask
+
+import metrics
+
+
+def test_registry_renders_the_prometheus_text_format():
+    registry = metrics.Registry()
+    requests = registry.counter('requests_total', 'Requests', ['route'])
+    pending = registry.gauge('pending', 'Pending calls')
+    latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1))
+    registry.register_collector(lambda: [('cache_hits', 'counter', 'Cache hits', [({"cache": 'a"b'}, 3)])])
+
+    requests.inc(route='/search')
+    requests.inc(2, route='/search')
+    pending.inc()
+    pending.inc()
+    pending.dec()
+    for value in (0.05, 0.5, 5):
+        latency.observe(value)
+
+    assert registry.render().splitlines() == [
+        '# HELP requests_total Requests',
+        '# TYPE requests_total counter',
+        'requests_total{route="/search"} 3',
+        '# HELP pending Pending calls',
+        '# TYPE pending gauge',
+        'pending 1',
+        '# HELP latency_seconds Latency',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        'latency_seconds_sum 5.55',
+        'latency_seconds_count 3',
+        '# HELP cache_hits Cache hits',
+        '# TYPE cache_hits counter',
+        'cache_hits{cache="a\\"b"} 3',
+    ]
+
+
+def test_requests_get_a_server_timing_header(tmp_path):
+    app = Flask(__name__)
+    metrics.init_app(app, tmp_path / 'profiles', allow_profiling=True)
+
+    @app.route('/work')
+    def work():
+        with metrics.stage("load"):
+            pass
+        with metrics.stage("score"):
+            pass
+        with metrics.stage("load"):
+            pass
+        return "done"
+
+    before = metrics.STAGE_SECONDS.values.get(("score",), [None, 0.0, 0])[2]
+    client = app.test_client()
+    response = client.get('/work')
+    assert [entry.split(";")[0] for entry in response.headers['Server-Timing'].split(", ")] == ["load", "score", "total"]
+    assert 'X-Profile-File' not in response.headers
+    assert metrics.STAGE_SECONDS.values[("score",)][2] == before + 1
+    assert 'vafinal_request_duration_seconds_count{endpoint="/work",method="GET",status="200"} 1' in metrics.REGISTRY.render()
+
+    profiled = client.get('/work', headers={metrics.PROFILE_HEADER: '1'})
+    assert (tmp_path / 'profiles').exists()
+    assert profiled.headers['X-Profile-File'].startswith((tmp_path / 'profiles').as_posix())
+    assert metrics.REQUESTS_IN_FLIGHT.values[()] == 0
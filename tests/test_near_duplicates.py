@@ -0,0 +1,40 @@
+from near_duplicates import MinHashLSH
+
+STORY = ("Officials in Abila confirmed on Monday that the missing GAStech employees have not been found. "
+         "Police are searching the area around the company headquarters and ask anyone with information "
+         "to come forward. The employees disappeared after the annual meeting with the government. ")
+OTHER = ("The Kronos national football team won its qualifying match on Sunday evening after a late goal "
+         "by its young striker, sending thousands of supporters into the streets of the capital to celebrate.")
+
+
+def test_copied_article_is_paired_with_the_earlier_one(corpus):
+    original = corpus("Outlet A", "1", STORY, published="2014/01/20")
+    copy = corpus("Outlet B", "1", STORY + "Reporting by the Outlet B staff.", published="2014/01/21")
+    corpus("Outlet C", "1", OTHER)
+    index = MinHashLSH('cache')
+
+    result = index.derivatives()
+    assert result['total'] == 1
+    pair = result['pairs'][0]
+    assert {article['path'] for article in pair['articles']} == {original.as_posix(), copy.as_posix()}
+    assert pair['jaccard'] > 0.7
+    assert pair['primary'] == original.as_posix()
+    assert result['outlets']["Outlet B"] == {"primary": 0, "derivative": 1, "copied_from": {"Outlet A": 1}}
+    assert index.derivatives(source="Outlet C")['total'] == 0
+
+
+def test_signatures_are_reused_and_edits_update_the_pairs(corpus):
+    corpus("Outlet A", "1", STORY)
+    copy = corpus("Outlet B", "1", STORY)
+    MinHashLSH('cache').refresh()
+
+    index = MinHashLSH('cache')
+    index.refresh()
+    assert index.derivatives()['total'] == 1
+
+    copy.write_text(copy.read_text().replace(STORY, OTHER))
+    index.refresh(force=True)
+    assert index.derivatives()['total'] == 0
+    copy.unlink()
+    index.refresh(force=True)
+    assert len(index.signatures) == 1
@@ -0,0 +1,31 @@
+import pytest
+
+
+@pytest.mark.parametrize("url", [
+    "/people_data?hops=x",
+    "/people_data?min_weight=-1",
+    "/search?q=police&limit=abc",
+    "/derivatives?min_jaccard=x",
+    "/derivatives?min_jaccard=nan",
+    "/derivatives?limit=1.5",
+    "/timeline_data?articles=abc",
+    "/email/graph?min_count=x",
+    "/email/ego/Ada Campo-Corrente?min_count=-2",
+    "/email/top_correspondents/Ada Campo-Corrente?n=inf",
+])
+def test_bad_numbers_in_the_query_string_are_rejected(client, url):
+    response = client.get(url)
+    assert response.status_code == 400
+    assert "must be a non-negative" in response.get_json()['error']
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/wordcloud", {"folders": [], "words": "many"}),
+    ("/llm_query", {"query": "Who?", "folders": [], "token_budget": "abc"}),
+    ("/llm_query_stream", {"query": "Who?", "folders": [], "top_k": -3}),
+    ("/llm_query_batch", {"questions": ["Who?"], "folders": [], "token_budget": [1]}),
+])
+def test_bad_numbers_in_the_body_are_rejected(client, path, body):
+    response = client.post(path, json=body)
+    assert response.status_code == 400
+    assert "must be a non-negative" in response.get_json()['error']
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+docx = pytest.importorskip("docx")
+
+from resume_convert import MANIFEST, convert_all
+from resume_index import ResumeIndex
+
+
+def write_docx(path, *paragraphs):
+    document = docx.Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def test_unchanged_files_are_skipped_and_deleted_ones_removed(tmp_path):
+    source, output = tmp_path / 'resumedox', tmp_path / 'resumetxt'
+    source.mkdir()
+    write_docx(source / 'Resume-AdaCampoCorrente.docx', "Security", "", "Patrols")
+    write_docx(source / 'Resume-LoretoBodrogi.docx', "IT")
+
+    assert convert_all(source, output, workers=1) == {}
+    assert (output / 'Resume-AdaCampoCorrente.txt').read_text(encoding='utf-8') == "Security\nPatrols"
+    mtime = (output / 'Resume-LoretoBodrogi.txt').stat().st_mtime_ns
+
+    (source / 'Resume-AdaCampoCorrente.docx').unlink()
+    assert convert_all(source, output, workers=1) == {}
+    assert not (output / 'Resume-AdaCampoCorrente.txt').exists()
+    assert (output / 'Resume-LoretoBodrogi.txt').stat().st_mtime_ns == mtime
+    assert list(json.loads((output / MANIFEST).read_text(encoding='utf-8'))) == ['Resume-LoretoBodrogi.docx']
+    assert ResumeIndex([output]).texts(["Ada Campo-Corrente", "Loreto Bodrogi"]) == {"Loreto Bodrogi": "IT"}
+
+
+def test_forced_runs_still_remove_deleted_files(tmp_path):
+    source, output = tmp_path / 'resumedox', tmp_path / 'resumetxt'
+    source.mkdir()
+    write_docx(source / 'Resume-IsiaVann.docx', "Security")
+    convert_all(source, output, workers=1)
+
+    (source / 'Resume-IsiaVann.docx').unlink()
+    convert_all(source, output, workers=1, force=True)
+    assert not (output / 'Resume-IsiaVann.txt').exists()
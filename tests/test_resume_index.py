@@ -0,0 +1,34 @@
+import os
+
+from resume_index import ResumeIndex, resume_key
+
+
+def test_resume_key():
+    assert resume_key("Ada Campo-Corrente") == resume_key("Resume-AdaCampoCorrente") == "adacampocorrente"
+
+
+def test_later_directories_win_and_edits_are_picked_up(tmp_path):
+    first, second = tmp_path / 'Resumes', tmp_path / 'resumetxt'
+    first.mkdir()
+    second.mkdir()
+    (first / 'Resume-AdaCampoCorrente.txt').write_text("old")
+    (first / 'Resume-LoretoBodrogi.txt').write_text("security")
+    (second / 'Resume-AdaCampoCorrente.txt').write_text("converted")
+    index = ResumeIndex([first, second])
+
+    assert index.text("Ada Campo-Corrente") == "converted"
+    assert index.texts(["Loreto Bodrogi", "Nobody"]) == {"Loreto Bodrogi": "security"}
+
+    path = first / 'Resume-LoretoBodrogi.txt'
+    path.write_text("security chief")
+    os.utime(path, (1, 1))
+    index.refresh(force=True)
+    assert index.text("Loreto Bodrogi") == "security chief"
+
+    path.unlink()
+    index.refresh(force=True)
+    assert index.text("Loreto Bodrogi") is None
+
+
+def test_missing_directories_are_skipped(tmp_path):
+    assert ResumeIndex([tmp_path / 'missing']).texts(["Anyone"]) == {}
@@ -0,0 +1,51 @@
+from haystack import Document
+
+from retrieval import approx_tokens, assemble_context, chunk_file, chunk_words, supporting_sources
+
+
+def test_chunks_overlap_and_cover_the_text():
+    words = [f"w{i}" for i in range(500)]
+    chunks = chunk_words(" ".join(words), size=220, overlap=40)
+    assert [len(chunk.split()) for chunk in chunks] == [220, 220, 140]
+    assert chunks[1].split()[:40] == chunks[0].split()[-40:]
+    assert chunks[-1].split()[-1] == "w499"
+    assert chunk_words("  ") == []
+    assert chunk_words("just a few words") == ["just a few words"]
+
+
+def test_article_chunks_carry_the_header_metadata():
+    text = "SOURCE: Outlet A\nTITLE: Protest\nPUBLISHED: 2014/01/20\n\nThe body of the story."
+    [(content, meta)] = chunk_file("News Articles", "News Articles/Outlet A/1.txt", text)
+    assert content == "The body of the story."
+    assert meta == {"folder": "News Articles", "path": "News Articles/Outlet A/1.txt", "title": "Protest",
+                    "source": "Outlet A", "published": "2014/01/20", "chunk": 0}
+
+
+def test_email_headers_are_chunked_by_rows():
+    rows = "".join(f"a@x,b@x,1/6/2014 8:{i:02d},Subject {i}\n" for i in range(20))
+    chunks = chunk_file("email_headers.csv", "sources/email_headers.csv", "From,To,Date,Subject\n" + rows)
+    assert [len(content.split("\n")) for content, _ in chunks] == [15, 5]
+    assert chunks[0][1]['title'] == "Email headers"
+
+
+def chunk(text, title="Doc", folder="Reports", path=None):
+    return Document(content=text, meta={"title": title, "source": folder, "folder": folder, "path": path or title})
+
+
+def test_context_stays_within_the_token_budget():
+    chunks = [chunk("a" * 400, "First"), chunk("b" * 2000, "Too long"), chunk("c" * 400, "Third")]
+    context, used = assemble_context(chunks, token_budget=300)
+    assert [c.meta['title'] for c in used] == ["First", "Third"]
+    assert approx_tokens(context) <= 300
+    assert context.startswith("Source: Reports - First")
+
+
+def test_a_single_oversized_chunk_is_cut_to_fit():
+    context, used = assemble_context([chunk("x" * 10000)], token_budget=100)
+    assert len(used) == 1
+    assert len(context) == 400
+
+
+def test_supporting_sources_lists_each_file_once():
+    chunks = [chunk("a", "One", path="p1"), chunk("b", "One", path="p1"), chunk("c", "Two", path="p2")]
+    assert [source['title'] for source in supporting_sources(chunks)] == ["One", "Two"]
@@ -0,0 +1,50 @@
+from search_index import SearchIndex, parse_query
+
+
+def test_parse_query():
+    assert parse_query('kronos "protectors of kronos" pok') == (["kronos", "pok"], [["protectors", "of", "kronos"]])
+
+
+def test_search_ranks_and_filters(corpus):
+    corpus("Outlet A", "1", "The Protectors of Kronos marched in Abila.", title="March", published="2014/01/10")
+    corpus("Outlet B", "2", "Kronos exports kronos kronos gas.", title="Gas", published="2014/02/10")
+    corpus("Outlet B", "3", "Nothing to see here.", title="Quiet", published="2014/03/10")
+    index = SearchIndex('cache/search.json')
+
+    results = index.search("kronos")['results']
+    assert [result['title'] for result in results] == ["Gas", "March"]
+    assert results[0]['source'] == "Outlet B" and results[0]['published'] == "2014-02-10"
+
+    assert [r['title'] for r in index.search('"protectors of kronos"')['results']] == ["March"]
+    assert index.search('"kronos protectors"')['total'] == 0
+    assert [r['title'] for r in index.search("kronos", sources={"Outlet A"})['results']] == ["March"]
+    assert [r['title'] for r in index.search("kronos", start="2014-02-01")['results']] == ["Gas"]
+
+
+def test_changes_are_picked_up_and_persisted(corpus):
+    path = corpus("Outlet A", "1", "Old text about pipelines.")
+    index = SearchIndex('cache/search.json')
+    assert index.search("pipelines")['total'] == 1
+
+    path.write_text(path.read_text().replace("pipelines", "protests") + "\n")
+    index.refresh(force=True)
+    assert index.search("pipelines")['total'] == 0
+    assert index.search("protests")['total'] == 1
+
+    path.unlink()
+    index.refresh(force=True)
+    assert index.search("protests")['total'] == 0
+
+    corpus("Outlet A", "2", "Fresh text.")
+    index.refresh(force=True)
+    assert SearchIndex('cache/search.json').search("fresh")['total'] == 1
+
+
+def test_identical_files_are_returned_once(corpus):
+    corpus("Outlet A", "1", "Same words.")
+    corpus("Outlet A", "2", "Same words.")
+    corpus("Outlet B", "1", "Same words.")
+    # The two Outlet A files are byte for byte the same; Outlet B's differs in its SOURCE header
+    result = SearchIndex('cache/search.json').search("same")
+    assert result['total'] == 2
+    assert len(result['results']) == 2
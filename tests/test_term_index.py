@@ -0,0 +1,59 @@
+import os
+
+from term_index import TermIndex, clean_text
+
+
+def write(path, text, mtime=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_clean_text_drops_stopwords_and_short_words():
+    assert clean_text("the pipeline, of GAS and an ox") == ["pipeline", "GAS"]
+
+
+def test_counts_are_merged_across_folders(tmp_path):
+    write(tmp_path / 'sources' / 'Reports' / 'a.txt', "pipeline pipeline protest")
+    write(tmp_path / 'sources' / 'Reports' / 'sub' / 'b.txt', "pipeline")
+    write(tmp_path / 'sources' / 'Memos' / 'c.txt', "protest kronos")
+    index = TermIndex(tmp_path / 'sources', tmp_path / 'cache' / 'terms.json')
+
+    assert index.most_common(['Reports']) == [("pipeline", 3), ("protest", 1)]
+    assert dict(index.most_common(['Reports', 'Memos'])) == {"pipeline": 3, "protest": 2, "kronos": 1}
+    assert index.most_common(['Reports', 'Memos'], n=1) == [("pipeline", 3)]
+
+
+def test_only_changed_files_are_read_again(tmp_path, monkeypatch):
+    a, b = tmp_path / 'sources' / 'Reports' / 'a.txt', tmp_path / 'sources' / 'Reports' / 'b.txt'
+    write(a, "pipeline", mtime=1000)
+    write(b, "protest", mtime=1000)
+    TermIndex(tmp_path / 'sources', tmp_path / 'cache' / 'terms.json').most_common(['Reports'])
+
+    # A new index loads the persisted counts and re-reads only what changed
+    index = TermIndex(tmp_path / 'sources', tmp_path / 'cache' / 'terms.json')
+    read = []
+    count_file = index.count_file
+    monkeypatch.setattr(index, 'count_file', lambda path: read.append(path.name) or count_file(path))
+    assert dict(index.most_common(['Reports'])) == {"pipeline": 1, "protest": 1}
+    assert read == []
+
+    # Same size, new mtime
+    write(a, "pipelinf", mtime=2000)
+    assert dict(index.most_common(['Reports'])) == {"pipelinf": 1, "protest": 1}
+    # Same mtime, new size
+    write(b, "protests", mtime=1000)
+    assert dict(index.most_common(['Reports'])) == {"pipelinf": 1, "protests": 1}
+    assert read == ["a.txt", "b.txt"]
+
+    b.unlink()
+    assert dict(index.most_common(['Reports'])) == {"pipelinf": 1}
+    assert str(b) not in TermIndex(tmp_path / 'sources', tmp_path / 'cache' / 'terms.json').files
+
+
+def test_email_headers_count_only_subjects(tmp_path):
+    write(tmp_path / 'sources' / 'email_headers.csv',
+          "From,To,Date,Subject\na@x,b@x,1/6/2014 8:39,Pipeline meeting\nb@x,a@x,1/6/2014 9:01,RE: Pipeline meeting\n")
+    index = TermIndex(tmp_path / 'sources', tmp_path / 'cache' / 'terms.json')
+    assert dict(index.most_common(['email_headers.csv'])) == {"pipeline": 2, "meeting": 2}
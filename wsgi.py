@@ -0,0 +1,7 @@
+import os
+
+from app import create_app
+
+# For a WSGI server, e.g. `gunicorn -c gunicorn.conf.py wsgi:app`. Warm up eagerly by default, so
+# that with preload_app the models are loaded and the corpus ingested once, before the workers fork.
+app = create_app(warmup=os.environ.get('WARMUP', 'eager'))